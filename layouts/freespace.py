@@ -1,13 +1,7 @@
 #!/usr/bin/env python
 
-spacing = 0.11  # m
-lines = []
-for c in range(-12, 13):
-    rs = [reversed(range(25)), range(25)][c % 2]
-    for r in rs:
-        x, y, z = -c*spacing, 0, (r - 12)*spacing
-        if r < 7:
-            z = (6.5 - 12)*spacing
-            y = (r - 6.5)*spacing
-        lines.append('  {"point": [%.2f, %.2f, %.2f]}' % (x, y, z))
-print '[\n' + ',\n'.join(lines) + '\n]'
+import sys
+
+import generate
+
+generate.write_json(generate.Freespace(columns=25, rows=25, spacing=0.11), sys.stdout)
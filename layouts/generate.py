@@ -0,0 +1,312 @@
+#!/usr/bin/env python
+
+"""Generate layout files, as JSON and as compact binary .npy files.
+
+Each layout is a class that computes its points with numpy a chunk at a
+time and knows how many points there will be, so layouts of any size are
+written in a single streaming pass without ever holding all of the text
+(or all of the points) in memory:
+
+    layouts/generate.py wall > wall.json
+    layouts/generate.py cylinder --radius 1 --height 1 --n_around 64 -o cyl.json
+    layouts/generate.py cylinder --n_around 1000 --n_tall 100 --binary big.npy
+    layouts/generate.py all [--check]
+
+"all" regenerates every layout file in this directory byte for byte, or
+with --check reports whether they still match.
+
+The binary format is a float32 .npy array of shape (n_pixels, 3), which
+python_clients/layout.py loads by memory-mapping it.  It holds the points
+as computed, where the JSON files round them to a few decimal places.
+
+"""
+
+from __future__ import division
+import math
+import optparse
+import os
+import sys
+
+import numpy
+
+CHUNK_SIZE = 4096  # points computed and written at a time
+
+# the line for each point, in the styles of the existing layout files
+FIXED_2 = '  {"point": [%.2f, %.2f, %.2f]}'
+FIXED_4 = '  {"point": [%.4f, %.4f, %.4f]}'
+COMPACT = '{"point":[%s,%s,%s]}'
+
+
+def _chunks(n_points, chunk_size, points):
+    """Yield points(indices) for consecutive runs of chunk_size indices."""
+    for start in range(0, n_points, chunk_size):
+        yield points(numpy.arange(start, min(start + chunk_size, n_points)))
+
+def _compact(value):
+    """Format a float the way str() did in Python 2 (and numpy before 1.14)."""
+    text = '%.12g' % value
+    if '.' not in text and 'e' not in text and 'n' not in text:
+        text += '.0'
+    return text
+
+
+class Wall(object):
+    """A flat grid of strips, running up and down alternately (wall.json)."""
+
+    line = FIXED_2
+
+    def __init__(self, columns=25, rows=50, spacing=0.11):
+        self.columns = columns
+        self.rows = rows
+        self.spacing = spacing
+        self.n_points = columns * rows
+
+    def chunks(self, chunk_size=CHUNK_SIZE):
+        return _chunks(self.n_points, chunk_size, self._points)
+
+    def _points(self, index):
+        c = index // self.rows - (self.columns - 1) // 2
+        r = index % self.rows
+        r = numpy.where(c % 2 == 0, r, self.rows - 1 - r)
+        points = numpy.zeros((len(index), 3))
+        points[:, 0] = c * self.spacing
+        points[:, 2] = (r - (self.rows - 1) / 2) * self.spacing
+        return points
+
+
+class Freespace(object):
+    """A grid whose bottom rows fold forward to stand up from the floor
+    (freespace.json)."""
+
+    line = FIXED_2
+
+    def __init__(self, columns=25, rows=25, spacing=0.11, fold=7):
+        self.columns = columns
+        self.rows = rows
+        self.spacing = spacing
+        self.fold = fold
+        self.n_points = columns * rows
+
+    def chunks(self, chunk_size=CHUNK_SIZE):
+        return _chunks(self.n_points, chunk_size, self._points)
+
+    def _points(self, index):
+        c = index // self.rows - (self.columns - 1) // 2
+        r = index % self.rows
+        r = numpy.where(c % 2 == 0, self.rows - 1 - r, r)
+        middle = (self.rows - 1) // 2
+        folded = r < self.fold
+        points = numpy.zeros((len(index), 3))
+        points[:, 0] = -c * self.spacing
+        points[:, 1] = numpy.where(folded, (r - (self.fold - 0.5)) * self.spacing, 0)
+        points[:, 2] = numpy.where(folded, (self.fold - 0.5 - middle) * self.spacing,
+                                   (r - middle) * self.spacing)
+        return points
+
+
+class Cylinder(object):
+    """Rings of pixels around the z axis, from z = -height to height, as
+    make_cylinder.py always made them."""
+
+    line = FIXED_4
+
+    def __init__(self, radius=1, height=1, n_around=32, n_tall=None):
+        # without n_tall, pick the number of rings that makes square pixels
+        if not n_tall:
+            n_tall = int(n_around * height / radius / math.pi)
+        self.radius = radius
+        self.height = height
+        self.n_around = n_around
+        self.n_tall = max(1, n_tall)
+        self.n_points = self.n_around * self.n_tall
+        # only n_around distinct angles: use math's sin and cos, exactly
+        # as the original script did, and index into them
+        thetas = [jj / n_around * math.pi * 2 for jj in range(n_around)]
+        self._x = numpy.array([math.sin(theta) * radius for theta in thetas])
+        self._y = numpy.array([math.cos(theta) * radius for theta in thetas])
+
+    def chunks(self, chunk_size=CHUNK_SIZE):
+        return _chunks(self.n_points, chunk_size, self._points)
+
+    def _points(self, index):
+        ii = index // self.n_around
+        jj = index % self.n_around
+        points = numpy.empty((len(index), 3))
+        points[:, 0] = self._x[jj]
+        points[:, 1] = self._y[jj]
+        if self.n_tall == 1:
+            points[:, 2] = 0 * self.height
+        else:
+            points[:, 2] = ((ii / (self.n_tall - 1)) * 2 - 1) * self.height
+        return points
+
+
+class Circle(Cylinder):
+    """A single ring of pixels in the z = 0 plane (circle_r1_50x.json)."""
+
+    def __init__(self, radius=1, n_around=32):
+        Cylinder.__init__(self, radius, 0, n_around, 1)
+
+
+class WillowTree(object):
+    """Vines hanging from branches radiating out from a trunk
+    (willow_tree.json)."""
+
+    line = COMPACT
+
+    def __init__(self, center=(0, 0, 3), inner_radius=0.6, vine_distance=0.3,
+                 branches=8, vines=5, pixels=34, pixel_distance=0.08):
+        self.pixels = pixels
+        self.n_points = branches * vines * pixels
+        self._delta = numpy.array([0, 0, -pixel_distance])
+        origins = []
+        for branch in range(branches):
+            angle = branch * 2 * math.pi / branches
+            direction = numpy.array([math.cos(angle), math.sin(angle), 0])
+            for vine in range(vines):
+                origins.append(numpy.array(center) + (direction * (inner_radius + (vine * vine_distance))))
+        self._origins = numpy.array(origins)
+
+    def chunks(self, chunk_size=CHUNK_SIZE):
+        return _chunks(self.n_points, chunk_size, self._points)
+
+    def _points(self, index):
+        pixel = index % self.pixels
+        return self._origins[index // self.pixels] + pixel[:, None] * self._delta
+
+
+def write_json(layout, f, chunk_size=CHUNK_SIZE):
+    """Write a layout's points to the open file f as a JSON layout file."""
+    f.write('[\n')
+    separator = ''
+    for chunk in layout.chunks(chunk_size):
+        values = chunk.reshape(-1).tolist()
+        if layout.line is COMPACT:
+            values = [_compact(value) for value in values]
+        f.write(separator + ',\n'.join([layout.line] * len(chunk)) % tuple(values))
+        separator = ',\n'
+    f.write('\n]\n')
+
+def write_binary(layout, path, chunk_size=CHUNK_SIZE):
+    """Write a layout's points to path as a float32 .npy file."""
+    points = numpy.lib.format.open_memmap(path, mode='w+', dtype=numpy.float32,
+                                          shape=(layout.n_points, 3))
+    start = 0
+    for chunk in layout.chunks(chunk_size):
+        points[start:start+len(chunk)] = chunk
+        start += len(chunk)
+    points.flush()
+    del points
+
+
+# the layout files in this directory and the layouts that make them
+LAYOUT_FILES = [
+    ('wall.json', Wall()),
+    ('freespace.json', Freespace()),
+    ('willow_tree.json', WillowTree()),
+    ('circle_r1_50x.json', Circle(1, 50)),
+    ('cylinder_r1_h1_64x20.json', Cylinder(1, 1, 64)),
+    # despite its name, 10 rings of 32 spanning z = -1 to 1
+    ('cylinder_r1_h2_32x20.json', Cylinder(1, 1, 32, 10)),
+    ('cylinder_r2_h0.5_128x10.json', Cylinder(2, 0.5, 128)),
+]
+
+
+class _Text(object):
+    """Collects what write_json writes, to compare with an existing file."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append(text)
+
+
+def generate_all(directory, check=False):
+    """Write every file in LAYOUT_FILES, or check them.  Returns False on a mismatch."""
+    ok = True
+    for name, layout in LAYOUT_FILES:
+        path = os.path.join(directory, name)
+        if check:
+            text = _Text()
+            write_json(layout, text)
+            with open(path) as f:
+                same = f.read() == ''.join(text.parts)
+            sys.stderr.write('%-32s %s\n' % (name, 'ok' if same else 'DIFFERS'))
+            ok = ok and same
+        else:
+            with open(path, 'w') as f:
+                write_json(layout, f)
+            sys.stderr.write('wrote %s (%d points)\n' % (path, layout.n_points))
+    return ok
+
+
+def main(argv):
+    parser = optparse.OptionParser(
+        usage='%prog wall|freespace|willow_tree|circle|cylinder|all [options]')
+    parser.add_option('-o', '--output', dest='output',
+                        action='store', type='string',
+                        help='JSON file to write, instead of standard output')
+    parser.add_option('--binary', dest='binary',
+                        action='store', type='string',
+                        help='also write the points to this .npy file')
+    parser.add_option('--radius', dest='radius', default=1,
+                        action='store', type='float',
+                        help='radius of a cylinder or circle. default = 1')
+    parser.add_option('--height', dest='height', default=1,
+                        action='store', type='float',
+                        help='height of a cylinder.  default = 1')
+    parser.add_option('--n_around', dest='n_around', default=32,
+                        action='store', type='int',
+                        help='number of pixels around a cylinder or circle.  default = 32')
+    parser.add_option('--n_tall', dest='n_tall',
+                        action='store', type='int',
+                        help='number of pixels from top to bottom of a cylinder. (optional)')
+    parser.add_option('--columns', dest='columns',
+                        action='store', type='int',
+                        help='columns of a wall or freespace')
+    parser.add_option('--rows', dest='rows',
+                        action='store', type='int',
+                        help='rows of a wall or freespace')
+    parser.add_option('--check', dest='check', default=False,
+                        action='store_true',
+                        help='with "all", compare the layout files instead of writing them')
+    options, args = parser.parse_args(argv)
+    if len(args) != 1:
+        parser.error('expected one layout name')
+    kind = args[0]
+
+    if kind == 'all':
+        directory = os.path.dirname(os.path.abspath(__file__))
+        return 0 if generate_all(directory, options.check) else 1
+
+    grid = {}
+    if options.columns:
+        grid['columns'] = options.columns
+    if options.rows:
+        grid['rows'] = options.rows
+    if kind == 'wall':
+        layout = Wall(**grid)
+    elif kind == 'freespace':
+        layout = Freespace(**grid)
+    elif kind == 'willow_tree':
+        layout = WillowTree()
+    elif kind == 'circle':
+        layout = Circle(options.radius, options.n_around)
+    elif kind == 'cylinder':
+        layout = Cylinder(options.radius, options.height, options.n_around, options.n_tall)
+    else:
+        parser.error('unknown layout %r' % kind)
+
+    if options.output:
+        with open(options.output, 'w') as f:
+            write_json(layout, f)
+    else:
+        write_json(layout, sys.stdout)
+    if options.binary:
+        write_binary(layout, options.binary)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,10 +1,11 @@
 #!/usr/bin/env python
 
 from __future__ import division
-import math
 import optparse
 import sys
 
+import generate
+
 
 #-------------------------------------------------------------------------------
 # command line
@@ -29,38 +30,14 @@ parser.add_option('--n_tall', dest='n_tall',
                     help='number of pixels from top to bottom. (optional)')
 options, args = parser.parse_args()
 
-# figure out how many pixels are needed around the cylinder
-# in order to get square pixels
-if not options.n_tall:
-    options.n_tall = int(options.n_around * options.height / options.radius / math.pi)
-
-options.n_tall = max(1, options.n_tall)
+cylinder = generate.Cylinder(options.radius, options.height,
+                             options.n_around, options.n_tall)
 
 #-------------------------------------------------------------------------------
 # make cylinder
 
-result = ['[']
-for ii in range(options.n_tall):
-    if options.n_tall == 1:
-        z = 0
-    else:
-        z = (ii / (options.n_tall-1)) * 2 - 1
-    z *= options.height
-
-    for jj in range(options.n_around):
-        theta = jj / options.n_around * math.pi * 2
-        x = math.sin(theta) * options.radius
-        y = math.cos(theta) * options.radius
-
-        result.append('  {"point": [%.4f, %.4f, %.4f]},' % (x, y, z))
-
-# trim off last comma
-result[-1] = result[-1][:-1]
-
-result.append(']')
-print '\n'.join(result)
-
-sys.stderr.write('\nn_around = %s\n' % options.n_around)
-sys.stderr.write('n_tall = %s\n' % options.n_tall)
-sys.stderr.write('total = %s\n\n' % (options.n_tall*options.n_around))
+generate.write_json(cylinder, sys.stdout)
 
+sys.stderr.write('\nn_around = %s\n' % cylinder.n_around)
+sys.stderr.write('n_tall = %s\n' % cylinder.n_tall)
+sys.stderr.write('total = %s\n\n' % cylinder.n_points)
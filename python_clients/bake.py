@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+
+"""Bake periodic patterns into a cache of frames and play them from it.
+
+Many patterns are sums and products of cosines with fixed periods, so
+their output repeats exactly after the least common multiple of those
+periods.  A BakedPattern renders each frame of one loop the first time
+it's needed (or all at once, with bake()) and keeps it, zlib compressed,
+in a FrameCache.  From then on a frame costs one dictionary lookup and a
+decompress, whatever the pattern costs to render.
+
+Recommended use:
+
+    import bake
+
+    cache = bake.FrameCache(max_bytes=64 << 20)
+    period = bake.loop_period(7, 13, 19, 60)   # seconds, from the pattern
+    pattern = bake.BakedPattern(render, period, fps=20, cache=cache)
+    while True:
+        client.put_pixels(pattern.frame(time.time() - start_time), channel=0)
+        clock.tick()
+
+render(t) returns a frame of pixels in any form opc.Client.put_pixels
+accepts.  Time is snapped to the nearest frame of the loop, so a baked
+pattern only ever shows the frames of one fixed grid of fps per second.
+
+Check the loop length before baking: with speeds of 7, -13 and 19 seconds
+and a 60 second stripe cycle, raver plaid only repeats after
+lcm(7, 13, 19, 60) = 103740 seconds, which is two million frames at 20
+fps.  A cache that can't hold a whole loop still works, but it evicts
+every frame before it comes round again, so nothing is gained.
+
+"""
+
+from __future__ import division
+import collections
+import fractions
+import zlib
+
+import opc
+
+
+def _fraction(value):
+    """Return value as an exact Fraction, taking floats at their decimal value."""
+    if isinstance(value, float):
+        return fractions.Fraction(repr(value)).limit_denominator(1000000)
+    return fractions.Fraction(value)
+
+def _lcm(a, b):
+    """Return the least common multiple of two positive Fractions."""
+    numerator = a.numerator * b.numerator // _gcd(a.numerator, b.numerator)
+    return fractions.Fraction(numerator, _gcd(a.denominator, b.denominator))
+
+def _gcd(a, b):
+    while b:
+        a, b = b, a % b
+    return a
+
+def loop_period(*periods):
+    """Return the period in seconds of a sum or product of periodic terms.
+
+    Each argument is the period of one term, in seconds; the sign is
+    ignored, so speeds like raver plaid's -13 can be passed as they are.
+    The result is a Fraction.
+
+    """
+    result = fractions.Fraction(1)
+    first = True
+    for period in periods:
+        period = abs(_fraction(period))
+        if period == 0:
+            raise ValueError('periods must not be zero')
+        result = period if first else _lcm(result, period)
+        first = False
+    if first:
+        raise ValueError('loop_period needs at least one period')
+    return result
+
+def loop_frames(period, fps):
+    """Return how many frames at fps make up a whole number of loops.
+
+    If period isn't a whole number of frames long, the loop is extended
+    to the first multiple of period that is, so it still repeats exactly.
+
+    """
+    loop = _lcm(_fraction(period), 1 / _fraction(fps))
+    return int(loop * _fraction(fps))
+
+
+class FrameCache(object):
+
+    def __init__(self, max_bytes=64 << 20, level=1):
+        """A least recently used cache of compressed frames.
+
+        Frames from any number of patterns share the one budget of
+        max_bytes of compressed data; when it's full, the frame that was
+        used least recently is evicted, whichever pattern it belongs to.
+        level is the zlib compression level: 1 is fast and still shrinks
+        smooth patterns several times over.
+
+        """
+        self.max_bytes = max_bytes
+        self.level = level
+        self._frames = collections.OrderedDict()  # (key, index) -> (compressed, length)
+        self.bytes = 0
+        self.raw_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __contains__(self, key_index):
+        return key_index in self._frames
+
+    def get(self, key, index):
+        """Return the bytes of a cached frame, or None if it isn't cached."""
+        entry = self._frames.pop((key, index), None)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._frames[(key, index)] = entry
+        self.hits += 1
+        return zlib.decompress(entry[0])
+
+    def put(self, key, index, frame):
+        """Compress and cache a frame's bytes, evicting old frames as needed."""
+        self._drop((key, index))
+        self._frames[(key, index)] = (zlib.compress(frame, self.level), len(frame))
+        self.bytes += len(self._frames[(key, index)][0])
+        self.raw_bytes += len(frame)
+        while self.bytes > self.max_bytes and len(self._frames) > 1:
+            self._drop(next(iter(self._frames)))
+            self.evictions += 1
+
+    def clear(self, key=None):
+        """Drop every frame, or only the frames of one pattern."""
+        for key_index in list(self._frames):
+            if key is None or key_index[0] == key:
+                self._drop(key_index)
+
+    def _drop(self, key_index):
+        entry = self._frames.pop(key_index, None)
+        if entry is not None:
+            self.bytes -= len(entry[0])
+            self.raw_bytes -= entry[1]
+
+    def stats(self):
+        return {
+            'frames': len(self._frames),
+            'bytes': self.bytes,
+            'raw_bytes': self.raw_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+class BakedPattern(object):
+
+    def __init__(self, render, period, fps, cache=None, key=None):
+        """Play render(t) from a cache of the frames of one loop.
+
+        period is the pattern's loop length in seconds, as declared by the
+        pattern or worked out with loop_period().  The loop is cut into
+        frames at fps frames per second.  cache is a FrameCache, which may
+        be shared with other patterns; by default each pattern gets its
+        own.  key tells this pattern's frames apart in a shared cache, and
+        defaults to the render function itself.  Either way the fps and
+        the number of frames are part of the key, since frames baked on
+        one grid are no use on another.
+
+        """
+        self.render = render
+        self.fps = fps
+        self.n_frames = loop_frames(period, fps)
+        self.period = self.n_frames / fps
+        self.cache = cache if cache is not None else FrameCache()
+        self.key = (key if key is not None else render, fps, self.n_frames)
+
+    def index(self, t):
+        """Return the index in the loop of the frame to show at time t."""
+        return int(round(t * self.fps)) % self.n_frames
+
+    def frame(self, t):
+        """Return the bytes of the frame for time t, rendering it if needed."""
+        ii = self.index(t)
+        data = self.cache.get(self.key, ii)
+        if data is None:
+            data = self._render(ii)
+        return data
+
+    def bake(self, progress=None):
+        """Render every frame of the loop that isn't already cached.
+
+        progress, if given, is called as progress(done, total) after each
+        frame.
+
+        """
+        for ii in range(self.n_frames):
+            if (self.key, ii) not in self.cache:
+                self._render(ii)
+            if progress is not None:
+                progress(ii + 1, self.n_frames)
+
+    def save(self, path, channel=0):
+        """Write one loop as an opc_record recording, for opc_record.py play --loop."""
+        import opc_record
+
+        recorder = opc_record.Recorder(path)
+        for ii in range(self.n_frames):
+            data = self.frame(ii / self.fps)
+            recorder.record([opc.make_header(channel, len(data)), data], ii / self.fps)
+        recorder.close()
+
+    def _render(self, ii):
+        data = memoryview(opc.encode_pixels(self.render(ii / self.fps))).tobytes()
+        self.cache.put(self.key, ii, data)
+        return data
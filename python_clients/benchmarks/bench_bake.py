@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+"""Benchmark bake.BakedPattern against rendering every frame.
+
+Uses raver plaid with its color speeds rounded to 6, -12 and 20 seconds,
+so that with the 20 and 60 second stripe cycles the whole pattern loops
+every 60 seconds instead of every 103740.  Bakes one loop, then times a
+frame rendered pixel by pixel as raver_plaid.py does against a frame
+fetched from the cache.
+
+    python_clients/benchmarks/bench_bake.py -n 1250 --fps 20
+
+"""
+
+from __future__ import division
+import math
+import optparse
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+
+import bake
+import color_utils
+import opc
+
+speed_r, speed_g, speed_b = 6, -12, 20
+freq = 24
+
+
+def plaid_scalar(t, n_pixels):
+    """Raver plaid, one pixel at a time, as in raver_plaid.py."""
+    pixels = []
+    for ii in range(n_pixels):
+        pct = ii / n_pixels
+        pct_jittered = (pct * 77) % 37
+        blackstripes = color_utils.cos(pct_jittered, offset=t*0.05, period=1, minn=-1.5, maxx=1.5)
+        blackstripes_offset = color_utils.cos(t, offset=0.9, period=60, minn=-0.5, maxx=3)
+        blackstripes = color_utils.clamp(blackstripes + blackstripes_offset, 0, 1)
+        pixels.append((blackstripes * color_utils.remap(math.cos((t/speed_r + pct*freq)*math.pi*2), -1, 1, 0, 256),
+                       blackstripes * color_utils.remap(math.cos((t/speed_g + pct*freq)*math.pi*2), -1, 1, 0, 256),
+                       blackstripes * color_utils.remap(math.cos((t/speed_b + pct*freq)*math.pi*2), -1, 1, 0, 256)))
+    return pixels
+
+def plaid_array(t, pct, pct_jittered, out):
+    """The same frame with color_utils' array mode."""
+    blackstripes = color_utils.cos(pct_jittered, offset=t*0.05, period=1, minn=-1.5, maxx=1.5)
+    blackstripes += color_utils.cos(t, offset=0.9, period=60, minn=-0.5, maxx=3)
+    color_utils.clamp(blackstripes, 0, 1, out=blackstripes)
+    for channel, speed in [(0, speed_r), (1, speed_g), (2, speed_b)]:
+        color = out[:, channel]
+        color_utils.cos(pct*freq, offset=-t/speed, out=color)
+        color *= 256
+        color *= blackstripes
+    return out
+
+
+parser = optparse.OptionParser()
+parser.add_option('-n', '--num_pixels', dest='num_pixels', default=1250,
+                    action='store', type='int', help='number of pixels')
+parser.add_option('--fps', dest='fps', default=20,
+                    action='store', type='int', help='frames per second of the loop')
+parser.add_option('-r', '--repeat', dest='repeat', default=5,
+                    action='store', type='int', help='timing repeats')
+parser.add_option('--count', dest='count', default=200,
+                    action='store', type='int', help='frames per repeat')
+options, args = parser.parse_args()
+
+n = options.num_pixels
+pct = numpy.arange(n) / n
+pct_jittered = (pct * 77) % 37
+out = numpy.empty((n, 3))
+
+period = bake.loop_period(speed_r, speed_g, speed_b, 20, 60)
+pattern = bake.BakedPattern(lambda t: plaid_array(t, pct, pct_jittered, out),
+                            period, options.fps, bake.FrameCache(256 << 20))
+start = time.time()
+pattern.bake()
+baking = time.time() - start
+stats = pattern.cache.stats()
+
+def best_time(func, number):
+    return min(timeit.repeat(func, repeat=options.repeat, number=number)) / number * 1e6
+
+t = 12.3
+expected = opc.encode_pixels(plaid_scalar(round(t * options.fps) / options.fps, n))
+if numpy.abs(numpy.frombuffer(pattern.frame(t), numpy.uint8).astype(int) - expected).max() > 1:
+    sys.exit('baked frame does not match raver plaid')
+
+print('raver plaid with a %s second loop: %d frames of %d pixels' % (period, pattern.n_frames, n))
+print('baked in %.2f s into %.1f MB (%.1fx compression)' % (
+    baking, stats['bytes'] / 1e6, stats['raw_bytes'] / stats['bytes']))
+print('')
+print('%-28s %10s' % ('path', 'us/frame'))
+times = [0]
+def next_frame():
+    times[0] += 1 / options.fps
+    return pattern.frame(times[0])
+print('%-28s %10.1f' % ('render pixel by pixel', best_time(lambda: plaid_scalar(t, n), max(1, options.count // 50))))
+print('%-28s %10.1f' % ('render with arrays', best_time(lambda: plaid_array(t, pct, pct_jittered, out), options.count)))
+print('%-28s %10.1f' % ('baked lookup', best_time(next_frame, options.count)))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+"""Time the array mode of color_utils.
+
+Times one raver_plaid frame computed pixel by pixel against the same
+frame computed with array calls, after checking that the two frames
+match.  test_color_utils.py checks each function's array results
+against its scalar ones.
+
+    python_clients/benchmarks/bench_color_utils.py -n 1250
+
+"""
+
+from __future__ import division
+import math
+import optparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+
+import color_utils
+
+
+def check(name, scalar_results, array_result):
+    expected = numpy.array(scalar_results, dtype=float)
+    if not numpy.allclose(expected, array_result, rtol=1e-9, atol=1e-9):
+        sys.exit('FAILED: %s array results differ from scalar results' % name)
+    print('    ok  %s' % name)
+
+#-------------------------------------------------------------------------------
+# raver plaid, as in raver_plaid.py
+
+freq_r, freq_g, freq_b = 24, 24, 24
+speed_r, speed_g, speed_b = 7, -13, 19
+
+def plaid_scalar(t, n_pixels):
+    pixels = []
+    for ii in range(n_pixels):
+        pct = ii / n_pixels
+        pct_jittered = (pct * 77) % 37
+        blackstripes = color_utils.cos(pct_jittered, offset=t*0.05, period=1, minn=-1.5, maxx=1.5)
+        blackstripes_offset = color_utils.cos(t, offset=0.9, period=60, minn=-0.5, maxx=3)
+        blackstripes = color_utils.clamp(blackstripes + blackstripes_offset, 0, 1)
+        r = blackstripes * color_utils.remap(math.cos((t/speed_r + pct*freq_r)*math.pi*2), -1, 1, 0, 256)
+        g = blackstripes * color_utils.remap(math.cos((t/speed_g + pct*freq_g)*math.pi*2), -1, 1, 0, 256)
+        b = blackstripes * color_utils.remap(math.cos((t/speed_b + pct*freq_b)*math.pi*2), -1, 1, 0, 256)
+        pixels.append((r, g, b))
+    return pixels
+
+def plaid_array(t, pct, pct_jittered, out):
+    blackstripes = color_utils.cos(pct_jittered, offset=t*0.05, period=1, minn=-1.5, maxx=1.5)
+    blackstripes += color_utils.cos(t, offset=0.9, period=60, minn=-0.5, maxx=3)
+    color_utils.clamp(blackstripes, 0, 1, out=blackstripes)
+    for channel, freq, speed in [(0, freq_r, speed_r), (1, freq_g, speed_g), (2, freq_b, speed_b)]:
+        color = out[:, channel]
+        color_utils.cos(pct*freq, offset=-t/speed, out=color)
+        color *= 256
+        color *= blackstripes
+    return out
+
+
+parser = optparse.OptionParser()
+parser.add_option('-n', '--num_pixels', dest='num_pixels', default=1250,
+                    action='store', type='int', help='number of pixels')
+parser.add_option('-r', '--repeat', dest='repeat', default=5,
+                    action='store', type='int', help='timing repeats')
+parser.add_option('-c', '--count', dest='count', default=20,
+                    action='store', type='int', help='frames per repeat')
+options, args = parser.parse_args()
+
+n = options.num_pixels
+pct = numpy.arange(n) / n
+pct_jittered = (pct * 77) % 37
+out = numpy.empty((n, 3))
+t = 12.34
+check('raver plaid frame', plaid_scalar(t, n), plaid_array(t, pct, pct_jittered, out))
+
+print('')
+print('raver plaid, %d pixels, best of %d x %d frames' % (n, options.repeat, options.count))
+scalar = min(timeit.repeat(lambda: plaid_scalar(t, n),
+                           repeat=options.repeat, number=options.count)) / options.count
+array = min(timeit.repeat(lambda: plaid_array(t, pct, pct_jittered, out),
+                          repeat=options.repeat, number=options.count)) / options.count
+print('    scalar %10.1f us/frame' % (scalar * 1e6))
+print('    array  %10.1f us/frame  (%.1fx)' % (array * 1e6, scalar / array))
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+"""Time compositor.Compositor frames and measure what they allocate.
+
+Blends a stack of constant-color layers (so only the compositing is
+measured, not the patterns) in every blend mode, with a crossfade
+running, and compares the time per frame with the same blends written
+as ordinary numpy expressions.  On Python 3 it also reports the most
+memory allocated at once while rendering, which for the compositor is a
+few hundred bytes of Python objects and no frame-sized arrays.
+
+    python_clients/benchmarks/bench_compositor.py -n 10000 --layers 4
+
+"""
+
+from __future__ import division
+import itertools
+import optparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+
+import compositor
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None  # Python 2
+
+
+class FakeLayout(object):
+    def __init__(self, n_pixels):
+        self.n_pixels = n_pixels
+
+def constant(colors):
+    def render(t, out):
+        out[...] = colors
+    return render
+
+def naive_frame(colors, modes, opacity):
+    """The same blends as expressions, allocating temporaries as it goes."""
+    frame = numpy.zeros_like(colors[0])
+    for src, mode in zip(colors, modes):
+        src = numpy.clip(src, 0, 255)
+        if mode == 'add':
+            frame = frame + src * opacity
+            continue
+        if mode == 'normal':
+            blended = src
+        elif mode == 'multiply':
+            blended = frame * src / 255
+        else:
+            blended = frame + src - frame * src / 255
+        frame = frame + (blended - frame) * opacity
+    return numpy.clip(frame, 0, 255).astype(numpy.uint8)
+
+def best_time(func, repeat, number):
+    """Return the best time for one call to func, in microseconds."""
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number * 1e6
+
+def peak_allocated(func, number):
+    """Return the most memory allocated at once during number calls, in bytes."""
+    func()
+    tracemalloc.start()
+    for ii in range(number):
+        func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+parser = optparse.OptionParser()
+parser.add_option('-n', '--num_pixels', dest='num_pixels', default=10000,
+                    action='store', type='int', help='pixels per frame')
+parser.add_option('--layers', dest='layers', default=4,
+                    action='store', type='int', help='layers to blend')
+parser.add_option('-r', '--repeat', dest='repeat', default=5,
+                    action='store', type='int', help='timing repeats')
+parser.add_option('--count', dest='count', default=200,
+                    action='store', type='int', help='frames per repeat')
+options, args = parser.parse_args()
+
+random = numpy.random.RandomState(0)
+modes = [compositor.BLEND_MODES[ii % len(compositor.BLEND_MODES)] for ii in range(options.layers)]
+colors = [random.uniform(-20, 275, (options.num_pixels, 3)).astype(numpy.float32)
+          for mode in modes]
+
+comp = compositor.Compositor(FakeLayout(options.num_pixels))
+for color, mode in zip(colors, modes):
+    comp.add_layer(constant(color), mode=mode, opacity=0.75)
+
+comp.render(0)
+expected = naive_frame(colors, modes, 0.75)
+if numpy.abs(comp.encode().astype(int) - expected).max() > 1:
+    sys.exit('FAILED: compositor frame differs from the numpy expressions')
+
+# keep the bottom layer crossfading for the whole run
+comp.layers[0].fade_to(constant(colors[-1]), 1e9, easing='smoothstep')
+frames = itertools.count()
+
+def composite():
+    comp.render(next(frames) / 60)
+    comp.encode()
+
+print('%d pixels, %d layers (%s), bottom layer crossfading' % (
+    options.num_pixels, options.layers, ', '.join(modes)))
+print('%-12s %12s %14s' % ('', 'us/frame', 'peak bytes'))
+for name, func in [('numpy exprs', lambda: naive_frame(colors, modes, 0.75)),
+                   ('compositor', composite)]:
+    us = best_time(func, options.repeat, options.count)
+    if tracemalloc is None:
+        print('%-12s %12.1f %14s' % (name, us, '-'))
+    else:
+        print('%-12s %12.1f %14d' % (name, us, peak_allocated(func, options.count)))
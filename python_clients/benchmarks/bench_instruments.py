@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+"""Micro-benchmark for opc.Instruments.
+
+Times put_pixels and put_frame with and without instruments, over a
+socketpair drained by a thread so that the network costs little, which
+makes the instruments' share as large as it can be.  Also times a bare
+Histogram.add.
+
+    python_clients/benchmarks/bench_instruments.py [-c 8] [-n 512]
+
+"""
+
+from __future__ import division
+import optparse
+import os
+import socket
+import sys
+import threading
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+
+import opc
+
+
+def drain(sock):
+    while sock.recv(1 << 16):
+        pass
+
+def best_time(func, repeat, number):
+    """Return the best time for one call to func, in microseconds."""
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number * 1e6
+
+
+parser = optparse.OptionParser()
+parser.add_option('-c', '--channels', dest='channels', default=8,
+                    action='store', type='int', help='number of channels for put_frame')
+parser.add_option('-n', '--num_pixels', dest='num_pixels', default=512,
+                    action='store', type='int', help='pixels per channel')
+parser.add_option('-r', '--repeat', dest='repeat', default=7,
+                    action='store', type='int', help='timing repeats')
+parser.add_option('--count', dest='count', default=2000,
+                    action='store', type='int', help='calls per repeat')
+options, args = parser.parse_args()
+
+client_sock, server_sock = socket.socketpair()
+drainer = threading.Thread(target=drain, args=(server_sock,))
+drainer.daemon = True
+drainer.start()
+
+plain = opc.Client('localhost:7890')
+plain._socket = client_sock
+instruments = opc.Instruments()
+instrumented = opc.Client('localhost:7890', instruments=instruments)
+instrumented._socket = client_sock
+
+pixels = numpy.random.randint(0, 256, (options.num_pixels, 3)).astype(numpy.uint8)
+frame = numpy.random.randint(0, 256, (options.channels, options.num_pixels, 3)).astype(numpy.uint8)
+
+print('%d channels x %d pixels of uint8, best of %d x %d calls' % (
+    options.channels, options.num_pixels, options.repeat, options.count))
+print('%-12s %10s %10s %10s' % ('', 'off us', 'on us', 'added us'))
+for name, call in [('put_pixels', lambda client: client.put_pixels(pixels)),
+                   ('put_frame', lambda client: client.put_frame(frame))]:
+    off = best_time(lambda: call(plain), options.repeat, options.count)
+    on = best_time(lambda: call(instrumented), options.repeat, options.count)
+    print('%-12s %10.2f %10.2f %10.2f' % (name, off, on, on - off))
+
+histogram = opc.Histogram(1e-6, 10)
+add = best_time(lambda: histogram.add(0.00123), options.repeat, options.count)
+print('%-12s %21.2f' % ('Histogram.add', add))
+print('')
+print('encode p50 %.1f us, send p50 %.1f us over %d frames' % (
+    instruments.timings['encode'].percentile(50) * 1e6,
+    instruments.timings['send'].percentile(50) * 1e6, instruments.frames))
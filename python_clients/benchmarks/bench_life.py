@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+
+"""Benchmark life.Board against the list based Game of Life conway.py used.
+
+Times one step of the old engine at 25x25 and of the numpy engine,
+unpacked and bit-packed, on boards up to --size cells square.  The two
+don't agree cell for cell: the old count_cell_neighbor counted each cell
+as its own neighbour, so it never quite played Conway's rules.
+
+    python_clients/benchmarks/bench_life.py --size 1024
+
+"""
+
+from __future__ import division
+import optparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import life
+
+X_DIM = Y_DIM = 25
+
+
+def legacy_count_cell_neighbor(x, y, board):
+    neighbor_count = 0
+    for nei_x in range(3):
+        if (x == 0 and nei_x == 0) or (x == (X_DIM-1) and nei_x == 2):
+            continue
+        for nei_y in range(3):
+            if (y == 0 and nei_y == 0) or (y == (Y_DIM-1) and nei_y == 2):
+                continue
+            if board[(x-1+nei_x)*X_DIM+y-1+nei_y] == 1:
+                neighbor_count += 1
+    return neighbor_count
+
+def legacy_tick(board):
+    """conway.tick as it was, on a flat list of 0s and 1s."""
+    new_board = [0] * X_DIM * Y_DIM
+    for x in range(X_DIM):
+        for y in range(Y_DIM):
+            n = legacy_count_cell_neighbor(x, y, board)
+            if n == 3 or (n == 2 and board[x*X_DIM+y] == 1):
+                new_board[x*X_DIM+y] = 1
+    return new_board
+
+def best_time(func, repeat, number):
+    """Return the best time for one call to func, in milliseconds."""
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number * 1e3
+
+
+parser = optparse.OptionParser()
+parser.add_option('--size', dest='size', default=1024,
+                    action='store', type='int', help='largest board size, a multiple of 64')
+parser.add_option('-r', '--repeat', dest='repeat', default=3,
+                    action='store', type='int', help='timing repeats')
+options, args = parser.parse_args()
+
+board = life.Board(X_DIM, Y_DIM, wrap=False)
+board.randomize(0.25, seed=0)
+cells = board.cells.reshape(-1).tolist()
+
+print('%-28s %12s' % ('engine', 'ms/step'))
+print('%-28s %12.3f' % ('lists, 25x25', best_time(lambda: legacy_tick(cells), options.repeat, 20)))
+for size in sorted(set([64, 256, options.size])):
+    for packed in (False, True):
+        board = life.Board(size, size, packed=packed)
+        board.randomize(0.25, seed=0)
+        name = 'numpy%s, %dx%d' % (' packed' if packed else '', size, size)
+        print('%-28s %12.3f' % (name, best_time(board.step, options.repeat, 20)))
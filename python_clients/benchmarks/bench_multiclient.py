@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+
+"""Benchmark opc.MultiClient against sending to each server in turn.
+
+Starts --servers receivers in child processes, each standing in for a
+controller that can only take --bandwidth bytes per second (as a
+microcontroller on USB or wifi does), splits a frame of --num_pixels
+evenly between them, and measures frames per second sending each part
+in turn with one Client per server, and sending them all at once with a
+MultiClient.  Every frame is waited for until it has all arrived.
+
+The receivers read through small socket buffers, so a send to one of
+them waits until it has taken most of its part.  With parts smaller than
+the buffers the kernel hides most of the difference.
+
+    python_clients/benchmarks/bench_multiclient.py --servers 4 -n 84000
+
+"""
+
+from __future__ import division
+import multiprocessing
+import optparse
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+
+import opc
+
+now = getattr(time, 'monotonic', time.time)
+
+
+def slow_receiver(listener, bandwidth, count):
+    """Accept one connection and read it at bandwidth bytes per second."""
+    sock = listener.accept()[0]
+    buf = bytearray(4096)
+    ready = now()
+    received = 0
+    while True:
+        n = sock.recv_into(buf)
+        if not n:
+            return
+        received += n
+        count.value = received
+        # take as long over these bytes as the link would, without saving
+        # up time while idle to read a burst faster later
+        ready = max(ready, now()) + n / bandwidth
+        delay = ready - now()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class Receiver(object):
+
+    def __init__(self, bandwidth):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # a small receive buffer, as a microcontroller has
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8192)
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(1)
+        self.address = '%s:%d' % listener.getsockname()
+        self.count = multiprocessing.Value('d', 0, lock=False)
+        self.process = multiprocessing.Process(target=slow_receiver,
+                                               args=(listener, bandwidth, self.count))
+        self.process.daemon = True
+        self.process.start()
+        listener.close()
+
+    def wait_for(self, n_bytes, timeout=30):
+        deadline = now() + timeout
+        while self.count.value < n_bytes and now() < deadline:
+            time.sleep(0.0002)
+
+    def close(self):
+        self.process.terminate()
+
+
+def connect(clients):
+    """Connect each client with a small send buffer, so that, as with a
+    real controller's small TCP window, a send waits for the receiver."""
+    for client in clients:
+        client.can_connect()
+        client._socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 8192)
+
+def run(put, receivers, part_bytes, frames):
+    """Return frames per second for frames calls to put, each waited for."""
+    started = now()
+    for ii in range(1, frames + 1):
+        put()
+        for receiver in receivers:
+            receiver.wait_for(ii * part_bytes)
+    return frames / (now() - started)
+
+
+parser = optparse.OptionParser()
+parser.add_option('--servers', dest='servers', default=4,
+                    action='store', type='int', help='number of servers')
+parser.add_option('-n', '--num_pixels', dest='num_pixels', default=84000,
+                    action='store', type='int', help='pixels per frame, split between the servers')
+parser.add_option('--bandwidth', dest='bandwidth', default=5e6,
+                    action='store', type='float', help='bytes per second each server can receive')
+parser.add_option('--frames', dest='frames', default=20,
+                    action='store', type='int', help='frames to send')
+options, args = parser.parse_args()
+
+per_server = options.num_pixels // options.servers
+pixels = numpy.random.randint(0, 256, (per_server * options.servers, 3)).astype(numpy.uint8)
+part_bytes = 4 + per_server * 3
+
+print('%d servers x %d pixels (%d bytes each), %.1f MB/s each, %d frames' % (
+    options.servers, per_server, part_bytes, options.bandwidth / 1e6, options.frames))
+print('%-14s %10s %12s' % ('', 'fps', 'ms/frame'))
+
+receivers = [Receiver(options.bandwidth) for ii in range(options.servers)]
+clients = [opc.Client(receiver.address) for receiver in receivers]
+connect(clients)
+def one_at_a_time():
+    for ii, client in enumerate(clients):
+        client.put_pixels(pixels[ii*per_server:(ii+1)*per_server])
+fps = run(one_at_a_time, receivers, part_bytes, options.frames)
+print('%-14s %10.1f %12.1f' % ('one at a time', fps, 1000 / fps))
+for receiver in receivers:
+    receiver.close()
+
+receivers = [Receiver(options.bandwidth) for ii in range(options.servers)]
+multi = opc.MultiClient(dict(((ii*per_server, (ii+1)*per_server), receiver.address)
+                             for ii, receiver in enumerate(receivers)))
+connect(multi.clients.values())
+fps = run(lambda: multi.put_pixels(pixels), receivers, part_bytes, options.frames)
+print('%-14s %10.1f %12.1f' % ('MultiClient', fps, 1000 / fps))
+print('%-14s %10.1f %12.1f' % ('ideal', options.bandwidth / part_bytes,
+                               1000 * part_bytes / options.bandwidth))
+multi.close()
+for receiver in receivers:
+    receiver.close()
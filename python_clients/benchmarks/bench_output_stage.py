@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+
+"""Micro-benchmark for opc.OutputStage.
+
+Times gamma, brightness, color order and power limiting on an encoded
+frame, both the vectorized lookup table path and the per-byte Python loop
+it replaces, and then the cost it adds to a put_frame call.
+
+    python_clients/benchmarks/bench_output_stage.py [-c 40] [-n 34]
+
+"""
+
+from __future__ import division
+import optparse
+import os
+import socket
+import sys
+import threading
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+
+import opc
+
+
+def drain(sock):
+    while sock.recv(1 << 16):
+        pass
+
+def best_time(func, repeat, number):
+    """Return the best time for one call to func, in microseconds."""
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number * 1e6
+
+def python_stage(payload, gamma, brightness, max_power):
+    """The straightforward per-byte version, for comparison."""
+    out = bytearray(len(payload))
+    for ii, value in enumerate(bytearray(payload)):
+        out[ii] = min(255, int(round(255 * brightness * (value / 255) ** gamma)))
+    for ii in range(0, len(out) - 2, 3):
+        out[ii], out[ii+1] = out[ii+1], out[ii]  # GRB
+    total = sum(out)
+    budget = max_power * 255 * len(out)
+    if total > budget:
+        out = bytearray(int(value * budget / total) for value in out)
+    return out
+
+
+parser = optparse.OptionParser()
+parser.add_option('-c', '--channels', dest='channels', default=40,
+                    action='store', type='int', help='number of channels')
+parser.add_option('-n', '--num_pixels', dest='num_pixels', default=34,
+                    action='store', type='int', help='pixels per channel')
+parser.add_option('-r', '--repeat', dest='repeat', default=5,
+                    action='store', type='int', help='timing repeats')
+parser.add_option('--count', dest='count', default=200,
+                    action='store', type='int', help='calls per repeat')
+options, args = parser.parse_args()
+
+gamma, brightness, max_power = 2.2, 0.8, 0.3
+stage = opc.OutputStage(gamma, brightness, 'GRB', max_power)
+frame = numpy.random.uniform(0, 255, (options.channels, options.num_pixels, 3))
+payload = opc.encode_pixels(frame[0])
+
+expected = python_stage(payload, gamma, brightness, max_power)
+got = stage.apply(payload)
+if numpy.abs(numpy.frombuffer(bytes(expected), numpy.uint8).astype(int) - got).max() > 1:
+    sys.exit('OutputStage does not match the Python version')
+
+client_sock, server_sock = socket.socketpair()
+drainer = threading.Thread(target=drain, args=(server_sock,))
+drainer.daemon = True
+drainer.start()
+plain = opc.Client('localhost:7890')
+plain._socket = client_sock
+staged = opc.Client('localhost:7890', output_stage=stage)
+staged._socket = client_sock
+
+print('%d channels x %d pixels, best of %d x %d calls' % (
+    options.channels, options.num_pixels, options.repeat, options.count))
+print('')
+print('%-32s %10s' % ('path', 'us'))
+for name, func, count in [
+        ('python loop, one channel', lambda: python_stage(payload, gamma, brightness, max_power),
+         max(1, options.count // 20)),
+        ('OutputStage.apply, one channel', lambda: stage.apply(payload), options.count),
+        ('put_frame without stage', lambda: plain.put_frame(frame), options.count),
+        ('put_frame with stage', lambda: staged.put_frame(frame), options.count),
+        ]:
+    print('%-32s %10.1f' % (name, best_time(func, options.repeat, count)))
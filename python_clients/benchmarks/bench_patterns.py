@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+
+"""Check and time the blobby patterns of patterns.py against pixel by
+pixel versions.
+
+lava_lamp.py, miami.py, nyan_cat.py and the willow tree's lava lamp in
+tree_patterns.py used to compute each pixel's color one at a time,
+warping its coordinates all over again every frame.  They now run the
+patterns in patterns.py, which do the warp once per layout, in @prepare
+functions, and render only what changes with t, for all the pixels at
+once.  The pixel by pixel color functions the scripts had are kept here
+as the reference.
+
+First checks that each pattern renders the same frame as its
+reference, and exits with an error if not.  Then times a frame three
+ways: pixel by pixel, with the arrays but preparing every frame, and as
+the patterns run.
+
+    python_clients/benchmarks/bench_patterns.py -l layouts/wall.json
+
+"""
+
+from __future__ import division
+import optparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+
+import color_utils
+import layout
+import patterns
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+
+
+#-------------------------------------------------------------------------------
+# the scripts' pixel_color functions, pixel by pixel; t is the pattern's
+# time (0.6 of the seconds the scripts had been running, in seconds)
+
+def warp(coord):
+    """Moving stripes for x, y and z, then rotated."""
+    x, y, z = coord
+    y += color_utils.cos(x + 0.2*z, offset=0, period=1, minn=0, maxx=0.6)
+    z += color_utils.cos(x, offset=0, period=1, minn=0, maxx=0.3)
+    x += color_utils.cos(y + z, offset=0, period=1.5, minn=0, maxx=0.2)
+    return y, z, x
+
+def blobs(x, y, z, t, period, contrast):
+    r = color_utils.cos(x, offset=t / 4, period=period, minn=0, maxx=1)
+    g = color_utils.cos(y, offset=t / 4, period=period, minn=0, maxx=1)
+    b = color_utils.cos(z, offset=t / 4, period=period, minn=0, maxx=1)
+    return color_utils.contrast((r, g, b), 0.5, contrast)
+
+def black_out(x, y, z, t, period, threshold):
+    r2 = color_utils.cos(x, offset=t / 10 + 12.345, period=period, minn=0, maxx=1)
+    g2 = color_utils.cos(y, offset=t / 10 + 24.536, period=period, minn=0, maxx=1)
+    b2 = color_utils.cos(z, offset=t / 10 + 34.675, period=period, minn=0, maxx=1)
+    clampdown = (r2 + g2 + b2)/2
+    clampdown = color_utils.remap(clampdown, threshold, threshold + 0.1, 0, 1)
+    return color_utils.clamp(clampdown, 0, 1)
+
+def wave(t, ii, n_pixels):
+    return color_utils.cos(t - ii/n_pixels, offset=0, period=7, minn=0, maxx=1) ** 20
+
+def twinkle(seconds, t, ii, n_pixels, random_values):
+    twinkle_speed = 0.07
+    twinkle_density = 0.1
+    twinkle = (random_values[ii]*7 + seconds*twinkle_speed) % 1
+    twinkle = abs(twinkle*2 - 1)
+    twinkle = color_utils.remap(twinkle, 0, 1, -1/twinkle_density, 1.1)
+    twinkle = color_utils.clamp(twinkle, -0.5, 1.1)
+    twinkle **= 5
+    twinkle *= wave(t, ii, n_pixels)
+    return color_utils.clamp(twinkle, -0.3, 1)
+
+def lava_lamp_pixel(seconds, t, coord, ii, n_pixels, random_values):
+    x, y, z = warp(coord)
+    r, g, b = blobs(x, y, z, t, 2, 1.5)
+    clampdown = black_out(x, y, z, t, 3, 0.8)
+    r, g, b = r * clampdown, g * clampdown, b * clampdown
+    g = g * 0.6 + ((r+b) / 2) * 0.4
+    return (r*256, g*256, b*256)
+
+def miami_pixel(seconds, t, coord, ii, n_pixels, random_values):
+    x, y, z = warp(coord)
+    r, g, b = blobs(x, y, z, t, 2.5, 1.4)
+    clampdown = (r + g + b)/2
+    clampdown = color_utils.remap(clampdown, 0.4, 0.5, 0, 1)
+    clampdown = color_utils.clamp(clampdown, 0, 1) * 0.9
+    r, g, b = r * clampdown, g * clampdown, b * clampdown
+    clampdown = black_out(x, y, z, t, 4, 0.2)
+    r, g, b = r * clampdown, g * clampdown, b * clampdown
+    g = g * 0.6 + ((r+b) / 2) * 0.4
+    fade = 1 - wave(t, ii, n_pixels)*0.2
+    sparkle = twinkle(seconds, t, ii, n_pixels, random_values)
+    return ((r*fade + sparkle)*256, (g*fade + sparkle)*256, (b*fade + sparkle)*256)
+
+def nyan_cat_pixel(seconds, t, coord, ii, n_pixels, random_values):
+    x, y, z = warp(coord)
+    # shift some of the pixels to a new xyz location
+    if ii % 7 == 0:
+        x += ((ii*123)%5) / n_pixels * 32.12
+        y += ((ii*137)%5) / n_pixels * 22.23
+        z += ((ii*147)%7) / n_pixels * 44.34
+    r, g, b = blobs(x, y, z, t, 2, 1.5)
+    fade = wave(t, ii, n_pixels)
+    sparkle = twinkle(seconds, t, ii, n_pixels, random_values)
+    return ((r*fade + sparkle)*256, (g*fade + sparkle)*256, (b*fade + sparkle)*256)
+
+REFERENCES = [
+    ('lava_lamp', lava_lamp_pixel),
+    ('miami', miami_pixel),
+    ('nyan_cat', nyan_cat_pixel),
+]
+
+def per_pixel(pixel_color, seconds, coordinates, random_values):
+    """One frame pixel by pixel, seconds into the pattern."""
+    n_pixels = len(coordinates)
+    return [pixel_color(seconds, seconds*0.6, coord, ii, n_pixels, random_values)
+            for ii, coord in enumerate(coordinates)]
+
+def unprepared(name, wall, t, out):
+    """One frame from the port, forgetting everything prepared first."""
+    patterns.warped_coordinates.cache.clear()
+    patterns.nyan_cat_coordinates.cache.clear()
+    patterns.PATTERNS[name](wall)(t, out)
+
+def best_time(func, repeat, number):
+    """Return the best time for one call to func, in microseconds."""
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number * 1e6
+
+
+parser = optparse.OptionParser()
+parser.add_option('-l', '--layout', dest='layout',
+                    default=os.path.join(root, 'layouts', 'wall.json'),
+                    action='store', type='string', help='layout file')
+parser.add_option('-r', '--repeat', dest='repeat', default=5,
+                    action='store', type='int', help='timing repeats')
+parser.add_option('--count', dest='count', default=100,
+                    action='store', type='int', help='frames per repeat (a tenth of them pixel by pixel)')
+options, args = parser.parse_args()
+
+wall = layout.load(options.layout)
+coordinates = wall.coordinates.tolist()
+out = numpy.zeros((wall.n_pixels, 3), dtype=numpy.float32)
+
+print('%s, %d pixels' % (os.path.basename(options.layout), wall.n_pixels))
+renders = []
+for name, pixel_color in REFERENCES:
+    numpy.random.seed(0)
+    render = patterns.PATTERNS[name](wall)
+    numpy.random.seed(0)
+    random_values = numpy.random.random(wall.n_pixels).tolist()
+    for t in (0, 3.7, 61.2):
+        expected = numpy.array(per_pixel(pixel_color, t, coordinates, random_values))
+        render(t, out)
+        if numpy.abs(out - expected).max() > 0.5:
+            sys.exit('FAILED: %s differs from pixel by pixel' % name)
+    print('    ok  %s matches pixel by pixel' % name)
+    renders.append((name, pixel_color, render, random_values))
+
+print('')
+print('%-12s %12s %12s %12s %10s' % ('pattern', 'pixels us', 'unprep. us', 'render us', 'speedup'))
+for name, pixel_color, render, random_values in renders:
+    slow = best_time(lambda: per_pixel(pixel_color, 3.7, coordinates, random_values),
+                     options.repeat, max(1, options.count // 10))
+    every_frame = best_time(lambda: unprepared(name, wall, 3.7, out), options.repeat, options.count)
+    fast = best_time(lambda: render(3.7, out), options.repeat, options.count)
+    print('%-12s %12.1f %12.1f %12.1f %9.0fx' % (name, slow, every_frame, fast, slow / fast))
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+
+"""Benchmark opc.FramePipeline against rendering and sending serially.
+
+Renders raver plaid pixel by pixel into a frame buffer, which is ordinary
+GIL-bound pattern code, and sends it through a client whose sends take
+--latency milliseconds, like a slow or distant controller.  Serially each
+frame costs render + send; with the pipeline the send of one frame
+overlaps the render of the next, so a frame costs about max(render, send).
+
+    python_clients/benchmarks/bench_pipeline.py -n 1250 --fps 60 --latency 10
+
+"""
+
+from __future__ import division
+import math
+import optparse
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+
+import color_utils
+import frame_clock
+import opc
+
+
+class SlowClient(opc.Client):
+    """A Client whose sends block for a fixed time before going out."""
+
+    def __init__(self, sock, latency):
+        opc.Client.__init__(self, 'localhost:7890')
+        self._socket = sock
+        self.latency = latency
+
+    def put_pixels(self, pixels, channel=0):
+        time.sleep(self.latency)
+        return opc.Client.put_pixels(self, pixels, channel)
+
+def drain(sock):
+    while sock.recv(1 << 16):
+        pass
+
+def render(t, out):
+    """Raver plaid, one pixel at a time, as in raver_plaid.py."""
+    n_pixels = len(out)
+    for ii in range(n_pixels):
+        pct = ii / n_pixels
+        pct_jittered = (pct * 77) % 37
+        blackstripes = color_utils.cos(pct_jittered, offset=t*0.05, period=1, minn=-1.5, maxx=1.5)
+        blackstripes_offset = color_utils.cos(t, offset=0.9, period=60, minn=-0.5, maxx=3)
+        blackstripes = color_utils.clamp(blackstripes + blackstripes_offset, 0, 1)
+        out[ii] = (blackstripes * color_utils.remap(math.cos((t/7 + pct*24)*math.pi*2), -1, 1, 0, 256),
+                   blackstripes * color_utils.remap(math.cos((t/-13 + pct*24)*math.pi*2), -1, 1, 0, 256),
+                   blackstripes * color_utils.remap(math.cos((t/19 + pct*24)*math.pi*2), -1, 1, 0, 256))
+
+def run_serial(client, n_pixels, n_frames, fps):
+    clock = frame_clock.FrameClock(fps)
+    frame = numpy.zeros((n_pixels, 3))
+    for ii in range(n_frames):
+        render(ii / fps, frame)
+        client.put_pixels(frame)
+        clock.tick()
+    return clock.stats()
+
+def run_pipelined(client, n_pixels, n_frames, fps):
+    clock = frame_clock.FrameClock(fps)
+    pipeline = opc.FramePipeline(client, (n_pixels, 3))
+    for ii in range(n_frames):
+        render(ii / fps, pipeline.back)
+        pipeline.swap()
+        clock.tick()
+    pipeline.close()
+    return clock.stats()
+
+
+parser = optparse.OptionParser()
+parser.add_option('-n', '--num_pixels', dest='num_pixels', default=1250,
+                    action='store', type='int', help='number of pixels')
+parser.add_option('-f', '--fps', dest='fps', default=60,
+                    action='store', type='int', help='target frames per second')
+parser.add_option('-l', '--latency', dest='latency', default=10,
+                    action='store', type='float', help='milliseconds per send')
+parser.add_option('--frames', dest='frames', default=120,
+                    action='store', type='int', help='frames per run')
+options, args = parser.parse_args()
+
+client_sock, server_sock = socket.socketpair()
+drainer = threading.Thread(target=drain, args=(server_sock,))
+drainer.daemon = True
+drainer.start()
+client = SlowClient(client_sock, options.latency / 1000)
+
+frame = numpy.zeros((options.num_pixels, 3))
+started = time.time()
+for ii in range(10):
+    render(0, frame)
+render_ms = (time.time() - started) / 10 * 1000
+
+print('%d pixels, render %.1f ms, send %.1f ms, target %d fps' % (
+    options.num_pixels, render_ms, options.latency, options.fps))
+print('')
+print('%-10s %10s %12s %12s' % ('mode', 'fps', 'late frames', 'jitter p99'))
+for name, run in [('serial', run_serial), ('pipelined', run_pipelined)]:
+    stats = run(client, options.num_pixels, options.frames, options.fps)
+    print('%-10s %10.1f %12d %10.1f ms' % (
+        name, stats['fps'], stats['late_frames'], stats['jitter_p99'] * 1000))
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+"""Micro-benchmark for opc.Client.put_frame.
+
+Sends a willow tree sized frame (40 vines of 34 pixels by default) the way
+tree_patterns.output_to_tree used to, with one put_pixels call per vine,
+and then as a single put_frame call, into a local socket that is drained
+by a background thread.
+
+    python_clients/benchmarks/bench_put_frame.py
+
+"""
+
+from __future__ import division
+import optparse
+import os
+import socket
+import sys
+import threading
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+
+import opc
+
+
+def drain(sock):
+    while sock.recv(1 << 16):
+        pass
+
+def best_time(func, repeat, number):
+    """Return the best time for one call to func, in microseconds."""
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number * 1e6
+
+
+parser = optparse.OptionParser()
+parser.add_option('-c', '--channels', dest='channels', default=40,
+                    action='store', type='int', help='number of channels')
+parser.add_option('-n', '--num_pixels', dest='num_pixels', default=34,
+                    action='store', type='int', help='pixels per channel')
+parser.add_option('-r', '--repeat', dest='repeat', default=5,
+                    action='store', type='int', help='timing repeats')
+parser.add_option('--count', dest='count', default=200,
+                    action='store', type='int', help='calls per repeat')
+options, args = parser.parse_args()
+
+frame = numpy.random.uniform(-20, 280, (options.channels, options.num_pixels, 3))
+tuple_frame = [[tuple(pixel) for pixel in vine] for vine in frame.tolist()]
+
+client_sock, server_sock = socket.socketpair()
+drainer = threading.Thread(target=drain, args=(server_sock,))
+drainer.daemon = True
+drainer.start()
+client = opc.Client('localhost:7890')
+client._socket = client_sock
+
+def per_channel(frame):
+    for channel, pixels in enumerate(frame):
+        client.put_pixels(pixels, channel=channel)
+
+print('%d channels x %d pixels, best of %d x %d calls' % (
+    options.channels, options.num_pixels, options.repeat, options.count))
+print('')
+print('%-32s %10s %10s' % ('path', 'us/frame', 'speedup'))
+baseline = best_time(lambda: per_channel(tuple_frame), options.repeat, options.count)
+print('%-32s %10.1f %10s' % ('put_pixels per channel, tuples', baseline, '1.0x'))
+for name, func in [
+        ('put_pixels per channel, array', lambda: per_channel(frame)),
+        ('put_frame, tuple lists', lambda: client.put_frame(tuple_frame)),
+        ('put_frame, float array', lambda: client.put_frame(frame)),
+        ]:
+    us = best_time(func, options.repeat, options.count)
+    print('%-32s %10.1f %9.1fx' % (name, us, baseline / us))
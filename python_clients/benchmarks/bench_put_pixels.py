@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+
+"""Micro-benchmark for opc.Client.put_pixels.
+
+Compares the tuple-list path that every pattern uses today against the
+numpy and raw byte fast paths, both for encoding alone and for a complete
+put_pixels call into a local socket that is drained by a background thread.
+
+    python_clients/benchmarks/bench_put_pixels.py -n 1360
+
+"""
+
+from __future__ import division
+import optparse
+import os
+import random
+import socket
+import sys
+import threading
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+
+import opc
+
+
+def legacy_encode(pixels, channel=0):
+    """The message building loop put_pixels used before encode_pixels."""
+    len_hi_byte = int(len(pixels)*3 / 256)
+    len_lo_byte = (len(pixels)*3) % 256
+    header = chr(channel) + chr(0) + chr(len_hi_byte) + chr(len_lo_byte)
+    pieces = [header]
+    for r, g, b in pixels:
+        r = min(255, max(0, int(r)))
+        g = min(255, max(0, int(g)))
+        b = min(255, max(0, int(b)))
+        pieces.append(chr(r) + chr(g) + chr(b))
+    return ''.join(pieces)
+
+def drain(sock):
+    while sock.recv(1 << 16):
+        pass
+
+def best_time(func, repeat, number):
+    """Return the best time for one call to func, in microseconds."""
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number * 1e6
+
+
+parser = optparse.OptionParser()
+parser.add_option('-n', '--num_pixels', dest='num_pixels', default=1360,
+                    action='store', type='int', help='number of pixels')
+parser.add_option('-r', '--repeat', dest='repeat', default=5,
+                    action='store', type='int', help='timing repeats')
+parser.add_option('-c', '--count', dest='count', default=200,
+                    action='store', type='int', help='calls per repeat')
+options, args = parser.parse_args()
+
+n = options.num_pixels
+tuples = [(random.random()*300 - 20, random.random()*300 - 20, random.random()*300 - 20)
+          for ii in range(n)]
+floats = numpy.array(tuples)
+uint8s = opc.encode_pixels(floats).reshape(n, 3)
+raw = bytearray(uint8s.tobytes())
+
+client_sock, server_sock = socket.socketpair()
+drainer = threading.Thread(target=drain, args=(server_sock,))
+drainer.daemon = True
+drainer.start()
+client = opc.Client('localhost:7890')
+client._socket = client_sock
+
+cases = [
+    ('tuple list', tuples),
+    ('float array', floats),
+    ('uint8 array', uint8s),
+    ('bytearray', raw),
+]
+
+print('%d pixels, best of %d x %d calls' % (n, options.repeat, options.count))
+print('')
+print('%-26s %10s %10s' % ('path', 'us/call', 'speedup'))
+baseline = best_time(lambda: legacy_encode(tuples), options.repeat, options.count)
+print('%-26s %10.1f %10s' % ('legacy encode (chr join)', baseline, '1.0x'))
+for name, pixels in cases:
+    us = best_time(lambda: opc.encode_pixels(pixels), options.repeat, options.count)
+    print('%-26s %10.1f %9.1fx' % ('encode ' + name, us, baseline / us))
+for name, pixels in cases:
+    us = best_time(lambda: client.put_pixels(pixels), options.repeat, options.count)
+    print('%-26s %10.1f %9.1fx' % ('put_pixels ' + name, us, baseline / us))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+"""Benchmark opc_record: live rendering against replaying a recording.
+
+Renders --frames frames of raver plaid pixel by pixel, as raver_plaid.py
+does, sending them to an opc_sink in a child process through a Recorder,
+and then replays the recording to the same sink as fast as it will go.
+
+    python_clients/benchmarks/bench_replay.py -n 1250 --frames 300
+
+"""
+
+from __future__ import division
+import math
+import optparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import color_utils
+import opc
+import opc_record
+from harness import SinkProcess
+
+
+def render(t, n_pixels):
+    """Raver plaid, one pixel at a time, as in raver_plaid.py."""
+    pixels = []
+    for ii in range(n_pixels):
+        pct = ii / n_pixels
+        pct_jittered = (pct * 77) % 37
+        blackstripes = color_utils.cos(pct_jittered, offset=t*0.05, period=1, minn=-1.5, maxx=1.5)
+        blackstripes_offset = color_utils.cos(t, offset=0.9, period=60, minn=-0.5, maxx=3)
+        blackstripes = color_utils.clamp(blackstripes + blackstripes_offset, 0, 1)
+        pixels.append((blackstripes * color_utils.remap(math.cos((t/7 + pct*24)*math.pi*2), -1, 1, 0, 256),
+                       blackstripes * color_utils.remap(math.cos((t/-13 + pct*24)*math.pi*2), -1, 1, 0, 256),
+                       blackstripes * color_utils.remap(math.cos((t/19 + pct*24)*math.pi*2), -1, 1, 0, 256)))
+    return pixels
+
+
+parser = optparse.OptionParser()
+parser.add_option('-n', '--num_pixels', dest='num_pixels', default=1250,
+                    action='store', type='int', help='pixels per frame')
+parser.add_option('--frames', dest='frames', default=300,
+                    action='store', type='int', help='frames to record')
+options, args = parser.parse_args()
+
+sink = SinkProcess()
+frame_bytes = 4 + 3 * options.num_pixels
+path = os.path.join(tempfile.mkdtemp(), 'bench.opcrec')
+
+recorder = opc_record.Recorder(path, opc.Client(sink.address))
+start = time.time()
+for frame in range(options.frames):
+    recorder.put_pixels(render(frame / 60, options.num_pixels), channel=0)
+recorder.close()
+sink.wait_for(options.frames * frame_bytes)
+live = time.time() - start
+
+replayer = opc_record.Replayer(path, opc.Client(sink.address))
+start = time.time()
+replayer.play(speed=0)
+sink.wait_for(2 * options.frames * frame_bytes)
+replay = time.time() - start
+replayer.close()
+sink.close()
+os.remove(path)
+os.remove(path + opc_record.INDEX_SUFFIX)
+os.rmdir(os.path.dirname(path))
+
+print('%d frames of %d pixels' % (options.frames, options.num_pixels))
+print('')
+print('%-24s %10s %10s' % ('path', 'fps', 'speedup'))
+print('%-24s %10.0f %10s' % ('render and record', options.frames / live, '1.0x'))
+print('%-24s %10.0f %9.0fx' % ('replay', options.frames / replay, live / replay))
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+
+"""Benchmark spatial.GridIndex queries against scanning every pixel.
+
+Times radius and nearest-pixel queries at random points on a layout file
+and on a synthetic cloud of --num_pixels random points, each answered by
+a vectorized scan over all coordinates, by the grid alone, and by the
+index as it runs by default, scanning small layouts.
+
+    python_clients/benchmarks/bench_spatial.py -l layouts/wall.json -n 100000
+
+"""
+
+from __future__ import division
+import optparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+
+import layout
+import spatial
+
+
+def scan_within(coordinates, point, radius):
+    offsets = coordinates - point
+    return numpy.flatnonzero(numpy.einsum('ij,ij->i', offsets, offsets) <= radius * radius)
+
+def scan_nearest(coordinates, point, k):
+    offsets = coordinates - point
+    return numpy.argsort(numpy.einsum('ij,ij->i', offsets, offsets), kind='mergesort')[:k]
+
+def best_time(func, repeat, number):
+    """Return the best time for one call to func, in microseconds."""
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number * 1e6
+
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+parser = optparse.OptionParser()
+parser.add_option('-l', '--layout', dest='layout',
+                    default=os.path.join(root, 'layouts', 'wall.json'),
+                    action='store', type='string', help='layout file')
+parser.add_option('-n', '--num_pixels', dest='num_pixels', default=100000,
+                    action='store', type='int', help='pixels in the random cloud')
+parser.add_option('--radius', dest='radius', default=0.1,
+                    action='store', type='float', help='query radius, as a fraction of the layout size')
+parser.add_option('-r', '--repeat', dest='repeat', default=5,
+                    action='store', type='int', help='timing repeats')
+parser.add_option('--count', dest='count', default=200,
+                    action='store', type='int', help='queries per repeat')
+options, args = parser.parse_args()
+
+random = numpy.random.RandomState(0)
+clouds = [
+    (os.path.basename(options.layout), layout.load(options.layout).coordinates.astype(float)),
+    ('%d random points' % options.num_pixels, random.uniform(-1, 1, (options.num_pixels, 3))),
+]
+
+print('%-28s %-12s %10s %10s %10s %10s' % ('layout', 'query', 'scan us', 'grid us', 'index us', 'speedup'))
+for name, coordinates in clouds:
+    index = spatial.GridIndex(coordinates)
+    grid = spatial.GridIndex(coordinates, scan_below=0)
+    mins, maxes = coordinates.min(axis=0), coordinates.max(axis=0)
+    radius = options.radius * (maxes - mins).max()
+    points = random.uniform(mins, maxes, (options.count, 3))
+    for query, scan, gridded, indexed in [
+            ('within', lambda p: scan_within(coordinates, p, radius),
+             lambda p: grid.within(p, radius), lambda p: index.within(p, radius)),
+            ('nearest 8', lambda p: scan_nearest(coordinates, p, 8),
+             lambda p: grid.nearest(p, 8), lambda p: index.nearest(p, 8)),
+            ]:
+        for point in points[:20]:
+            if query == 'within' and not numpy.array_equal(scan(point), gridded(point)):
+                sys.exit('GridIndex.within does not match the scan')
+        times = []
+        for func in (scan, gridded, indexed):
+            it = iter(numpy.tile(points, (options.repeat + 1, 1)))
+            times.append(best_time(lambda: func(next(it)), options.repeat, options.count))
+        print('%-28s %-12s %10.1f %10.1f %10.1f %9.1fx' % (name, query, times[0], times[1], times[2],
+                                                          times[0] / times[2]))
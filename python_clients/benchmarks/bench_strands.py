@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+"""Time sending one large frame split into strands on consecutive channels.
+
+Compares three ways of sending --num_pixels pixels as strands of
+--strand_length pixels, over a socketpair drained by a thread:
+
+* slicing by hand and calling put_pixels once per strand, which makes
+  a system call per strand;
+* put_frame with the frame reshaped to (strands, strand_length, 3),
+  which copies everything into one packed buffer, and only works when
+  the strands are all the same length;
+* put_pixels on a Client with strand_length, which packs the strands
+  the same way as put_frame but needn't have them all the same length.
+
+Each message could instead be sent as two views (header and pixels) in
+one scatter-gather write, with no copy, but for a few hundred strands
+that is several times slower than copying them once.
+
+    python_clients/benchmarks/bench_strands.py -n 100000 -s 500
+
+"""
+
+from __future__ import division
+import optparse
+import os
+import socket
+import sys
+import threading
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+
+import opc
+
+
+def drain(sock):
+    while sock.recv(1 << 16):
+        pass
+
+def best_time(func, repeat, number):
+    """Return the best time for one call to func, in microseconds."""
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number * 1e6
+
+def connected_client(sock, **options):
+    client = opc.Client('localhost:7890', **options)
+    client._socket = sock
+    return client
+
+
+parser = optparse.OptionParser()
+parser.add_option('-n', '--num_pixels', dest='num_pixels', default=100000,
+                    action='store', type='int', help='pixels per frame')
+parser.add_option('-s', '--strand_length', dest='strand_length', default=500,
+                    action='store', type='int', help='pixels per strand')
+parser.add_option('-r', '--repeat', dest='repeat', default=5,
+                    action='store', type='int', help='timing repeats')
+parser.add_option('--count', dest='count', default=50,
+                    action='store', type='int', help='frames per repeat')
+options, args = parser.parse_args()
+
+client_sock, server_sock = socket.socketpair()
+drainer = threading.Thread(target=drain, args=(server_sock,))
+drainer.daemon = True
+drainer.start()
+
+n, size = options.num_pixels, options.strand_length
+pixels = numpy.random.randint(0, 256, (n, 3)).astype(numpy.uint8)
+n_strands = (n + size - 1) // size
+
+plain = connected_client(client_sock)
+stranded = connected_client(client_sock, strand_length=size)
+
+def by_hand():
+    for ii in range(n_strands):
+        plain.put_pixels(pixels[ii*size:(ii+1)*size], ii + 1)
+
+cases = [('by hand', by_hand)]
+if n % size == 0:
+    frame = pixels.reshape(n_strands, size, 3)
+    cases.append(('put_frame', lambda: plain.put_frame(frame, 1)))
+cases.append(('strand_length', lambda: stranded.put_pixels(pixels)))
+
+print('%d pixels in %d strands of %d, best of %d x %d frames' % (
+    n, n_strands, size, options.repeat, options.count))
+print('%-14s %12s' % ('', 'us/frame'))
+for name, func in cases:
+    print('%-14s %12.1f' % (name, best_time(func, options.repeat, options.count)))
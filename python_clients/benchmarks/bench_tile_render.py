@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+"""Benchmark tile_render.TileRenderer against a single-process render loop.
+
+Renders the lava lamp pattern (pixel by pixel, as lava_lamp.py used to) over
+a random layout of --num_pixels points, first in this process and then
+with pools of 1, 2, 4, ... processes up to the number of CPUs.
+
+    python_clients/benchmarks/bench_tile_render.py -n 10000
+
+"""
+
+from __future__ import division
+import multiprocessing
+import optparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+
+import color_utils
+import tile_render
+
+
+def pixel_color(t, coord, ii, n_pixels):
+    """The lava lamp pattern, one pixel at a time."""
+    x, y, z = coord
+    y += color_utils.cos(x + 0.2*z, offset=0, period=1, minn=0, maxx=0.6)
+    z += color_utils.cos(x, offset=0, period=1, minn=0, maxx=0.3)
+    x += color_utils.cos(y + z, offset=0, period=1.5, minn=0, maxx=0.2)
+    x, y, z = y, z, x
+    r = color_utils.cos(x, offset=t / 4, period=2, minn=0, maxx=1)
+    g = color_utils.cos(y, offset=t / 4, period=2, minn=0, maxx=1)
+    b = color_utils.cos(z, offset=t / 4, period=2, minn=0, maxx=1)
+    r, g, b = color_utils.contrast((r, g, b), 0.5, 1.5)
+    r2 = color_utils.cos(x, offset=t / 10 + 12.345, period=3, minn=0, maxx=1)
+    g2 = color_utils.cos(y, offset=t / 10 + 24.536, period=3, minn=0, maxx=1)
+    b2 = color_utils.cos(z, offset=t / 10 + 34.675, period=3, minn=0, maxx=1)
+    clampdown = (r2 + g2 + b2)/2
+    clampdown = color_utils.remap(clampdown, 0.8, 0.9, 0, 1)
+    clampdown = color_utils.clamp(clampdown, 0, 1)
+    r *= clampdown
+    g *= clampdown
+    b *= clampdown
+    g = g * 0.6 + ((r+b) / 2) * 0.4
+    return (r*256, g*256, b*256)
+
+def time_frames(render, n_frames):
+    """Return the average seconds per frame for render(t)."""
+    render(0)
+    started = time.time()
+    for ii in range(n_frames):
+        render(ii * 0.05)
+    return (time.time() - started) / n_frames
+
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser()
+    parser.add_option('-n', '--num_pixels', dest='num_pixels', default=10000,
+                        action='store', type='int', help='number of pixels')
+    parser.add_option('--frames', dest='frames', default=10,
+                        action='store', type='int', help='frames per run')
+    options, args = parser.parse_args()
+
+    n = options.num_pixels
+    coordinates = numpy.random.uniform(-2, 2, (n, 3)).tolist()
+
+    def render_serial(t):
+        frame = numpy.clip([pixel_color(t, coord, ii, n) for ii, coord in enumerate(coordinates)], 0, 255)
+        return frame.astype(numpy.uint8)
+
+    serial = time_frames(render_serial, options.frames)
+    print('%d pixels, %d CPUs' % (n, multiprocessing.cpu_count()))
+    print('')
+    print('%-12s %12s %10s' % ('processes', 'ms/frame', 'speedup'))
+    print('%-12s %12.1f %10s' % ('in-process', serial * 1000, '1.0x'))
+
+    processes = 1
+    while processes <= multiprocessing.cpu_count():
+        renderer = tile_render.TileRenderer(pixel_color, coordinates, args=(n,),
+                                            processes=processes)
+        if processes == 1 and not (renderer.render(1.0) == render_serial(1.0)).all():
+            sys.exit('FAILED: tiled frame differs from the in-process frame')
+        per_frame = time_frames(renderer.render, options.frames)
+        renderer.close()
+        print('%-12d %12.1f %9.1fx' % (processes, per_frame * 1000, serial / per_frame))
+        processes *= 2
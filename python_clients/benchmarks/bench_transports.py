@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+"""Compare opc.Client transports: TCP, UDP datagrams and Unix sockets.
+
+For each transport an opc_sink server listens in a child process, and
+the client measures:
+
+* latency: the time from calling put_pixels until the sink has counted
+  the frame, one frame at a time, as percentiles;
+* throughput: frames per second sending back to back for --duration
+  seconds, and the fraction of them delivered (UDP drops datagrams when
+  the receiver falls behind).
+
+Short connection mode is timed too, where a TCP or Unix client opens a
+new connection for every frame and a UDP client just a new socket.
+
+    python_clients/benchmarks/bench_transports.py -n 1000 -d 1
+
+"""
+
+from __future__ import division
+import optparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import harness
+import numpy
+
+import opc
+
+now = getattr(time, 'monotonic', time.time)
+
+
+def latency(server, client, pixels, frame_bytes, count):
+    """Return p50/p99/max microseconds from put_pixels to arrival."""
+    latencies = []
+    expected = server.bytes_received
+    for ii in range(count):
+        expected += frame_bytes
+        started = now()
+        client.put_pixels(pixels)
+        if not server.wait_for(expected, timeout=0.5, interval=0.00002):
+            expected = server.bytes_received  # a lost datagram
+            continue
+        latencies.append(now() - started)
+    return harness.summarize(latencies), count - len(latencies)
+
+def nagle(address):
+    host, port = address.rsplit(':', 1)
+    return opc.TcpTransport(host, int(port), nodelay=False)
+
+def throughput(server, client, pixels, frame_bytes, duration):
+    """Return frames per second sent and the fraction that arrived."""
+    start_bytes = server.bytes_received
+    frames = 0
+    started = now()
+    while now() - started < duration:
+        client.put_pixels(pixels)
+        frames += 1
+    elapsed = now() - started
+    server.wait_for(start_bytes + frames * frame_bytes, timeout=2)
+    delivered = (server.bytes_received - start_bytes) / frame_bytes
+    return frames / elapsed, delivered / frames
+
+
+parser = optparse.OptionParser()
+parser.add_option('-n', '--num_pixels', dest='num_pixels', default=1000,
+                    action='store', type='int', help='pixels per frame')
+parser.add_option('-d', '--duration', dest='duration', default=1.0,
+                    action='store', type='float', help='seconds of sending per throughput case')
+parser.add_option('--count', dest='count', default=500,
+                    action='store', type='int', help='frames per latency case')
+options, args = parser.parse_args()
+
+pixels = numpy.random.randint(0, 256, (options.num_pixels, 3)).astype(numpy.uint8)
+frame_bytes = 4 + options.num_pixels * 3
+path = os.path.join(tempfile.mkdtemp(), 'opc.sock')
+
+cases = [
+    ('tcp', 'tcp', opc.make_transport),
+    ('tcp, Nagle', 'tcp', nagle),
+    ('udp', 'udp', opc.make_transport),
+    ('unix', 'unix', opc.make_transport),
+]
+
+print('%d pixels (%d bytes) per frame' % (options.num_pixels, frame_bytes))
+print('%-12s %-6s %9s %9s %9s %6s %10s %10s' % (
+    'transport', 'mode', 'p50 us', 'p99 us', 'max us', 'lost', 'fps', 'delivered'))
+for name, kind, make in cases:
+    server = harness.SinkProcess(path if kind == 'unix' else '127.0.0.1', 0, transport=kind)
+    for mode in ('long', 'short'):
+        transport = make(server.address)
+        client = opc.Client(transport, long_connection=(mode == 'long'))
+        client.put_pixels(pixels)
+        summary, lost = latency(server, client, pixels, frame_bytes, options.count)
+        fps, delivered = throughput(server, client, pixels, frame_bytes, options.duration)
+        client.disconnect()
+        print('%-12s %-6s %9.1f %9.1f %9.1f %6d %10.1f %9.1f%%' % (
+            name, mode, summary['p50_us'], summary['p99_us'], summary['max_us'],
+            lost, fps, delivered * 100))
+    server.close()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+
+"""Time upsampler.Upsampler's blended frames against rendering frames.
+
+Renders a pattern from patterns.py on a layout and times one rendered
+frame (render and encode, as pattern_host does it) against one blended
+frame from an Upsampler, with and without dithering.  Then works out
+how much CPU time a second of output at --output_fps costs when every
+frame is rendered, and when only --fps frames are rendered and the rest
+are blended.  Also checks that dithering averages out to the exact
+colors where plain truncation to 8 bits doesn't.
+
+    python_clients/benchmarks/bench_upsampler.py -p miami --fps 20 --output_fps 120
+
+"""
+
+from __future__ import division
+import itertools
+import optparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+
+import compositor
+import frame_clock
+import layout
+import upsampler
+
+
+class NullClient(object):
+    def put_pixels(self, pixels, channel=0):
+        return True
+
+def best_time(func, repeat, number):
+    """Return the best time for one call to func, in microseconds."""
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number * 1e6
+
+def averaging_error(up, target, frames):
+    """Return the worst difference between target and the mean of frames
+    blended frames."""
+    up.back[...] = target
+    up.swap()
+    total = numpy.zeros(target.shape)
+    for ii in range(frames):
+        total += up.blend(frame_clock.now())
+    return numpy.abs(total / frames - target).max()
+
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+parser = optparse.OptionParser()
+parser.add_option('-l', '--layout', dest='layout',
+                    default=os.path.join(root, 'layouts', 'wall.json'),
+                    action='store', type='string', help='layout file')
+parser.add_option('-p', '--pattern', dest='pattern', default='miami',
+                    action='store', type='string', help='pattern to render')
+parser.add_option('--fps', dest='fps', default=20,
+                    action='store', type='int', help='frames rendered per second')
+parser.add_option('--output_fps', dest='output_fps', default=120,
+                    action='store', type='int', help='frames sent per second')
+parser.add_option('-r', '--repeat', dest='repeat', default=5,
+                    action='store', type='int', help='timing repeats')
+parser.add_option('--count', dest='count', default=200,
+                    action='store', type='int', help='frames per repeat')
+options, args = parser.parse_args()
+
+pixels = layout.load(options.layout)
+comp = compositor.Compositor(pixels)
+comp.add_layer(options.pattern)
+frames = itertools.count()
+
+def render():
+    comp.render(next(frames) / options.output_fps)
+    comp.encode()
+
+render_us = best_time(render, options.repeat, options.count)
+print('%s on %s, %d pixels' % (options.pattern, os.path.basename(options.layout), pixels.n_pixels))
+print('%-26s %10s' % ('', 'us/frame'))
+print('%-26s %10.1f' % ('render + encode', render_us))
+
+# closing the Upsamplers first stops their sender threads, so only this blends
+blend_us = {}
+for name, easing, dither in [('blend, linear', 'linear', False),
+                             ('blend, smoothstep, dither', 'smoothstep', True)]:
+    up = upsampler.Upsampler(NullClient(), (pixels.n_pixels, 3), easing=easing, dither=dither)
+    up.close()
+    for ii in range(2):
+        comp.render(ii)
+        up.put_pixels(comp.frame)
+    blend_us[name] = best_time(lambda: up.blend(frame_clock.now()), options.repeat, options.count)
+    print('%-26s %10.1f' % (name, blend_us[name]))
+
+print('')
+print('one second of output at %d fps, in ms of CPU:' % options.output_fps)
+print('    rendering every frame   %8.1f' % (options.output_fps * render_us / 1000))
+print('    rendering %3d, blending  %8.1f' % (
+    options.fps, (options.fps * render_us + options.output_fps * blend_us['blend, smoothstep, dither']) / 1000))
+
+print('')
+target = numpy.random.RandomState(0).uniform(0, 255, (pixels.n_pixels, 3)).astype(numpy.float32)
+for dither in (False, True):
+    up = upsampler.Upsampler(NullClient(), target.shape, dither=dither)
+    up.close()
+    print('mean of 64 frames off by up to %.3f levels %s' % (
+        averaging_error(up, target, 64), 'with dithering' if dither else 'truncating'))
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+"""Shared pieces for the benchmark scripts in this directory."""
+
+from __future__ import division
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import opc_sink
+from frame_clock import percentile
+
+
+class SinkProcess(object):
+    """An opc_sink.Sink serving from a child process.
+
+    The sink runs in its own process so that it doesn't compete with the
+    client being measured for the GIL.  bytes_received is the number of
+    bytes of complete OPC messages the sink has parsed so far.
+
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, transport='tcp'):
+        self._sink = opc_sink.Sink(host, port, transport=transport)
+        self.address = self._sink.address
+        self._count = multiprocessing.Value('d', 0, lock=False)
+        self._process = multiprocessing.Process(target=_serve, args=(self._sink, self._count))
+        self._process.daemon = True
+        self._process.start()
+
+    @property
+    def bytes_received(self):
+        return int(self._count.value)
+
+    def wait_for(self, n_bytes, timeout=10, interval=0.0005):
+        """Wait until at least n_bytes have arrived in total, checking
+        every interval seconds."""
+        deadline = time.time() + timeout
+        while self.bytes_received < n_bytes and time.time() < deadline:
+            time.sleep(interval)
+        return self.bytes_received >= n_bytes
+
+    def close(self):
+        self._process.terminate()
+        self._sink.stop()
+
+def _serve(sink, count):
+    while True:
+        sink.poll(0.05)
+        count.value = sink.bytes_received
+
+
+def best_time(func, repeat, number):
+    """Return the best time for one call to func, in microseconds."""
+    import timeit
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number * 1e6
+
+def summarize(latencies):
+    """Return p50, p99 and max of a list of latencies in seconds, in microseconds."""
+    latencies = sorted(latencies)
+    return {
+        'p50_us': percentile(latencies, 50) * 1e6,
+        'p99_us': percentile(latencies, 99) * 1e6,
+        'max_us': (latencies[-1] if latencies else 0) * 1e6,
+    }
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+
+"""Sweep opc.Client throughput over frame sizes, channels, modes and encodings.
+
+Each case sends frames as fast as it can to an opc_sink server running in
+a child process, and reports frames/s, MB/s on the wire, encode time per frame
+and the p50/p99 latency of each put_pixels / put_frame call.  The results
+are printed as JSON, one object per case, for comparing runs.
+
+    python_clients/benchmarks/throughput.py --pixels 100,1250,10000 \\
+        --channels 1,40 --modes long,short --paths tuples,float,uint8,bytes \\
+        --output results.json
+
+"""
+
+from __future__ import division
+import json
+import optparse
+import platform
+import sys
+import time
+
+import harness
+import numpy
+
+import opc
+
+
+def make_pixels(path, n_channels, n_pixels):
+    """Return a frame of random pixels in the form the encoding path takes."""
+    frame = numpy.random.uniform(-20, 280, (n_channels, n_pixels, 3))
+    if path == 'tuples':
+        frame = [[tuple(pixel) for pixel in channel] for channel in frame.tolist()]
+    elif path == 'uint8':
+        frame = numpy.clip(frame, 0, 255).astype(numpy.uint8)
+    elif path == 'bytes':
+        frame = [bytes(bytearray(channel)) for channel in numpy.clip(frame, 0, 255).astype(numpy.uint8)]
+    elif path != 'float':
+        raise ValueError('unknown encoding path %r' % path)
+    if n_channels == 1:
+        return frame[0]
+    return frame
+
+def run_case(server, n_pixels, n_channels, mode, path, duration, max_frames):
+    client = opc.Client(server.address, long_connection=(mode == 'long'))
+    pixels = make_pixels(path, n_channels, n_pixels)
+    if n_channels == 1:
+        send = lambda: client.put_pixels(pixels, channel=1)
+        encode = lambda: opc.encode_pixels(pixels)
+        frame_bytes = 4 + n_pixels * 3
+    else:
+        send = lambda: client.put_frame(pixels, first_channel=1)
+        encode = lambda: opc.pack_frame(pixels, 1)
+        frame_bytes = n_channels * (4 + n_pixels * 3)
+
+    encode_us = harness.best_time(encode, 3, 20)
+
+    start_bytes = server.bytes_received + frame_bytes
+    send()
+    server.wait_for(start_bytes)
+    latencies = []
+    started = time.time()
+    while len(latencies) < max_frames and time.time() - started < duration:
+        before = time.time()
+        if not send():
+            raise RuntimeError('could not send to %s' % server.address)
+        latencies.append(time.time() - before)
+    delivered = server.wait_for(start_bytes + len(latencies) * frame_bytes)
+    elapsed = time.time() - started
+    client.disconnect()
+
+    result = {
+        'pixels': n_pixels,
+        'channels': n_channels,
+        'mode': mode,
+        'path': path,
+        'frames': len(latencies),
+        'delivered': delivered,
+        'frames_per_s': len(latencies) / elapsed,
+        'mb_per_s': len(latencies) * frame_bytes / elapsed / 1e6,
+        'encode_us_per_frame': encode_us,
+    }
+    for key, value in harness.summarize(latencies).items():
+        result['send_' + key] = value
+    return result
+
+def int_list(text):
+    return [int(value) for value in text.split(',')]
+
+
+parser = optparse.OptionParser()
+parser.add_option('--pixels', dest='pixels', default='100,1250,10000',
+                    action='store', type='string', help='pixels per channel, comma separated')
+parser.add_option('--channels', dest='channels', default='1,40',
+                    action='store', type='string', help='channel counts, comma separated')
+parser.add_option('--modes', dest='modes', default='long,short',
+                    action='store', type='string', help='connection modes: long, short')
+parser.add_option('--paths', dest='paths', default='tuples,float,uint8,bytes',
+                    action='store', type='string', help='encoding paths: tuples, float, uint8, bytes')
+parser.add_option('-d', '--duration', dest='duration', default=1.0,
+                    action='store', type='float', help='seconds per case')
+parser.add_option('--max_frames', dest='max_frames', default=20000,
+                    action='store', type='int', help='frames per case at most')
+parser.add_option('-o', '--output', dest='output', default=None,
+                    action='store', type='string', help='write the JSON here instead of stdout')
+options, args = parser.parse_args()
+
+server = harness.SinkProcess()
+results = []
+for n_pixels in int_list(options.pixels):
+    for n_channels in int_list(options.channels):
+        for mode in options.modes.split(','):
+            for path in options.paths.split(','):
+                result = run_case(server, n_pixels, n_channels, mode, path,
+                                  options.duration, options.max_frames)
+                sys.stderr.write('%6d px x %2d ch  %-5s %-6s %9.1f fps %8.1f MB/s\n' % (
+                    n_pixels, n_channels, mode, path, result['frames_per_s'], result['mb_per_s']))
+                results.append(result)
+
+report = {
+    'python': platform.python_version(),
+    'numpy': numpy.__version__,
+    'server': 'opc_sink',
+    'results': results,
+}
+text = json.dumps(report, indent=2, sort_keys=True)
+if options.output:
+    with open(options.output, 'w') as f:
+        f.write(text + '\n')
+else:
+    print(text)
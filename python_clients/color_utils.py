@@ -1,11 +1,44 @@
 #!/usr/bin/env python
 
-"""Helper functions to make color manipulations easier."""
+"""Helper functions to make color manipulations easier.
+
+Every function also works on whole numpy arrays at once.  Pass an array
+for any argument and the result is an array, computed with a few numpy
+ufuncs and broadcasting like any other numpy expression.  For example,
+one line computes the red channel for a whole frame:
+
+    r = cos(x_array, offset=t / 4, period=2, minn=0, maxx=1)
+
+Array calls accept an out= array to write the result into instead of
+allocating a new one.  The out array may be one of the inputs.
+
+"""
 
 from __future__ import division
 import math
 
-def remap(x, oldmin, oldmax, newmin, newmax):
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def _is_array(*values):
+    """Return True if any of the values is a numpy array."""
+    if numpy is None:
+        return False
+    for value in values:
+        if isinstance(value, numpy.ndarray):
+            return True
+    return False
+
+def _float_out(out, *values):
+    """Return out, or a new float array of the broadcast shape of values."""
+    if out is None:
+        shape = numpy.broadcast(*values).shape
+        out = numpy.empty(shape, dtype=numpy.result_type(1.0, *values))
+    return out
+
+def remap(x, oldmin, oldmax, newmin, newmax, out=None):
     """Remap the float x from the range oldmin-oldmax to the range newmin-newmax
 
     Does not clamp values that exceed min or max.
@@ -13,14 +46,24 @@ def remap(x, oldmin, oldmax, newmin, newmax):
         remap(math.sin(time.time()), -1, 1, 0, 256)
 
     """
-    zero_to_one = (x-oldmin) / (oldmax-oldmin)
-    return zero_to_one*(newmax-newmin) + newmin
-
-def clamp(x, minn, maxx):
+    if out is None and not _is_array(x, oldmin, oldmax, newmin, newmax):
+        zero_to_one = (x-oldmin) / (oldmax-oldmin)
+        return zero_to_one*(newmax-newmin) + newmin
+    out = _float_out(out, x, oldmin, oldmax, newmin, newmax)
+    numpy.subtract(x, oldmin, out=out)
+    out /= oldmax - oldmin
+    out *= newmax - newmin
+    out += newmin
+    return out
+
+def clamp(x, minn, maxx, out=None):
     """Restrict the float x to the range minn-maxx."""
-    return max(minn, min(maxx, x))
+    if out is None and not _is_array(x, minn, maxx):
+        return max(minn, min(maxx, x))
+    out = numpy.minimum(x, maxx, out=out)
+    return numpy.maximum(out, minn, out=out)
 
-def cos(x, offset=0, period=1, minn=0, maxx=1):
+def cos(x, offset=0, period=1, minn=0, maxx=1, out=None):
     """A cosine curve scaled to fit in a 0-1 range and 0-1 domain by default.
 
     offset: how much to slide the curve across the domain (should be 0-1)
@@ -28,49 +71,84 @@ def cos(x, offset=0, period=1, minn=0, maxx=1):
     minn, maxx: the output range
 
     """
-    value = math.cos((x/period - offset) * math.pi * 2) / 2 + 0.5
-    return value*(maxx-minn) + minn
-
-def contrast(color, center, mult):
+    if out is None and not _is_array(x, offset, period, minn, maxx):
+        value = math.cos((x/period - offset) * math.pi * 2) / 2 + 0.5
+        return value*(maxx-minn) + minn
+    out = _float_out(out, x, offset, period, minn, maxx)
+    numpy.divide(x, period, out=out)
+    out -= offset
+    out *= math.pi * 2
+    numpy.cos(out, out=out)
+    out /= 2
+    out += 0.5
+    out *= maxx - minn
+    out += minn
+    return out
+
+def contrast(color, center, mult, out=None):
     """Expand the color values by a factor of mult around the pivot value of center.
 
-    color: an (r, g, b) tuple
+    color: an (r, g, b) tuple, or an array of any shape
     center: a float -- the fixed point
     mult: a float -- expand or contract the values around the center point
 
     """
-    r, g, b = color
-    r = (r - center) * mult + center
-    g = (g - center) * mult + center
-    b = (b - center) * mult + center
-    return (r, g, b)
-
-def clip_black_by_luminance(color, threshold):
+    if out is None and not _is_array(color, center, mult):
+        r, g, b = color
+        r = (r - center) * mult + center
+        g = (g - center) * mult + center
+        b = (b - center) * mult + center
+        return (r, g, b)
+    out = _float_out(out, color, center, mult)
+    numpy.subtract(color, center, out=out)
+    out *= mult
+    out += center
+    return out
+
+def clip_black_by_luminance(color, threshold, out=None):
     """If the color's luminance is less than threshold, replace it with black.
     
-    color: an (r, g, b) tuple
+    color: an (r, g, b) tuple, or an array whose last axis is r, g, b
     threshold: a float
 
     """
-    r, g, b = color
-    if r+g+b < threshold*3:
-        return (0, 0, 0)
-    return (r, g, b)
-
-def clip_black_by_channels(color, threshold):
+    if out is None and not _is_array(color, threshold):
+        r, g, b = color
+        if r+g+b < threshold*3:
+            return (0, 0, 0)
+        return (r, g, b)
+    color = numpy.asarray(color)
+    dark = color.sum(axis=-1) < threshold*3
+    if out is None:
+        out = color.copy()
+    elif out is not color:
+        out[...] = color
+    out[dark] = 0
+    return out
+
+def clip_black_by_channels(color, threshold, out=None):
     """Replace any individual r, g, or b value less than threshold with 0.
 
-    color: an (r, g, b) tuple
+    color: an (r, g, b) tuple, or an array of any shape
     threshold: a float
 
     """
-    r, g, b = color
-    if r < threshold: r = 0
-    if g < threshold: g = 0
-    if b < threshold: b = 0
-    return (r, g, b)
-
-def mod_dist(a, b, n):
+    if out is None and not _is_array(color, threshold):
+        r, g, b = color
+        if r < threshold: r = 0
+        if g < threshold: g = 0
+        if b < threshold: b = 0
+        return (r, g, b)
+    color = numpy.asarray(color)
+    dark = color < threshold
+    if out is None:
+        out = color.copy()
+    elif out is not color:
+        out[...] = color
+    out[dark] = 0
+    return out
+
+def mod_dist(a, b, n, out=None):
     """Return the distance between floats a and b, modulo n.
 
     The result is always non-negative.
@@ -78,10 +156,19 @@ def mod_dist(a, b, n):
     mod_dist(11, 1, 12) == 2 because you can "wrap around".
 
     """
-    return min((a-b) % n, (b-a) % n)
-
-def gamma(color, gamma):
+    if out is None and not _is_array(a, b, n):
+        return min((a-b) % n, (b-a) % n)
+    out = _float_out(out, a, b, n)
+    numpy.subtract(a, b, out=out)
+    numpy.mod(out, n, out=out)
+    # (b-a) % n is n - (a-b) % n, except that both are 0 when a == b
+    return numpy.minimum(out, numpy.subtract(n, out), out=out)
+
+def gamma(color, gamma, out=None):
     """Apply a gamma curve to the color.  The color values should be in the range 0-1."""
-    r, g, b = color
-    return (max(r, 0) ** gamma, max(g, 0) ** gamma, max(b, 0) ** gamma)
-
+    if out is None and not _is_array(color, gamma):
+        r, g, b = color
+        return (max(r, 0) ** gamma, max(g, 0) ** gamma, max(b, 0) ** gamma)
+    out = _float_out(out, color, gamma)
+    numpy.maximum(color, 0, out=out)
+    return numpy.power(out, gamma, out=out)
@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+
+"""Blend several patterns into one frame.
+
+A Compositor renders a stack of layers, each running a pattern with the
+render(t, out) protocol of patterns.py, and blends them from the bottom
+up into a single float32 frame, which it then encodes to bytes once.
+Every buffer is allocated up front and every blend is done in place, so
+once the layers are set up, rendering a frame allocates no arrays (beyond
+whatever the patterns themselves allocate), only a few small Python
+objects along the way: under a kilobyte at its peak, in
+benchmarks/bench_compositor.py.
+
+    import compositor
+    import layout
+
+    comp = compositor.Compositor(layout.load('layouts/wall.json'))
+    base = comp.add_layer('raver_plaid')
+    sparkles = comp.add_layer('spatial_stripes', mode='screen', opacity=0.5)
+    ...
+    base.fade_to('black', 3, easing='smoothstep')  # a 3 second crossfade
+    while True:
+        comp.send(client, t)
+
+Blend modes, for a layer color s over the color d beneath it, both 0-255:
+
+    normal:    s
+    add:       d + s
+    multiply:  d * s / 255
+    screen:    255 - (255 - d) * (255 - s) / 255
+
+The result is then mixed with d by the layer's opacity.  Each layer's
+colors are clamped to 0-255 before blending.
+
+"""
+
+from __future__ import division
+import math
+
+import numpy
+
+import patterns
+
+BLEND_MODES = ('normal', 'add', 'multiply', 'screen')
+
+# easing curves for crossfades: each maps 0-1 progress to a 0-1 weight
+EASINGS = {
+    'linear': lambda x: x,
+    'smoothstep': lambda x: x * x * (3 - 2 * x),
+    'ease_in': lambda x: x * x,
+    'ease_out': lambda x: x * (2 - x),
+    'cosine': lambda x: (1 - math.cos(x * math.pi)) / 2,
+}
+
+
+def _black(t, out):
+    """What a layer without a pattern shows while fading."""
+    out[...] = 0
+
+
+class Layer(object):
+    """One pattern in a Compositor's stack.  Made by Compositor.add_layer.
+
+    mode and opacity can be changed at any time.  Setting render to None
+    hides the layer.
+
+    """
+
+    def __init__(self, render, n_pixels, mode='normal', opacity=1.0, resolve=None):
+        if mode not in BLEND_MODES:
+            raise ValueError('unknown blend mode %r (expected one of %s)'
+                             % (mode, ', '.join(BLEND_MODES)))
+        self.render = render
+        self.mode = mode
+        self.opacity = opacity
+        self.buffer = numpy.zeros((n_pixels, 3), dtype=numpy.float32)
+        # the pattern being faded to, and where it's drawn; _target is
+        # the same but None rather than _black when fading out
+        self._next = None
+        self._target = None
+        self._next_buffer = numpy.zeros((n_pixels, 3), dtype=numpy.float32)
+        self._fade_start = None
+        self._fade_duration = 0
+        self._easing = None
+        self._resolve = resolve  # turns pattern names into render functions
+
+    @property
+    def fading(self):
+        return self._next is not None
+
+    def fade_to(self, pattern, duration, easing='smoothstep'):
+        """Crossfade from the current pattern to another over duration seconds.
+
+        pattern is a render function, or a pattern name as for add_layer.
+        None hides the layer; fading to or from None fades to or from
+        black.  The fade starts at the next frame.  Starting another fade
+        before this one finishes jumps straight to its pattern first.
+
+        """
+        render = self._resolve(pattern) if self._resolve is not None else pattern
+        if self._next is not None:
+            self.render = self._target
+        self._easing = EASINGS[easing]
+        if duration <= 0 or (self.render is None and render is None):
+            self.render, self._next = render, None
+            return
+        if self.render is None:
+            self.render = _black
+        self._next = render if render is not None else _black
+        self._target = render
+        self._fade_start = None
+        self._fade_duration = duration
+
+    def draw(self, t):
+        """Render the layer's pattern, or crossfade, into self.buffer."""
+        buf = self.buffer
+        self.render(t, buf)
+        if self._next is not None:
+            if self._fade_start is None:
+                self._fade_start = t
+            progress = (t - self._fade_start) / self._fade_duration
+            if progress >= 1:
+                self.render, self._next = self._target, None
+                if self.render is None:
+                    buf[...] = 0
+                else:
+                    self.render(t, buf)
+            else:
+                weight = self._easing(max(0, progress))
+                nxt = self._next_buffer
+                self._next(t, nxt)
+                # buf += (nxt - buf) * weight
+                numpy.subtract(nxt, buf, out=nxt)
+                nxt *= weight
+                buf += nxt
+        numpy.clip(buf, 0, 255, out=buf)
+
+
+class Compositor(object):
+
+    def __init__(self, layout):
+        """Blend layers of patterns for a layout.Layout."""
+        self.layout = layout
+        self.n_pixels = layout.n_pixels
+        self.layers = []  # bottom first
+        self.frame = numpy.zeros((self.n_pixels, 3), dtype=numpy.float32)
+        self.pixels = numpy.zeros((self.n_pixels, 3), dtype=numpy.uint8)
+        self._scratch = numpy.zeros((self.n_pixels, 3), dtype=numpy.float32)
+
+    def pattern(self, pattern):
+        """Return a render function for a pattern name or render function."""
+        if pattern is None or callable(pattern):
+            return pattern
+        return patterns.PATTERNS[pattern](self.layout)
+
+    def add_layer(self, pattern, mode='normal', opacity=1.0, index=None):
+        """Add a layer on top of the stack, or at index, and return it.
+
+        pattern is either the name of a pattern in patterns.PATTERNS or a
+        render(t, out) function.
+
+        """
+        layer = Layer(self.pattern(pattern), self.n_pixels, mode, opacity, self.pattern)
+        if index is None:
+            self.layers.append(layer)
+        else:
+            self.layers.insert(index, layer)
+        return layer
+
+    def remove_layer(self, layer):
+        self.layers.remove(layer)
+
+    def render(self, t):
+        """Render and blend every layer into self.frame and return it."""
+        frame, scratch = self.frame, self._scratch
+        frame[...] = 0
+        for layer in self.layers:
+            if layer.render is None or layer.opacity <= 0:
+                continue
+            layer.draw(t)
+            src = layer.buffer
+            mode = layer.mode
+            if mode == 'add':
+                if layer.opacity < 1:
+                    numpy.multiply(src, layer.opacity, out=scratch)
+                    frame += scratch
+                else:
+                    frame += src
+                continue
+            # work out the blended color in scratch, then mix it in
+            if mode == 'normal':
+                if layer.opacity >= 1:
+                    frame[...] = src
+                    continue
+                scratch[...] = src
+            elif mode == 'multiply':
+                numpy.multiply(frame, src, out=scratch)
+                scratch *= 1 / 255
+            elif mode == 'screen':
+                # d + s - d * s / 255
+                numpy.multiply(frame, src, out=scratch)
+                scratch *= -1 / 255
+                scratch += frame
+                scratch += src
+            if layer.opacity >= 1:
+                frame[...] = scratch
+            else:
+                # frame += (scratch - frame) * opacity
+                scratch -= frame
+                scratch *= layer.opacity
+                frame += scratch
+        return frame
+
+    def encode(self):
+        """Clamp self.frame into the uint8 array self.pixels and return it."""
+        numpy.clip(self.frame, 0, 255, out=self._scratch)
+        numpy.copyto(self.pixels, self._scratch, casting='unsafe')
+        return self.pixels
+
+    def send(self, client, t, channel=0):
+        """Render, encode and send one frame with an opc.Client."""
+        self.render(t)
+        return client.put_pixels(self.encode(), channel)
@@ -4,90 +4,64 @@ A demo client for Open Pixel Control
 David Wallace / https://github.com/longears
 
 game of life
+
+With a layout file, the board is stretched over the layout's two largest
+dimensions and each pixel shows the cell nearest to it; without one, the
+cells are sent in order, row by row.  --rgb runs three boards at once, one
+in each of the red, green and blue channels.
 """
 
 from __future__ import division
-import time
-import os
-import sys
 import optparse
-import random
 
 import opc
+import frame_clock
+import layout
+import life
 
 # command line
 parser = optparse.OptionParser()
+parser.add_option('-l', '--layout', dest='layout',
+                    action='store', type='string',
+                    help='layout file')
 parser.add_option('-s', '--server', dest='server', default='127.0.0.1:7890',
                     action='store', type='string',
                     help='ip and port of server')
 parser.add_option('-f', '--fps', dest='fps', default=5,
                     action='store', type='int',
                     help='frames per second')
+parser.add_option('-x', '--width', dest='width', default=25,
+                    action='store', type='int',
+                    help='board width in cells')
+parser.add_option('-y', '--height', dest='height', default=25,
+                    action='store', type='int',
+                    help='board height in cells')
+parser.add_option('--clamp', dest='wrap', default=True,
+                    action='store_false',
+                    help='treat cells beyond the edges as dead instead of wrapping around')
+parser.add_option('--rgb', dest='rgb', default=False,
+                    action='store_true',
+                    help='run three boards, one per color channel')
 options, args = parser.parse_args()
 
-X_DIM = 25
-Y_DIM = 25
-
-def print_board(board):
-    for x in range(X_DIM):
-        for y in range(Y_DIM):
-            if board[x*X_DIM+y]==1:
-                print 'X',
-            else:
-                print '.',
-        print
-
-def rand_board():
-    board = ['0'] * X_DIM * Y_DIM
-    for x in range(X_DIM):
-        for y in range(Y_DIM):
-            if not random.randint(0,3):
-                board[x*X_DIM+y] = 1
-    return board
+# bit-packed boards are faster, but need a width that's a multiple of 64
+packed = options.width % life.WORD_BITS == 0
+boards = [life.Board(options.width, options.height, options.wrap, packed)
+          for ii in range(3 if options.rgb else 1)]
+for board in boards:
+    board.randomize(0.25)
 
-def count_cell_neighbor(x,y, board):
-    neighbor_count = 0
-    for nei_x in range(3):
-        if (x == 0 and nei_x == 0) or (x == (X_DIM-1) and nei_x == 2):
-            continue
-        for nei_y in range(3):
-            if (y == 0 and nei_y == 0) or (y == (Y_DIM-1) and nei_y == 2):
-                continue
-            if board[(x-1+nei_x)*X_DIM+y-1+nei_y] == 1:
-                neighbor_count += 1
-    return neighbor_count
+index = None
+if options.layout:
+    index = life.cell_index(layout.load(options.layout), boards[0])
 
-def tick(board):
-    new_board = ['0'] * X_DIM * Y_DIM
-    for x in range(X_DIM):
-        for y in range(Y_DIM):
-            n = count_cell_neighbor(x,y, board)
-            if n < 2 or n > 3:
-                new_board[x*X_DIM+y] = 0
-            elif n == 3 or (n == 2 and board[x*X_DIM+y] == 1):
-                new_board[x*X_DIM+y] = 1
-    return new_board
-
-def pixelify_board(board):
-    pixels = []
-    for cell in board:
-        pixels.append((130, 150, 120) if cell else (0,0,0))
-    return pixels
-
-def pixelify_triboard(r,g,b):
-    pixels = []
-    for rcell, gcell, bcell in zip(r,g,b):
-        print rcell,gcell,bcell
-        color = (130 if rcell else 0, 130 if gcell else 0, 130 if bcell else 0)
-        pixels.append(color)
-    return pixels
-
-board = rand_board()
-
-
-client = opc.Client(options.server)
+# still lifes and dead boards are only resent as a keepalive
+client = opc.Client(options.server, skip_unchanged=True)
+clock = frame_clock.FrameClock(options.fps)
+frame = None
 while True:
-    client.put_pixels(pixelify_board(board), channel=0)
-    board = tick(board)
-    time.sleep(1 / options.fps)
-
+    frame = life.pixelify(boards, index, out=frame)
+    client.put_pixels(frame, channel=0)
+    for board in boards:
+        board.step()
+    clock.tick()
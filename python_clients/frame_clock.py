@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+"""A frame clock for pattern loops that keeps a steady frame rate.
+
+Sleeping for 1/fps after each frame makes the real frame period the
+render time plus the sleep, so the frame rate drifts and jitters with the
+load.  A FrameClock instead sleeps until an absolute deadline on a
+monotonic clock, one frame period after the previous deadline, so the
+time spent rendering comes out of the sleep.
+
+Recommended use:
+
+    import frame_clock
+
+    clock = frame_clock.FrameClock(fps=30)
+    while True:
+        client.put_pixels(render_frame(), channel=0)
+        clock.tick()
+
+    print clock.stats()
+
+"""
+
+from __future__ import division
+import collections
+import time
+
+# time.monotonic doesn't go backwards when the system clock is set, but it
+# only exists in Python 3.3 and later.
+now = getattr(time, 'monotonic', time.time)
+
+SKIP = 'skip'
+CATCH_UP = 'catch_up'
+
+
+class FrameClock(object):
+
+    def __init__(self, fps, policy=SKIP, max_catch_up=None, history=600):
+        """Create a clock that ticks fps times per second.
+
+        policy says what to do when a frame finishes after its deadline:
+        * SKIP ('skip'): drop the deadlines that have already passed and wait
+          for the next one, so the output stays on the same time grid.
+        * CATCH_UP ('catch_up'): keep every deadline and return immediately
+          until the loop is back on schedule, so no frames are lost.
+          max_catch_up limits how many frames behind the clock may get
+          before it gives up and skips the rest (None means no limit).
+
+        history is how many recent frames stats() looks at.
+
+        """
+        if policy not in (SKIP, CATCH_UP):
+            raise ValueError('unknown policy %r' % policy)
+        self.fps = fps
+        self.period = 1 / fps
+        self.policy = policy
+        self.max_catch_up = max_catch_up
+
+        self.frames = 0
+        self.late_frames = 0
+        self.skipped_frames = 0
+
+        self._deadline = None  # set by the first tick
+        self._tick_times = collections.deque(maxlen=history)
+        self._jitter = collections.deque(maxlen=history)
+
+    def reset(self):
+        """Start the schedule over from the next tick, keeping the counters."""
+        self._deadline = None
+
+    def tick(self):
+        """Wait until the deadline for the next frame.
+
+        Returns the number of frame periods that were skipped to get back on
+        schedule, which is 0 unless the loop fell behind.
+
+        """
+        current = now()
+        if self._deadline is None:
+            self._deadline = current
+        self._deadline += self.period
+
+        skipped = 0
+        if current < self._deadline:
+            time.sleep(self._deadline - current)
+            current = now()
+        else:
+            self.late_frames += 1
+            behind = int((current - self._deadline) / self.period)
+            if self.policy == SKIP:
+                skipped = behind
+            elif self.max_catch_up is not None and behind > self.max_catch_up:
+                skipped = behind - self.max_catch_up
+            self._deadline += skipped * self.period
+            self.skipped_frames += skipped
+
+        self.frames += 1
+        self._jitter.append(current - self._deadline)
+        self._tick_times.append(current)
+        return skipped
+
+    def stats(self):
+        """Return a dict describing how well the clock kept to its schedule.
+
+        fps is the achieved frame rate over the recent history.  The jitter
+        values are percentiles, in seconds, of how long after its deadline
+        each recent frame actually started (negative when early).
+
+        """
+        times = self._tick_times
+        if len(times) > 1 and times[-1] > times[0]:
+            fps = (len(times) - 1) / (times[-1] - times[0])
+        else:
+            fps = 0.0
+        jitter = sorted(self._jitter)
+        return {
+            'target_fps': self.fps,
+            'fps': fps,
+            'frames': self.frames,
+            'late_frames': self.late_frames,
+            'skipped_frames': self.skipped_frames,
+            'jitter_p50': percentile(jitter, 50),
+            'jitter_p90': percentile(jitter, 90),
+            'jitter_p99': percentile(jitter, 99),
+            'jitter_max': jitter[-1] if jitter else 0.0,
+        }
+
+
+def percentile(sorted_values, pct):
+    """Return the pct'th percentile of an already sorted list (0 if empty)."""
+    if not sorted_values:
+        return 0.0
+    index = int(round((len(sorted_values) - 1) * pct / 100))
+    return sorted_values[index]
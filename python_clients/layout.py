@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+
+"""Load layout files into numpy arrays, with a binary cache.
+
+A layout file is a JSON array of objects like {"point": [x, y, z]}, one for
+each pixel, as used by gl_server.  Parsing big layouts is slow, so the
+first time a layout is loaded its coordinates are saved next to it as a
+.npy file.  Later loads memory-map that file instead of parsing the JSON.
+The cache is keyed by the JSON file's mtime and size, and falls back to a
+hash of its contents when the mtime changes, so touching a layout doesn't
+throw the cache away but editing it does.
+
+Recommended use:
+
+    import layout
+
+    wall = layout.load('layouts/wall.json')
+    wall.coordinates    # float32 array of shape (n_pixels, 3)
+    wall.normalized     # the same points scaled to 0-1 along each axis
+    wall.spatial_index.within((0, 0, 0), 0.5)   # indices of nearby pixels
+
+"""
+
+import hashlib
+import os
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+import numpy
+
+CACHE_SUFFIX = '.cache.npy'
+KEY_SUFFIX = '.cache.key'
+
+_loaded = {}  # layouts already loaded by this process, by absolute path
+
+
+class Layout(object):
+
+    def __init__(self, coordinates, path=None):
+        """Wrap an (n_pixels, 3) array of pixel coordinates.
+
+        Derived values are computed the first time they are used and then
+        kept, so they cost nothing for patterns that don't need them.
+
+        """
+        self.coordinates = coordinates
+        self.path = path
+        self.n_pixels = len(coordinates)
+        self._bounding_box = None
+        self._normalized = None
+        self._index = None
+        self._spatial_index = None
+
+    def __len__(self):
+        return self.n_pixels
+
+    @property
+    def bounding_box(self):
+        """A (mins, maxes) pair of float32 arrays holding min and max x, y, z."""
+        if self._bounding_box is None:
+            if self.n_pixels:
+                self._bounding_box = (self.coordinates.min(axis=0),
+                                      self.coordinates.max(axis=0))
+            else:
+                zeros = numpy.zeros(3, dtype=numpy.float32)
+                self._bounding_box = (zeros, zeros)
+        return self._bounding_box
+
+    @property
+    def normalized(self):
+        """The coordinates scaled to the range 0-1 along each axis.
+
+        An axis with no extent (such as y on the flat wall) maps to 0.
+
+        """
+        if self._normalized is None:
+            mins, maxes = self.bounding_box
+            extent = maxes - mins
+            extent[extent == 0] = 1
+            self._normalized = (self.coordinates - mins) / extent
+        return self._normalized
+
+    @property
+    def index(self):
+        """The index of each pixel in the layout, 0 to n_pixels-1."""
+        if self._index is None:
+            self._index = numpy.arange(self.n_pixels)
+        return self._index
+
+    @property
+    def spatial_index(self):
+        """A spatial.GridIndex for radius, nearest and bounding box queries."""
+        if self._spatial_index is None:
+            import spatial
+            self._spatial_index = spatial.GridIndex(self.coordinates)
+        return self._spatial_index
+
+
+def parse(path):
+    """Parse a layout JSON file into a float32 array of shape (n_pixels, 3)."""
+    with open(path) as f:
+        points = [item['point'] for item in json.load(f) if 'point' in item]
+    return numpy.array(points, dtype=numpy.float32).reshape(-1, 3)
+
+def load(path, use_cache=True):
+    """Return the Layout for the JSON or .npy file at path.
+
+    A layout is only read once per process.  A .npy file, such as
+    layouts/generate.py --binary writes, holds the float32 coordinates
+    and is memory-mapped as it is.  For JSON files, unless use_cache is
+    False, the coordinates come from the binary cache next to the file
+    when it is up to date, and the cache is (re)written when it isn't.  If
+    the cache can't be written, the layout is just kept in memory.
+
+    """
+    path = os.path.abspath(path)
+    if path in _loaded:
+        return _loaded[path]
+    if path.endswith('.npy'):
+        coordinates = numpy.load(path, mmap_mode='r')
+        if coordinates.dtype != numpy.float32 or coordinates.ndim != 2 or coordinates.shape[1] != 3:
+            raise ValueError('%s is not a float32 (n_pixels, 3) array' % path)
+    elif use_cache:
+        coordinates = _load_cached(path)
+    else:
+        coordinates = parse(path)
+    _loaded[path] = Layout(coordinates, path)
+    return _loaded[path]
+
+def _read_key(path):
+    """Return the (mtime, size, sha1) saved with the cache, or None."""
+    try:
+        with open(path + KEY_SUFFIX) as f:
+            mtime, size, digest = f.read().split()
+        return float(mtime), int(size), digest
+    except (IOError, OSError, ValueError):
+        return None
+
+def _write_key(path, mtime, size, digest):
+    with open(path + KEY_SUFFIX, 'w') as f:
+        f.write('%r %d %s\n' % (mtime, size, digest))
+
+def _load_cached(path):
+    stat = os.stat(path)
+    key = _read_key(path)
+    if key is not None and key[:2] == (stat.st_mtime, stat.st_size):
+        coordinates = _read_cache(path)
+        if coordinates is not None:
+            return coordinates
+
+    with open(path, 'rb') as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    if key is not None and key[2] == digest:
+        # touched but not changed: keep the cache and remember the new mtime
+        coordinates = _read_cache(path)
+        if coordinates is not None:
+            try:
+                _write_key(path, stat.st_mtime, stat.st_size, digest)
+            except (IOError, OSError):
+                pass
+            return coordinates
+
+    coordinates = parse(path)
+    try:
+        tmp_path = path + CACHE_SUFFIX + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            numpy.save(f, coordinates)
+        if os.path.exists(path + CACHE_SUFFIX):
+            os.remove(path + CACHE_SUFFIX)
+        os.rename(tmp_path, path + CACHE_SUFFIX)
+        _write_key(path, stat.st_mtime, stat.st_size, digest)
+    except (IOError, OSError):
+        return coordinates
+    return _read_cache(path) if len(coordinates) else coordinates
+
+def _read_cache(path):
+    """Memory-map the cached coordinates, or return None if they're unusable."""
+    try:
+        coordinates = numpy.load(path + CACHE_SUFFIX, mmap_mode='r')
+    except (IOError, OSError, ValueError):
+        return None
+    if coordinates.dtype != numpy.float32 or coordinates.ndim != 2 or coordinates.shape[1] != 3:
+        return None
+    return coordinates
@@ -31,18 +31,63 @@ Recommended use:
             print 'not connected'
         time.sleep(1/30.0)
 
+Programs built on asyncio (Python 3.4+) can use AsyncClient instead, whose
+put_pixels never blocks on the network: frames are queued, the newest frame
+wins when the server falls behind, and lost connections are retried with
+backoff.
+
+Installations with several OPC servers, one per controller, can use
+MultiClient to split each frame between them and send to all of them at
+once.
+
+To see where the time goes when a show stutters, give a client
+instruments=opc.Instruments(): client.stats() then reports histograms of
+encode and send times, bytes sent, reconnects and dropped frames, and
+they can be appended to a JSON lines file every few seconds.
+
 """
 
+import bisect
+import collections
+import json
 import socket
+import struct
+import threading
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None  # AsyncClient needs Python 3.4 or later
+
+# a monotonic clock where there is one, for measuring intervals
+_now = getattr(time, 'monotonic', time.time)
+
+# the most data one OPC message can carry, as its length is 16 bits
+MAX_LENGTH = 0xffff
+MAX_PIXELS = MAX_LENGTH // 3
 
 class Client(object):
 
-    def __init__(self, server_ip_port, long_connection=True, verbose=False):
+    def __init__(self, server_ip_port, long_connection=True, verbose=False,
+                 output_stage=None, skip_unchanged=False, keepalive=1.0,
+                 truncate=False, instruments=None, strand_length=None):
         """Create an OPC client object which sends pixels to an OPC server.
 
         server_ip_port should be an ip:port or hostname:port as a single string.
         For example: '127.0.0.1:7890' or 'localhost:7890'
 
+        That connects over TCP.  Other transports are chosen by a prefix:
+        'udp://10.0.0.2:7890' sends each OPC message as one UDP datagram,
+        and 'unix:///tmp/opc.sock' connects to a Unix domain socket.  Or
+        pass a transport object such as TcpTransport('10.0.0.2', 7890,
+        sndbuf=1 << 20) to choose its options.  See make_transport().
+
         There are two connection modes:
         * In long connection mode, we try to maintain a single long-lived
           connection to the server.  If that connection is lost we will try to
@@ -58,19 +103,63 @@ class Client(object):
 
         If verbose is True, the client will print debugging info to the console.
 
+        output_stage, if given, is an OutputStage applied to every message
+        just before it is sent: gamma, brightness, color order and a power
+        limit for the actual LEDs.  It can also be set or changed later as
+        client.output_stage.
+
+        If skip_unchanged is True, the client remembers the bytes last sent
+        to each channel and doesn't send a message that is identical to
+        them, except once every keepalive seconds (never, if keepalive is
+        None) so that a restarted server catches up.  If truncate is also
+        True, a message that did change is cut short after its last changed
+        pixel; the server leaves the pixels after that as they were.  The
+        savings are counted in skipped_messages, saved_bytes and saved_sends
+        (system calls that were not needed because nothing had changed).
+        What was sent is forgotten whenever the connection closes, so in
+        short connection mode every message is sent in full.
+
+        instruments, if given, is an Instruments that records how long
+        each put spends encoding and sending, and more; see stats().  It
+        can also be set later as client.instruments.  Without it the
+        client takes no timestamps at all.
+
+        An OPC message holds at most 21845 pixels.  For installations
+        wired as many strands of strand_length pixels, one per channel,
+        give strand_length and put_pixels will split each frame of any
+        size into one message per strand; see put_pixels.
+
         """
+        if strand_length is not None and not 1 <= strand_length <= MAX_PIXELS:
+            raise ValueError('strand_length must be 1-%d, not %r' % (MAX_PIXELS, strand_length))
         self.verbose = verbose
+        self.instruments = instruments
+        self.output_stage = output_stage
+        self.skip_unchanged = skip_unchanged
+        self.keepalive = keepalive
+        self.truncate = truncate
+        self.strand_length = strand_length
 
         self._long_connection = long_connection
 
-        self._ip, self._port = server_ip_port.split(':')
-        self._port = int(self._port)
+        if hasattr(server_ip_port, 'connect'):
+            self.transport = server_ip_port
+        else:
+            self.transport = make_transport(server_ip_port)
 
         self._socket = None  # will be None when we're not connected
+        self._lost = False  # whether the last connection failed or broke
+
+        self._frame_buffer = bytearray()  # reused by put_frame
+        self._sent = {}  # [bytes, time] last sent by channel, for skip_unchanged
+
+        self.skipped_messages = 0
+        self.saved_bytes = 0
+        self.saved_sends = 0
 
     def _debug(self, m):
         if self.verbose:
-            print '    %s' % str(m)
+            print('    %s' % str(m))
 
     def _ensure_connected(self):
         """Set up a connection if one doesn't already exist.
@@ -84,13 +173,19 @@ class Client(object):
 
         try:
             self._debug('_ensure_connected: trying to connect...')
-            self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self._socket.connect((self._ip, self._port))
+            self._socket = self.transport.connect()
             self._debug('_ensure_connected:    ...success')
+            if self.instruments is not None:
+                self.instruments.connects += 1
+                if self._lost:
+                    self.instruments.reconnects += 1
+            self._lost = False
             return True
         except socket.error:
             self._debug('_ensure_connected:    ...failure')
             self._socket = None
+            self._sent.clear()
+            self._lost = True
             return False
 
     def disconnect(self):
@@ -99,6 +194,7 @@ class Client(object):
         if self._socket:
             self._socket.close()
         self._socket = None
+        self._sent.clear()  # the next connection may be to a fresh server
 
     def can_connect(self):
         """Try to connect to the server.
@@ -127,6 +223,12 @@ class Client(object):
             Floats will be rounded down to integers.
             Values outside the legal range will be clamped.
 
+            pixels may also be an (n, 3) numpy array, which is clamped and
+            converted in one step, or any object supporting the buffer
+            protocol (bytes, bytearray, memoryview, a uint8 numpy array)
+            which is taken to already hold r, g, b bytes and is sent without
+            being copied.  See encode_pixels().
+
         Will establish a connection to the server as needed.
 
         On successful transmission of pixels, return True.
@@ -136,37 +238,1390 @@ class Client(object):
         with the first LED.  It's not possible to send a color just to one
         LED at a time (unless it's the first one).
 
+        If the client has a strand_length, the pixels are instead split
+        into strands of that many pixels (the last may be shorter), sent
+        to consecutive channels starting at channel, or at channel 1 if
+        channel is 0.  Their messages are packed into one buffer, kept
+        between calls, and sent in one write, as with put_frame.  Without
+        a strand_length, more than 21845 pixels raise ValueError.
+
         """
         self._debug('put_pixels: connecting')
+        instruments = self.instruments
         is_connected = self._ensure_connected()
         if not is_connected:
             self._debug('put_pixels: not connected.  ignoring these pixels.')
+            if instruments is not None:
+                instruments.dropped_frames += 1
             return False
 
+        if self.strand_length is not None:
+            started = None if instruments is None else _now()
+            message = pack_strands(pixels, self.strand_length, channel or 1,
+                                   self._frame_buffer, self.output_stage)
+            self._frame_buffer = message
+            return self._send_packed('put_pixels', message, started)
+
         # build OPC message
-        len_hi_byte = int(len(pixels)*3 / 256)
-        len_lo_byte = (len(pixels)*3) % 256
-        header = chr(channel) + chr(0) + chr(len_hi_byte) + chr(len_lo_byte)
-        pieces = [header]
-        for r, g, b in pixels:
-            r = min(255, max(0, int(r)))
-            g = min(255, max(0, int(g)))
-            b = min(255, max(0, int(b)))
-            pieces.append(chr(r) + chr(g) + chr(b))
-        message = ''.join(pieces)
+        if instruments is not None:
+            started = _now()
+        payload = encode_pixels(pixels)
+        if self.output_stage is not None:
+            payload = self.output_stage.apply(payload, channel)
+        length = len(payload)
+        if self.skip_unchanged:
+            sent_at = _now()
+            length = self._changed_length(channel, payload, sent_at)
+            if length is None:
+                self._debug('put_pixels: unchanged, not sending')
+                self.saved_sends += 1
+                return self._finish('put_pixels')
+        header = make_header(channel, length)
+        if instruments is not None:
+            encoded = _now()
+            instruments.add('encode', encoded - started)
 
         self._debug('put_pixels: sending pixels to server')
         try:
-            self._socket.send(message)
+            if length < len(payload):
+                self.transport.send(self._socket, [header, memoryview(payload)[:length]])
+            else:
+                self.transport.send(self._socket, [header, payload])
         except socket.error:
             self._debug('put_pixels: connection lost.  could not send pixels.')
-            self._socket = None
+            self._connection_lost()
+            return False
+        if instruments is not None:
+            instruments.add('send', _now() - encoded)
+            instruments.sent(len(header) + length)
+        if self.skip_unchanged:
+            self._remember(channel, payload, sent_at)
+        return self._finish('put_pixels')
+
+    def put_frame(self, frame, first_channel=0):
+        """Send pixels for several channels at once, in a single write.
+
+        frame: Either a dict mapping channel numbers to pixels, a sequence
+            of pixel lists (the first goes to first_channel, the next to
+            first_channel+1 and so on), or a numpy array of shape
+            (channels, pixels, 3).  Each channel's pixels may be anything
+            put_pixels accepts.
+
+        All of the OPC messages are packed back to back into one buffer,
+        which is kept between calls, and sent with one system call.  A
+        numpy array is packed with a handful of vectorized operations.
+
+        Will establish a connection to the server as needed.
+        Returns True on success or False on failure, like put_pixels.
+        Raises ValueError if a channel would be outside 0-255.
+
+        """
+        self._debug('put_frame: connecting')
+        instruments = self.instruments
+        is_connected = self._ensure_connected()
+        if not is_connected:
+            self._debug('put_frame: not connected.  ignoring this frame.')
+            if instruments is not None:
+                instruments.dropped_frames += 1
+            return False
+
+        started = None if instruments is None else _now()
+        message = pack_frame(frame, first_channel, self._frame_buffer, self.output_stage)
+        self._frame_buffer = message
+        return self._send_packed('put_frame', message, started)
+
+    def put_messages(self, messages):
+        """Send bytes that already hold one or more complete OPC messages.
+
+        messages may be any object supporting the buffer protocol, such as
+        a memoryview of a recording; it is sent as it is, without copying,
+        and without output_stage or skip_unchanged.  Returns True on
+        success or False on failure, like put_pixels.
+
+        """
+        instruments = self.instruments
+        if not self._ensure_connected():
+            self._debug('put_messages: not connected.  ignoring these messages.')
+            if instruments is not None:
+                instruments.dropped_frames += 1
             return False
+        if instruments is not None:
+            started = _now()
+        try:
+            self.transport.send(self._socket, [messages])
+        except socket.error:
+            self._debug('put_messages: connection lost.  could not send messages.')
+            self._connection_lost()
+            return False
+        if instruments is not None:
+            instruments.add('send', _now() - started)
+            instruments.sent(len(messages))
+        return self._finish('put_messages')
+
+    def stats(self):
+        """Return a dict of the client's counters and, with instruments,
+        their snapshot(): timing histograms in seconds, bytes sent,
+        connects, reconnects and dropped frames."""
+        stats = {
+            'connected': self._socket is not None,
+            'skipped_messages': self.skipped_messages,
+            'saved_bytes': self.saved_bytes,
+            'saved_sends': self.saved_sends,
+        }
+        if self.instruments is not None:
+            stats.update(self.instruments.snapshot())
+        return stats
+
+    def _send_packed(self, name, message, started):
+        """Send the messages packed into one buffer by put_frame or put_pixels.
+
+        started is when encoding began, if there are instruments.
 
+        """
+        instruments = self.instruments
+        buffers = [message]
+        if self.skip_unchanged:
+            sent_at = _now()
+            buffers, payloads = self._changed_messages(message, sent_at)
+            if not buffers:
+                self._debug('%s: unchanged, not sending' % name)
+                self.saved_sends += 1
+                return self._finish(name)
+        if instruments is not None:
+            encoded = _now()
+            instruments.add('encode', encoded - started)
+
+        self._debug('%s: sending frame to server' % name)
+        try:
+            self.transport.send(self._socket, buffers)
+        except socket.error:
+            self._debug('%s: connection lost.  could not send frame.' % name)
+            self._connection_lost()
+            return False
+        if instruments is not None:
+            instruments.add('send', _now() - encoded)
+            instruments.sent(sum(len(buf) for buf in buffers))
+        if self.skip_unchanged:
+            for channel, payload in payloads:
+                self._remember(channel, payload, sent_at)
+        return self._finish(name)
+
+    def _finish(self, name):
+        """End a successful put, closing the connection in short connection mode."""
         if not self._long_connection:
-            self._debug('put_pixels: disconnecting')
+            self._debug('%s: disconnecting' % name)
             self.disconnect()
-
         return True
 
+    def _connection_lost(self):
+        self._socket = None
+        self._sent.clear()
+        self._lost = True
+        if self.instruments is not None:
+            self.instruments.dropped_frames += 1
+
+    def _changed_length(self, channel, payload, now):
+        """Return how many bytes of payload to send, or None to skip it."""
+        last = self._sent.get(channel)
+        if last is None or len(last[0]) != len(payload):
+            return len(payload)
+        data, sent_at = last
+        if data == memoryview(payload):
+            if self.keepalive is not None and now - sent_at >= self.keepalive:
+                return len(payload)
+            self.skipped_messages += 1
+            self.saved_bytes += 4 + len(payload)
+            return None
+        if not self.truncate:
+            return len(payload)
+        end = _last_difference(data, payload) + 1
+        end += -end % 3  # whole pixels
+        self.saved_bytes += len(payload) - end
+        return end
+
+    def _changed_messages(self, message, now):
+        """Split a packed frame into the buffers that need to be sent.
+
+        Returns a list of memoryviews of message, with headers rewritten
+        where messages were truncated, and a list of (channel, payload)
+        to remember once they've been sent.
+
+        """
+        view = memoryview(message)
+        buffers = []
+        payloads = []
+        pos = 0
+        while pos < len(message):
+            channel = message[pos]
+            length = (message[pos+2] << 8) | message[pos+3]
+            payload = view[pos+4:pos+4+length]
+            send = self._changed_length(channel, payload, now)
+            if send is not None:
+                if send < length:
+                    message[pos+2:pos+4] = struct.pack('>H', send)
+                buffers.append(view[pos:pos+4+send])
+                payloads.append((channel, payload))
+            pos += 4 + length
+        return buffers, payloads
+
+    def _remember(self, channel, payload, now):
+        last = self._sent.get(channel)
+        if last is not None and len(last[0]) == len(payload):
+            last[0][:] = memoryview(payload)
+            last[1] = now
+        else:
+            self._sent[channel] = [bytearray(memoryview(payload)), now]
+
+
+def make_transport(address):
+    """Return a transport for an address string.
+
+    'host:port' or 'tcp://host:port' is a TcpTransport, 'udp://host:port'
+    a UdpTransport and 'unix:///path/to/socket' a UnixTransport, each with
+    its default options.
+
+    A transport's connect() returns a new connected socket, raising
+    socket.error on failure, and its send(sock, buffers) writes buffers,
+    a list of whole OPC messages that may be split between a header
+    buffer and a data buffer.
+
+    """
+    scheme, sep, rest = address.partition('://')
+    if not sep:
+        scheme, rest = 'tcp', address
+    if scheme == 'unix':
+        return UnixTransport(rest)
+    host, port = rest.rsplit(':', 1)
+    if scheme == 'tcp':
+        return TcpTransport(host, int(port))
+    if scheme == 'udp':
+        return UdpTransport(host, int(port))
+    raise ValueError('unknown transport %r in %r' % (scheme, address))
+
+
+class TcpTransport(object):
+
+    def __init__(self, host, port, nodelay=True, sndbuf=None):
+        """Connect to an OPC server over TCP, the standard way.
+
+        nodelay turns off Nagle's algorithm, so that a small message is
+        sent at once rather than waiting for the last one to be
+        acknowledged.  Frames are sent with one write each, so there is
+        nothing for Nagle's algorithm to merge.
+
+        sndbuf, if given, is the socket send buffer size in bytes.  By
+        default the kernel sizes it, growing it as needed on Linux.  A
+        buffer of a few frames lets each write return at once; a smaller
+        one makes put_pixels wait for a slow server instead of letting
+        frames back up.
+
+        """
+        self.host = host
+        self.port = port
+        self.nodelay = nodelay
+        self.sndbuf = sndbuf
+
+    def __str__(self):
+        return '%s:%d' % (self.host, self.port)
+
+    def connect(self):
+        sock = _new_socket(socket.AF_INET, socket.SOCK_STREAM, self.sndbuf)
+        try:
+            if self.nodelay:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.connect((self.host, self.port))
+        except socket.error:
+            sock.close()
+            raise
+        return sock
+
+    def send(self, sock, buffers):
+        # send_buffers keeps writing after partial writes
+        send_buffers(sock, buffers)
+
+
+class UnixTransport(object):
+
+    def __init__(self, path, sndbuf=None):
+        """Connect to an OPC server on this machine through a Unix domain
+        socket, which skips the TCP/IP stack altogether."""
+        self.path = path
+        self.sndbuf = sndbuf
+
+    def __str__(self):
+        return 'unix://' + self.path
+
+    def connect(self):
+        if not hasattr(socket, 'AF_UNIX'):
+            raise socket.error('Unix domain sockets are not available here')
+        sock = _new_socket(socket.AF_UNIX, socket.SOCK_STREAM, self.sndbuf)
+        try:
+            sock.connect(self.path)
+        except socket.error:
+            sock.close()
+            raise
+        return sock
+
+    def send(self, sock, buffers):
+        send_buffers(sock, buffers)
+
+
+class UdpTransport(object):
+
+    MAX_DATAGRAM = 65507  # the most data a UDP datagram over IPv4 can carry
+
+    def __init__(self, host, port, sndbuf=None):
+        """Send each OPC message to host:port as one UDP datagram.
+
+        There's no connection to set up or lose and no retransmission, so
+        a late or lost message never holds up the next one, but nothing
+        says whether messages arrive, either.  For lossy, low latency
+        links, and servers that read OPC over UDP.  A message over
+        MAX_DATAGRAM bytes (about 21800 pixels) can't be sent.
+
+        """
+        self.host = host
+        self.port = port
+        self.sndbuf = sndbuf
+
+    def __str__(self):
+        return 'udp://%s:%d' % (self.host, self.port)
+
+    def connect(self):
+        sock = _new_socket(socket.AF_INET, socket.SOCK_DGRAM, self.sndbuf)
+        try:
+            sock.connect((self.host, self.port))  # just sets the destination
+        except socket.error:
+            sock.close()
+            raise
+        return sock
+
+    def send(self, sock, buffers):
+        for pieces in _split_messages(buffers):
+            if hasattr(sock, 'sendmsg'):
+                sock.sendmsg(pieces)
+            elif len(pieces) == 1:
+                sock.send(pieces[0])
+            else:
+                sock.send(b''.join(piece.tobytes() for piece in pieces))
+
+
+def _new_socket(family, kind, sndbuf=None):
+    sock = socket.socket(family, kind)
+    if sndbuf:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, sndbuf)
+    return sock
+
+def _split_messages(buffers):
+    """Yield each OPC message in buffers as a list of memoryviews.
+
+    A message may be split between buffers after its header, as
+    put_pixels sends them, but a header may not be.
+
+    """
+    pieces = []
+    needed = 0  # bytes of the current message's data still to come
+    for buf in buffers:
+        view = memoryview(buf)
+        if view.ndim != 1 or view.itemsize != 1:
+            view = memoryview(view.tobytes())
+        pos = 0
+        if needed:
+            pieces.append(view[:needed])
+            pos = min(needed, len(view))
+            needed -= pos
+            if not needed:
+                yield pieces
+        while pos < len(view):
+            header = bytearray(view[pos:pos+4])
+            if len(header) < 4:
+                raise ValueError('an OPC header is split between buffers')
+            end = pos + 4 + ((header[2] << 8) | header[3])
+            pieces = [view[pos:end]]
+            if end > len(view):
+                needed = end - len(view)
+            else:
+                yield pieces
+            pos = end
+
+
+class OutputStage(object):
+
+    def __init__(self, gamma=1.0, brightness=1.0, color_order='RGB', max_power=None):
+        """Corrections applied to the encoded bytes just before they are sent.
+
+        Patterns are written for the simulator.  Real LEDs usually need a
+        gamma curve, often want to be dimmer, may be wired to expect their
+        color bytes in another order, and can draw more current than their
+        power supply provides.  An OutputStage does all of that to the 8 bit
+        data with a few vectorized numpy operations, after encoding:
+
+        gamma, brightness: each byte v becomes
+            255 * brightness * (v / 255) ** gamma
+            using a 256 entry lookup table built once, here.
+        color_order: the order the LEDs expect the colors in, such as
+            'GRB' or 'BGR' for many WS2801 and WS2812 strips.  Use
+            rgb_test_pattern.py to find out what yours expect.
+        max_power: the most power any one channel may draw, as a fraction
+            of all of its pixels at full white (0-1), or a dict of such
+            fractions by channel number.  Messages over the budget are
+            scaled down as a whole.  For example, 100 LEDs drawing 60 mA
+            each at full white on a 3 A supply need max_power=0.5.
+
+        Requires numpy.
+
+        """
+        levels = numpy.arange(256) / 255.0
+        lut = numpy.round(255 * brightness * levels ** gamma)
+        self.lut = numpy.clip(lut, 0, 255).astype(numpy.uint8)
+        self.color_order = color_order.upper()
+        if sorted(self.color_order) != ['B', 'G', 'R']:
+            raise ValueError('color_order must be a permutation of RGB, not %r' % color_order)
+        self._order = [('RGB').index(color) for color in self.color_order]
+        if self._order == [0, 1, 2]:
+            self._order = None
+        self.max_power = max_power
+
+    def apply(self, payload, channel=0):
+        """Return a corrected copy of one message's data as a uint8 array."""
+        data = _as_uint8(payload).reshape(1, -1)
+        out = numpy.empty_like(data)
+        numpy.take(self.lut, data, out=out)
+        self._reorder_and_limit(out, [channel])
+        return out.reshape(-1)
+
+    def apply_in_place(self, data, channels):
+        """Correct a 2D uint8 array holding one message's data per row."""
+        numpy.take(self.lut, data, out=data)
+        self._reorder_and_limit(data, channels)
+
+    def _reorder_and_limit(self, data, channels):
+        n_messages, length = data.shape
+        if self._order is not None and length:
+            pixels = data[:, :length - length % 3].reshape(n_messages, -1, 3)
+            pixels[...] = pixels[:, :, self._order]
+        if self.max_power is None or not length:
+            return
+        if isinstance(self.max_power, dict):
+            budgets = numpy.array([self.max_power.get(int(channel), 1.0) for channel in channels])
+        else:
+            budgets = numpy.array([self.max_power] * n_messages, dtype=float)
+        budgets *= 255 * length
+        totals = data.sum(axis=1, dtype=numpy.int64)
+        over = numpy.nonzero(totals > budgets)[0]
+        if len(over):
+            scale = budgets[over] / totals[over]
+            data[over] = data[over] * scale[:, None]
+
+
+class Histogram(object):
+
+    def __init__(self, lowest, highest, buckets_per_doubling=4):
+        """Count values in a fixed set of logarithmically spaced buckets.
+
+        Bucket edges go from lowest to at least highest, each
+        2 ** (1 / buckets_per_doubling) times the one before, with one more
+        bucket for values below lowest and one for values above the last
+        edge.  Adding a value is a binary search and an increment, and the
+        memory used never grows.  Percentiles are accurate to one bucket.
+
+        """
+        growth = 2 ** (1.0 / buckets_per_doubling)
+        self.edges = [lowest]
+        while self.edges[-1] < highest:
+            self.edges.append(self.edges[-1] * growth)
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.edges) + 1)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.edges, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, pct):
+        """Return the upper edge of the bucket holding the pct'th percentile."""
+        if not self.count:
+            return 0
+        rank = self.count * pct / 100.0
+        seen = 0
+        for ii, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                break
+        if ii >= len(self.edges):
+            return self.max
+        return max(self.min, min(self.max, self.edges[ii]))
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.total / float(self.count) if self.count else 0,
+            'min': self.min or 0,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max or 0,
+        }
+
+
+class Instruments(object):
+
+    STAGES = ('render', 'encode', 'send')
+
+    def __init__(self, dump_path=None, dump_interval=10.0):
+        """Timing histograms and counters for a client and its pattern loop.
+
+        Pass an Instruments to Client or AsyncClient as instruments= and
+        every put records how long encoding (including the output stage
+        and packing) and sending took, the bytes sent, reconnects and
+        dropped frames: messages that weren't sent because the connection
+        was down, or, for AsyncClient, were replaced in the queue.  The
+        pattern loop can record its own render time, and count the frames
+        its FrameClock skipped as dropped too:
+
+            started = frame_clock.now()
+            render_frame()
+            client.instruments.add('render', frame_clock.now() - started)
+            ...
+            client.instruments.dropped_frames += clock.tick()
+
+        Times are in seconds.  A client without instruments doesn't take
+        any timestamps at all.
+
+        If dump_path is given, a JSON line with snapshot() is appended to
+        that file every dump_interval seconds, after which the histograms
+        and counters start again from zero: each line covers the interval
+        since the one before.
+
+        """
+        self.timings = dict((stage, Histogram(1e-6, 10)) for stage in self.STAGES)
+        self.message_bytes = Histogram(1, 1 << 24, buckets_per_doubling=1)
+        self.dump_path = dump_path
+        self.dump_interval = dump_interval
+        self._next_dump = None
+        self.reset()
+
+    def reset(self):
+        """Start every histogram and counter again from zero."""
+        for histogram in self.timings.values():
+            histogram.reset()
+        self.message_bytes.reset()
+        self.frames = 0
+        self.bytes_sent = 0
+        self.connects = 0
+        self.reconnects = 0
+        self.dropped_frames = 0
+        self.started = time.time()
+
+    def add(self, stage, seconds):
+        """Record how long one frame spent in a stage."""
+        self.timings[stage].add(seconds)
+
+    def sent(self, n_bytes):
+        """Record one frame of n_bytes sent to the server."""
+        self.frames += 1
+        self.bytes_sent += n_bytes
+        self.message_bytes.add(n_bytes)
+        if self.dump_path is not None:
+            current = _now()
+            if self._next_dump is None:
+                self._next_dump = current + self.dump_interval
+            elif current >= self._next_dump:
+                self._next_dump = current + self.dump_interval
+                self.dump()
+
+    def snapshot(self):
+        """Return the counters and a summary of each histogram, as a dict."""
+        snapshot = {
+            'time': time.time(),
+            'since': self.started,
+            'frames': self.frames,
+            'bytes_sent': self.bytes_sent,
+            'connects': self.connects,
+            'reconnects': self.reconnects,
+            'dropped_frames': self.dropped_frames,
+            'message_bytes': self.message_bytes.summary(),
+        }
+        for stage, histogram in self.timings.items():
+            snapshot[stage] = histogram.summary()
+        return snapshot
+
+    def dump(self, path=None):
+        """Append snapshot() as a line of JSON to path and reset."""
+        with open(path or self.dump_path, 'a') as f:
+            f.write(json.dumps(self.snapshot(), sort_keys=True) + '\n')
+        self.reset()
+
+
+class FramePipeline(object):
+
+    def __init__(self, client, shape, channel=0, dtype=None):
+        """Render one frame while a background thread sends the previous one.
+
+        client: the Client used to send frames.
+        shape: (n_pixels, 3) for one channel, sent with put_pixels, or
+            (n_channels, n_pixels, 3), sent with put_frame starting at
+            channel.
+        dtype: the numpy dtype of the frame buffers (float64 by default).
+
+        Two frame buffers are allocated up front.  Render into back, then
+        call swap(): back is handed to the sender thread as it is and the
+        other buffer, once it has finished sending, becomes the new back.
+        Nothing is copied.  Rendering therefore overlaps the network
+        send, and a frame costs about max(render, send) instead of their sum.
+
+        Recommended use:
+
+            pipeline = opc.FramePipeline(client, (n_pixels, 3))
+            while True:
+                render_into(pipeline.back)
+                pipeline.swap()
+                clock.tick()
+
+        Requires numpy.
+
+        """
+        self.client = client
+        self.channel = channel
+        self.back = numpy.zeros(shape, dtype=dtype or numpy.float64)
+        self._front = numpy.zeros_like(self.back)
+        self._multichannel = len(shape) == 3
+
+        self._cond = threading.Condition()
+        self._pending = None  # the buffer being sent, if any
+        self._closed = False
+
+        self.frames_sent = 0
+        self.send_failures = 0
+        self.wait_time = 0.0  # seconds swap() spent waiting for the sender
+
+        self._thread = threading.Thread(target=self._send_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def swap(self):
+        """Queue back to be sent, and return the buffer to render next into.
+
+        Blocks only if the previous frame is still being sent.
+
+        """
+        with self._cond:
+            if self._pending is not None:
+                started = _now()
+                while self._pending is not None:
+                    self._cond.wait()
+                self.wait_time += _now() - started
+            self._pending = self.back
+            self.back, self._front = self._front, self.back
+            self._cond.notify_all()
+        return self.back
+
+    def flush(self):
+        """Wait until the last swapped frame has been sent."""
+        with self._cond:
+            while self._pending is not None:
+                self._cond.wait()
+
+    def close(self):
+        """Send the pending frame, if any, and stop the sender thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _send_forever(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                frame = self._pending
+            if self._multichannel:
+                sent = self.client.put_frame(frame, first_channel=self.channel)
+            else:
+                sent = self.client.put_pixels(frame, channel=self.channel)
+            with self._cond:
+                if sent:
+                    self.frames_sent += 1
+                else:
+                    self.send_failures += 1
+                self._pending = None
+                self._cond.notify_all()
+
+
+class MultiClient(object):
+
+    def __init__(self, shards, **client_options):
+        """Send each frame to several OPC servers at once.
+
+        shards maps parts of a frame to the servers that show them.  A key
+        is either:
+        * a (start, stop) range of pixel indices, for put_pixels: pixels
+          start to stop-1 of each frame go to that server, or
+        * a channel number, for put_frame: that channel's pixels go to
+          that server.
+        A value is an 'ip:port' string, which receives the part on channel
+        0 for a range and on the same channel for a channel, or an
+        ('ip:port', channel) pair to send it on another channel.  Two
+        ranges, or two channels, may not go to the same channel of the
+        same server, since one would overwrite the other.  For example,
+        3000 pixels on two controllers:
+
+            client = opc.MultiClient({(0, 1500): '10.0.0.1:7890',
+                                      (1500, 3000): '10.0.0.2:7890'})
+
+        There is one long-lived Client per server, made with
+        client_options (such as output_stage), and one thread per server
+        that sends its part of each frame, so that a frame takes as long
+        as the slowest server rather than the sum of them all.  The parts
+        are views of the encoded frame; nothing is copied to split it.
+        health() reports on each server's connection.
+
+        """
+        self._ranges = {}    # address -> [(start, stop, channel)]
+        self._channels = {}  # address -> {frame channel: channel sent on}
+        destinations = {}  # (kind, address, channel sent on) -> shards key
+        for key, server in shards.items():
+            address, channel = server if isinstance(server, tuple) else (server, None)
+            if isinstance(key, tuple):
+                start, stop = key
+                if not 0 <= start <= stop:
+                    raise ValueError('bad pixel range %r' % (key,))
+                channel = 0 if channel is None else channel
+                self._ranges.setdefault(address, []).append((start, stop, channel))
+            else:
+                channel = key if channel is None else channel
+                self._channels.setdefault(address, {})[key] = channel
+            destination = (isinstance(key, tuple), address, channel)
+            if destination in destinations:
+                raise ValueError('%r and %r both go to channel %d of %s'
+                                 % (destinations[destination], key, channel, address))
+            destinations[destination] = key
+        for ranges in self._ranges.values():
+            ranges.sort()
+        self._workers = dict((address, _ShardWorker(Client(address, **client_options)))
+                             for address in set(self._ranges) | set(self._channels))
+
+    @property
+    def clients(self):
+        """The Client for each server, by address."""
+        return dict((address, worker.client) for address, worker in self._workers.items())
+
+    def put_pixels(self, pixels, channel=0):
+        """Send one frame of pixels, split by the pixel ranges in shards.
+
+        pixels may be anything Client.put_pixels accepts.  They are
+        encoded once and each server is sent its slice.  channel is
+        ignored; each range goes out on the channel given in shards.
+        Returns True if every server was sent its part.
+
+        """
+        if not self._ranges:
+            raise ValueError('MultiClient has no pixel ranges for put_pixels')
+        payload = encode_pixels(pixels)
+        if numpy is None or not isinstance(payload, numpy.ndarray):
+            payload = memoryview(payload)
+        jobs = []
+        for address, ranges in self._ranges.items():
+            if len(ranges) == 1:
+                start, stop, channel = ranges[0]
+                jobs.append((address, 'put_pixels', payload[start*3:stop*3], channel))
+            else:
+                parts = dict((channel, payload[start*3:stop*3]) for start, stop, channel in ranges)
+                jobs.append((address, 'put_frame', parts, 0))
+        return self._run(jobs)
+
+    def put_frame(self, frame, first_channel=0):
+        """Send a multi-channel frame, split by the channels in shards.
+
+        frame is a dict, sequence or numpy array as for Client.put_frame.
+        Channels that aren't in shards are not sent anywhere.  Returns True
+        if every server was sent its part.
+
+        """
+        if not self._channels:
+            raise ValueError('MultiClient has no channels for put_frame')
+        if isinstance(frame, dict):
+            get = frame.get
+        else:
+            get = lambda channel: (frame[channel - first_channel]
+                                   if 0 <= channel - first_channel < len(frame) else None)
+        jobs = []
+        for address, channels in self._channels.items():
+            parts = {}
+            for channel, sent_as in channels.items():
+                pixels = get(channel)
+                if pixels is not None:
+                    parts[sent_as] = pixels
+            if parts:
+                jobs.append((address, 'put_frame', parts, 0))
+        return self._run(jobs)
+
+    def _run(self, jobs):
+        # hand every job but the last to its thread, and do the last here
+        for address, method, part, channel in jobs[:-1]:
+            self._workers[address].submit(method, part, channel)
+        ok = True
+        if jobs:
+            address, method, part, channel = jobs[-1]
+            ok = self._workers[address].call(method, part, channel)
+        for address, method, part, channel in jobs[:-1]:
+            ok = self._workers[address].wait() and ok
+        return ok
+
+    def health(self):
+        """Return a dict describing each server's connection, by address.
+
+        For each: connected, frames_sent, failures, consecutive_failures
+        (frames in a row that couldn't be sent, 0 when healthy),
+        last_send_time (seconds the last send took) and since_success
+        (seconds since a frame was last sent, None if never).
+
+        """
+        current = _now()
+        health = {}
+        for address, worker in self._workers.items():
+            health[address] = {
+                'connected': worker.client._socket is not None,
+                'frames_sent': worker.frames_sent,
+                'failures': worker.failures,
+                'consecutive_failures': worker.consecutive_failures,
+                'last_send_time': worker.last_send_time,
+                'since_success': (None if worker.last_success is None
+                                  else current - worker.last_success),
+            }
+        return health
+
+    def disconnect(self):
+        for worker in self._workers.values():
+            worker.client.disconnect()
+
+    def close(self):
+        """Stop the sender threads and drop every connection."""
+        for worker in self._workers.values():
+            worker.close()
+        self.disconnect()
+
+
+class _ShardWorker(object):
+    """A thread that sends one server's part of each frame for MultiClient."""
+
+    def __init__(self, client):
+        self.client = client
+        self.frames_sent = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_send_time = None
+        self.last_success = None
+
+        self._cond = threading.Condition()
+        self._job = None
+        self._result = None
+        self._error = None  # raised again by wait()
+        self._closed = False
+        self._thread = None  # started by the first submit
+
+    def call(self, method, part, channel):
+        """Send a part in the calling thread, and return whether it was sent."""
+        started = _now()
+        sent = getattr(self.client, method)(part, channel)
+        finished = _now()
+        self.last_send_time = finished - started
+        if sent:
+            self.frames_sent += 1
+            self.consecutive_failures = 0
+            self.last_success = finished
+        else:
+            self.failures += 1
+            self.consecutive_failures += 1
+        return sent
+
+    def submit(self, method, part, channel):
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._send_forever)
+                self._thread.daemon = True
+                self._thread.start()
+            self._job = (method, part, channel)
+            self._result = None
+            self._cond.notify_all()
+
+    def wait(self):
+        """Wait for the submitted part to be sent and return whether it was."""
+        with self._cond:
+            while self._result is None:
+                self._cond.wait()
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+        return self._result
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _send_forever(self):
+        while True:
+            with self._cond:
+                while self._job is None and not self._closed:
+                    self._cond.wait()
+                if self._job is None:
+                    return
+                job = self._job
+            try:
+                sent = self.call(*job)
+            except Exception as e:  # a bad frame, say; raise it in the caller
+                sent = False
+                self._error = e
+            with self._cond:
+                self._job = None
+                self._result = sent
+                self._cond.notify_all()
+
+
+class AsyncClient(object):
+
+    def __init__(self, server_ip_port, max_queue=2, min_backoff=0.1,
+                 max_backoff=5.0, verbose=False, loop=None, output_stage=None,
+                 instruments=None):
+        """Create an OPC client which sends pixels from an asyncio event loop.
+
+        server_ip_port is an ip:port or hostname:port string, as for Client.
+
+        put_pixels and put_frame never block.  They encode the pixels and
+        add the message to a queue of at most max_queue messages, which is
+        written to the server as fast as the connection allows.  When the
+        server falls behind, or while we're disconnected, the oldest queued
+        message is dropped to make room: the latest frame always wins.
+
+        The client connects when start() is called and keeps reconnecting
+        whenever the connection is lost or refused, waiting min_backoff
+        seconds at first and doubling that each time up to max_backoff.
+
+        output_stage is an OutputStage applied to every message, and
+        instruments an Instruments recording encode and send times, as for
+        Client.  Its send times are how long writing to the transport took.
+
+        Counters for monitoring: queue_depth, sent_frames, dropped_frames,
+        reconnects and connected, and all of them together from stats().
+
+        """
+        if asyncio is None:
+            raise RuntimeError('AsyncClient needs the asyncio module (Python 3.4+)')
+        self.verbose = verbose
+        self.output_stage = output_stage
+        self.instruments = instruments
+
+        self._ip, self._port = server_ip_port.split(':')
+        self._port = int(self._port)
+        self._loop = loop
+        self._min_backoff = min_backoff
+        self._max_backoff = max_backoff
+        self._backoff = min_backoff
+
+        self._queue = collections.deque()
+        self._max_queue = max_queue
+        self._transport = None  # will be None when we're not connected
+        self._paused = False
+        self._connecting = False
+        self._closed = False
+
+        self.sent_frames = 0
+        self.dropped_frames = 0
+        self.reconnects = 0
+
+    def _debug(self, m):
+        if self.verbose:
+            print('    %s' % str(m))
+
+    @property
+    def queue_depth(self):
+        """The number of messages waiting to be sent."""
+        return len(self._queue)
+
+    @property
+    def connected(self):
+        return self._transport is not None
+
+    def stats(self):
+        """Return a dict of the counters and, with instruments, their snapshot()."""
+        stats = {
+            'connected': self.connected,
+            'queue_depth': self.queue_depth,
+            'sent_frames': self.sent_frames,
+            'dropped_frames': self.dropped_frames,
+            'reconnects': self.reconnects,
+        }
+        if self.instruments is not None:
+            stats.update(self.instruments.snapshot())
+        return stats
+
+    def start(self):
+        """Start connecting to the server.  Call this from the event loop."""
+        if self._loop is None:
+            self._loop = asyncio.get_event_loop()
+        self._closed = False
+        self._connect()
+
+    def close(self):
+        """Drop the connection and stop reconnecting."""
+        self._debug('closing')
+        self._closed = True
+        if self._transport is not None:
+            self._transport.close()
+        self._transport = None
+
+    def put_pixels(self, pixels, channel=0):
+        """Queue the pixels to be sent on the given channel.
+
+        pixels may be anything Client.put_pixels accepts.  They are copied
+        into the queued message, so the caller may reuse its buffer at once.
+        Returns True if the message is sent or queued without dropping an
+        older one, False if an older message was dropped to make room.
+
+        """
+        if self.instruments is not None:
+            started = _now()
+        payload = encode_pixels(pixels)
+        if self.output_stage is not None:
+            payload = self.output_stage.apply(payload, channel)
+        message = make_header(channel, len(payload)) + memoryview(payload).tobytes()
+        if self.instruments is not None:
+            self.instruments.add('encode', _now() - started)
+        return self._enqueue(message)
+
+    def put_frame(self, frame, first_channel=0):
+        """Queue a whole multi-channel frame, as in Client.put_frame."""
+        if self.instruments is not None:
+            started = _now()
+        message = bytes(pack_frame(frame, first_channel, None, self.output_stage))
+        if self.instruments is not None:
+            self.instruments.add('encode', _now() - started)
+        return self._enqueue(message)
+
+    def _enqueue(self, message):
+        dropped = False
+        if len(self._queue) >= self._max_queue:
+            self._queue.popleft()
+            self.dropped_frames += 1
+            if self.instruments is not None:
+                self.instruments.dropped_frames += 1
+            dropped = True
+        self._queue.append(message)
+        self._flush()
+        return not dropped
+
+    def _flush(self):
+        """Write queued messages until the transport asks us to pause."""
+        instruments = self.instruments
+        while self._queue and self._transport is not None and not self._paused:
+            message = self._queue.popleft()
+            if instruments is not None:
+                started = _now()
+            self._transport.write(message)
+            self.sent_frames += 1
+            if instruments is not None:
+                instruments.add('send', _now() - started)
+                instruments.sent(len(message))
+
+    def _connect(self):
+        if self._closed or self._connecting or self._transport is not None:
+            return
+        self._debug('_connect: trying to connect...')
+        self._connecting = True
+        task = self._loop.create_task(self._loop.create_connection(
+            lambda: _AsyncClientProtocol(self), self._ip, self._port))
+        task.add_done_callback(self._connect_done)
+
+    def _connect_done(self, task):
+        self._connecting = False
+        if task.cancelled() or task.exception() is not None:
+            self._debug('_connect:    ...failure, retrying in %s seconds' % self._backoff)
+            self._reconnect_later()
+
+    def _reconnect_later(self):
+        if self._closed:
+            return
+        self.reconnects += 1
+        if self.instruments is not None:
+            self.instruments.reconnects += 1
+        self._loop.call_later(self._backoff, self._connect)
+        self._backoff = min(self._backoff * 2, self._max_backoff)
+
+    def _connection_made(self, transport):
+        self._debug('_connect:    ...success')
+        if self._closed:
+            transport.close()
+            return
+        self._transport = transport
+        self._paused = False
+        self._backoff = self._min_backoff
+        if self.instruments is not None:
+            self.instruments.connects += 1
+        # pause as soon as anything is left unsent, so that backed up frames
+        # wait in our queue, where newer frames can replace them
+        transport.set_write_buffer_limits(high=0)
+        self._flush()
+
+    def _connection_lost(self):
+        self._debug('connection lost')
+        self._transport = None
+        self._paused = False
+        self._reconnect_later()
+
+    def _pause_writing(self):
+        self._paused = True
+
+    def _resume_writing(self):
+        self._paused = False
+        self._flush()
+
+
+if asyncio is not None:
+
+    class _AsyncClientProtocol(asyncio.Protocol):
+        """Passes transport events on to an AsyncClient."""
+
+        def __init__(self, client):
+            self.client = client
+
+        def connection_made(self, transport):
+            self.client._connection_made(transport)
+
+        def connection_lost(self, exc):
+            self.client._connection_lost()
+
+        def pause_writing(self):
+            self.client._pause_writing()
+
+        def resume_writing(self):
+            self.client._resume_writing()
+
+        def data_received(self, data):
+            pass  # OPC servers don't send anything back
+
+
+def _as_uint8(data):
+    """Return a uint8 numpy array sharing data's memory where possible."""
+    try:
+        return numpy.frombuffer(data, dtype=numpy.uint8)
+    except AttributeError:  # numpy on Python 2 can't read a memoryview
+        return numpy.frombuffer(data.tobytes(), dtype=numpy.uint8)
+
+def _last_difference(a, b):
+    """Return the index of the last byte that differs between a and b."""
+    if numpy is not None:
+        return numpy.flatnonzero(_as_uint8(a) != _as_uint8(b))[-1]
+    a = bytearray(a)
+    b = bytearray(b)
+    for ii in range(len(a) - 1, -1, -1):
+        if a[ii] != b[ii]:
+            return ii
+    return -1
+
+
+def make_header(channel, length, command=0):
+    """Return the 4 byte OPC header for a message with length bytes of data."""
+    if length > MAX_LENGTH:
+        raise ValueError('an OPC message holds at most %d bytes (%d pixels), not %d; '
+                         'give the Client a strand_length to split larger frames'
+                         % (MAX_LENGTH, MAX_PIXELS, length))
+    return struct.pack('>BBH', channel, command, length)
+
+def encode_pixels(pixels):
+    """Convert pixels into the r, g, b bytes of an OPC message.
+
+    Returns an object supporting the buffer protocol whose len() is the
+    number of bytes.  Nothing is copied when pixels already hold bytes:
+
+    * bytes, bytearray and byte-sized memoryviews are returned as they are.
+    * uint8 numpy arrays are returned as a flat view.
+    * Any other buffer-protocol object with 1 byte items is returned as a
+      memoryview.
+    * Other numpy arrays (and, when numpy is installed, lists of tuples)
+      are clamped to 0-255 and truncated to integers in one vectorized step.
+    * Anything else is treated as a sequence of (r, g, b) tuples, the same
+      as put_pixels has always accepted.
+
+    """
+    if isinstance(pixels, (bytes, bytearray)):
+        return pixels
+    if not isinstance(pixels, (list, tuple)) and (
+            numpy is None or not isinstance(pixels, numpy.ndarray)):
+        try:
+            view = memoryview(pixels)
+        except TypeError:
+            pass
+        else:
+            if view.itemsize == 1:
+                return view if view.ndim == 1 else memoryview(view.tobytes())
+            # a buffer of ints or floats: clamp it like any other numbers
+            if numpy is None:
+                values = view.tolist()
+                pixels = list(zip(values[0::3], values[1::3], values[2::3]))
+            else:
+                pixels = numpy.asarray(view).reshape(-1, 3)
+
+    if numpy is not None:
+        if isinstance(pixels, numpy.ndarray) and pixels.dtype == numpy.uint8:
+            return numpy.ascontiguousarray(pixels).reshape(-1)
+        try:
+            array = numpy.asarray(pixels, dtype=numpy.float64)
+        except (TypeError, ValueError):
+            pass
+        else:
+            if array.ndim == 1 and array.size % 3 == 0 or array.shape[-1:] == (3,):
+                return numpy.clip(array, 0, 255).astype(numpy.uint8).reshape(-1)
+
+    payload = bytearray(len(pixels) * 3)
+    ii = 0
+    for r, g, b in pixels:
+        payload[ii] = min(255, max(0, int(r)))
+        payload[ii+1] = min(255, max(0, int(g)))
+        payload[ii+2] = min(255, max(0, int(b)))
+        ii += 3
+    return payload
+
+def pack_frame(frame, first_channel=0, buf=None, output_stage=None):
+    """Pack a frame as consecutive OPC messages into one bytearray.
+
+    frame is a dict, sequence or numpy array as described in
+    Client.put_frame.  If buf is a bytearray of the right size it is
+    filled and returned, otherwise a new one is made.  If output_stage
+    is given, it is applied to each message's data.  Raises ValueError
+    if any channel would be outside 0-255.
+
+    """
+    if (numpy is not None and isinstance(frame, numpy.ndarray)
+            and frame.ndim == 3 and frame.dtype != object):
+        n_channels, n_pixels = frame.shape[:2]
+        _check_channels(first_channel, first_channel + n_channels - 1)
+        length = n_pixels * 3
+        buf = _reuse(buf, n_channels * (4 + length))
+        messages = numpy.frombuffer(buf, dtype=numpy.uint8)
+        messages = messages.reshape(n_channels, 4 + length)
+        messages[:, 0] = numpy.arange(first_channel, first_channel + n_channels)
+        messages[:, 1:4] = bytearray(make_header(0, length))[1:]
+        data = frame.reshape(n_channels, length)
+        if frame.dtype == numpy.uint8:
+            messages[:, 4:] = data
+        else:
+            messages[:, 4:] = numpy.clip(data, 0, 255)
+        if output_stage is not None:
+            output_stage.apply_in_place(messages[:, 4:], messages[:, 0])
+        return buf
+
+    if isinstance(frame, dict):
+        items = sorted(frame.items())
+    else:
+        items = enumerate(frame, first_channel)
+    payloads = [(channel, encode_pixels(pixels)) for channel, pixels in items]
+    if payloads:
+        _check_channels(payloads[0][0], payloads[-1][0])
+    if output_stage is not None:
+        payloads = [(channel, output_stage.apply(payload, channel))
+                    for channel, payload in payloads]
+
+    buf = _reuse(buf, sum(4 + len(payload) for channel, payload in payloads))
+    view = memoryview(buf)
+    pos = 0
+    for channel, payload in payloads:
+        view[pos:pos+4] = make_header(channel, len(payload))
+        view[pos+4:pos+4+len(payload)] = payload
+        pos += 4 + len(payload)
+    return buf
+
+def _check_channels(first, last):
+    if first < 0 or last > 255:
+        raise ValueError('channels %d-%d are not all in 0-255' % (first, last))
+
+def pack_strands(pixels, strand_length, first_channel=1, buf=None, output_stage=None):
+    """Pack pixels as messages of strand_length pixels on consecutive channels.
+
+    pixels may be anything put_pixels accepts, and any number of them;
+    the last strand gets whatever is left over.  buf and output_stage
+    are as for pack_frame.
+
+    """
+    payload = encode_pixels(pixels)
+    size = strand_length * 3
+    n_full, tail = divmod(len(payload), size)
+    n_strands = n_full + (1 if tail or not n_full else 0)
+    if first_channel + n_strands > 256:
+        raise ValueError('%d pixels make %d strands of %d, too many for channels %d-255'
+                         % (len(payload) // 3, n_strands, strand_length, first_channel))
+    buf = _reuse(buf, n_strands * 4 + len(payload))
+    if numpy is not None:
+        data = _as_uint8(payload)
+        messages = numpy.frombuffer(buf, dtype=numpy.uint8)
+        full = messages[:n_full * (4 + size)].reshape(n_full, 4 + size)
+        full[:, 0] = numpy.arange(first_channel, first_channel + n_full)
+        full[:, 1:4] = bytearray(make_header(0, size))[1:]
+        full[:, 4:] = data[:n_full * size].reshape(n_full, size)
+        if output_stage is not None:
+            output_stage.apply_in_place(full[:, 4:], full[:, 0])
+        if n_strands > n_full:
+            # a short last strand, or an empty message when there are no pixels
+            last = messages[n_full * (4 + size):].reshape(1, 4 + tail)
+            last[:, :4] = bytearray(make_header(first_channel + n_full, tail))
+            last[:, 4:] = data[n_full * size:]
+            if output_stage is not None:
+                output_stage.apply_in_place(last[:, 4:], last[:, 0])
+        return buf
+
+    view = memoryview(buf)
+    payload = memoryview(payload)
+    pos = 0
+    for ii in range(n_strands):
+        strand = payload[ii*size:(ii+1)*size]
+        view[pos:pos+4] = make_header(first_channel + ii, len(strand))
+        view[pos+4:pos+4+len(strand)] = strand
+        pos += 4 + len(strand)
+    return buf
+
+def _reuse(buf, size):
+    """Return buf if it is a bytearray of size bytes, else a new one."""
+    if buf is None or len(buf) != size:
+        buf = bytearray(size)
+    return buf
+
+def send_buffers(sock, buffers):
+    """Write all of the buffers to sock, in order, as one stream of bytes.
+
+    Uses a single scatter-gather sendmsg() call where the platform has it so
+    the header and pixel data are never joined into a new string, and keeps
+    going after partial writes until everything has been sent.
 
+    """
+    if not hasattr(sock, 'sendmsg'):
+        if len(buffers) == 1:
+            sock.sendall(buffers[0])
+            return
+        message = bytearray()
+        for buf in buffers:
+            message += memoryview(buf)
+        sock.sendall(message)
+        return
+    views = [memoryview(buf).cast('B') for buf in buffers]
+    while views:
+        sent = sock.sendmsg(views)
+        while views and sent >= views[0].nbytes:
+            sent -= views[0].nbytes
+            views.pop(0)
+        if sent:
+            views[0] = views[0][sent:]
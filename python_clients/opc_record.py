@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+
+"""Record a stream of OPC messages to a file and replay it with its timing.
+
+Rendering a show once and replaying it costs almost nothing at show time:
+the replayer memory-maps the recording and hands each frame's bytes
+straight from the mapping to the socket.
+
+Record from a pattern by sending through a Recorder instead of a Client:
+
+    import opc, opc_record
+
+    client = opc.Client('localhost:7890')
+    recorder = opc_record.Recorder('show.opcrec', client)  # client is optional
+    while ...:
+        recorder.put_pixels(pixels, channel=0)
+    recorder.close()
+
+or record any program unchanged by pointing it at a recording server:
+
+    python_clients/opc_record.py record show.opcrec [--port 7891]
+    python_clients/miami.py --server localhost:7891
+
+and play the recording back:
+
+    python_clients/opc_record.py play show.opcrec [-s localhost:7890]
+        [--speed 1.0] [--loop] [--start 0]
+
+File format: an 8 byte magic string, then one record per frame, each a
+little-endian float64 timestamp in seconds and a uint32 length followed
+by that many bytes of complete OPC messages.  The file is only ever
+appended to.  Alongside it, <file>.index holds a float64 timestamp and
+uint64 file offset for every frame, so the replayer can seek without
+scanning; if the index is missing or short (say, after a crash) it is
+rebuilt from the recording.
+
+"""
+
+from __future__ import division
+import bisect
+import mmap
+import optparse
+import os
+import struct
+import sys
+import time
+
+import opc
+
+now = getattr(time, 'monotonic', time.time)
+
+MAGIC = b'OPCREC1\n'
+RECORD = struct.Struct('<dI')  # timestamp, length of the frame's messages
+INDEX = struct.Struct('<dQ')  # timestamp, offset of the frame's record
+INDEX_SUFFIX = '.index'
+LATE = 0.002  # seconds behind schedule before a frame counts as late
+
+
+class Recorder(object):
+
+    def __init__(self, path, client=None):
+        """Start a new recording at path, replacing any file that's there.
+
+        If client is given, everything recorded is also sent to it, so a
+        pattern can be watched while it's recorded.  Timestamps are
+        seconds since the Recorder was made.
+
+        """
+        self.path = path
+        self.client = client
+        self._file = open(path, 'wb')
+        self._index = open(path + INDEX_SUFFIX, 'wb')
+        self._file.write(MAGIC)
+        self._offset = len(MAGIC)
+        self._start = now()
+        self._frame_buffer = bytearray()
+        self.frames = 0
+
+    def put_pixels(self, pixels, channel=0):
+        """Record one message and send it to the client, if there is one."""
+        payload = opc.encode_pixels(pixels)
+        self.record([opc.make_header(channel, len(payload)), payload])
+        if self.client is not None:
+            return self.client.put_pixels(payload, channel)
+        return True
+
+    def put_frame(self, frame, first_channel=0):
+        """Record a whole frame, as for opc.Client.put_frame."""
+        self._frame_buffer = opc.pack_frame(frame, first_channel, self._frame_buffer)
+        self.record([self._frame_buffer])
+        if self.client is not None:
+            return self.client.put_frame(frame, first_channel)
+        return True
+
+    def record(self, buffers, timestamp=None):
+        """Append one frame made of buffers holding complete OPC messages."""
+        if timestamp is None:
+            timestamp = now() - self._start
+        length = sum(len(buf) for buf in buffers)
+        self._index.write(INDEX.pack(timestamp, self._offset))
+        self._file.write(RECORD.pack(timestamp, length))
+        for buf in buffers:
+            self._file.write(buf)
+        self._offset += RECORD.size + length
+        self.frames += 1
+
+    def close(self):
+        self._file.close()
+        self._index.close()
+
+
+class Replayer(object):
+
+    def __init__(self, path, client):
+        """Open the recording at path for playing to client, an opc.Client."""
+        self.path = path
+        self.client = client
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError('%s is not an OPC recording' % path)
+        try:
+            self._view = memoryview(self._map)
+        except TypeError:  # Python 2's mmap has no buffer interface
+            self._view = None
+        self.times, self.offsets = self._load_index()
+        self._position = 0
+
+        self.frames_played = 0
+        self.late_frames = 0
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def duration(self):
+        """Seconds from the first frame to the last."""
+        if not self.times:
+            return 0
+        return self.times[-1] - self.times[0]
+
+    def frame(self, ii):
+        """Return the bytes of frame ii, from the mapping without copying."""
+        start = self.offsets[ii] + RECORD.size
+        length = RECORD.unpack_from(self._map, self.offsets[ii])[1]
+        if self._view is None:
+            return self._map[start:start+length]
+        return self._view[start:start+length]
+
+    def seek(self, seconds):
+        """Make play() start at the first frame at or after seconds, or
+        at the last frame if seconds is past the end."""
+        if not self.times:
+            self._position = 0
+            return
+        self._position = min(bisect.bisect_left(self.times, self.times[0] + seconds), len(self) - 1)
+
+    def play(self, speed=1.0, loop=False):
+        """Send the frames to the client on their recorded schedule.
+
+        Each frame is due at an absolute deadline worked out from its
+        timestamp, so time spent sending is never added to the timeline.
+        Frames that are already due are sent at once; those more than LATE
+        seconds behind are counted in late_frames.  speed scales the
+        timeline; a speed of 0 sends every frame as fast as possible.  With
+        loop, playback goes back to the first frame at the end, forever.
+
+        """
+        if not self.offsets:
+            return
+        # loops are one average frame period apart, end to start
+        period = self.duration / max(len(self) - 1, 1)
+        start = now()
+        origin = self.times[self._position]
+        while True:
+            for ii in range(self._position, len(self)):
+                if speed:
+                    deadline = start + (self.times[ii] - origin) / speed
+                    wait = deadline - now()
+                    if wait > 0:
+                        time.sleep(wait)
+                    elif wait < -LATE:
+                        self.late_frames += 1
+                self.client.put_messages(self.frame(ii))
+                self.frames_played += 1
+            self._position = 0
+            if not loop:
+                return
+            origin -= self.duration + period
+
+    def close(self):
+        self._view = None
+        self._map.close()
+
+    def _load_index(self):
+        times, offsets = [], []
+        index_path = self.path + INDEX_SUFFIX
+        if os.path.exists(index_path):
+            with open(index_path, 'rb') as f:
+                data = f.read()
+            for pos in range(0, len(data) - INDEX.size + 1, INDEX.size):
+                timestamp, offset = INDEX.unpack_from(data, pos)
+                times.append(timestamp)
+                offsets.append(offset)
+        # forget frames the recording doesn't hold all of, then carry on
+        # from the last indexed frame in case the index is short
+        while offsets and not self._complete(offsets[-1]):
+            del times[-1], offsets[-1]
+        pos = len(MAGIC)
+        if offsets:
+            pos = offsets[-1] + RECORD.size + RECORD.unpack_from(self._map, offsets[-1])[1]
+        while self._complete(pos):
+            timestamp, length = RECORD.unpack_from(self._map, pos)
+            times.append(timestamp)
+            offsets.append(pos)
+            pos += RECORD.size + length
+        return times, offsets
+
+    def _complete(self, pos):
+        """Whether there is a whole record at pos."""
+        if pos + RECORD.size > len(self._map):
+            return False
+        return pos + RECORD.size + RECORD.unpack_from(self._map, pos)[1] <= len(self._map)
+
+
+def record_server(path, port):
+    """Record every message sent to an OPC server on port until control-c."""
+    import opc_sink
+
+    recorder = Recorder(path)
+    def handler(channel, command, payload):
+        recorder.record([opc.make_header(channel, len(payload), command), payload])
+    sink = opc_sink.Sink('', port, handler=handler)
+    sys.stderr.write('Recording OPC messages sent to port %d to %s\n' % (port, path))
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    recorder.close()
+    sys.stderr.write('\n%d messages recorded\n' % recorder.frames)
+
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser(usage='%prog record|play FILE [options]')
+    parser.add_option('-s', '--server', dest='server', default='127.0.0.1:7890',
+                        action='store', type='string',
+                        help='ip and port of server to play to')
+    parser.add_option('-p', '--port', dest='port', default=7891,
+                        action='store', type='int',
+                        help='port to listen on when recording')
+    parser.add_option('--speed', dest='speed', default=1.0,
+                        action='store', type='float',
+                        help='playback speed, or 0 for as fast as possible')
+    parser.add_option('--start', dest='start', default=0,
+                        action='store', type='float',
+                        help='seconds into the recording to start playing')
+    parser.add_option('--loop', dest='loop', action='store_true', default=False,
+                        help='play forever')
+    options, args = parser.parse_args()
+    if len(args) != 2 or args[0] not in ('record', 'play'):
+        parser.error('expected record or play and a file name')
+
+    if args[0] == 'record':
+        record_server(args[1], options.port)
+    else:
+        replayer = Replayer(args[1], opc.Client(options.server))
+        sys.stderr.write('%d frames, %.1f seconds\n' % (len(replayer), replayer.duration))
+        replayer.seek(options.start)
+        begin = now()
+        try:
+            replayer.play(options.speed, options.loop)
+        except KeyboardInterrupt:
+            pass
+        elapsed = now() - begin
+        sys.stderr.write('%d frames in %.2f seconds (%.0f fps), %d late\n' % (
+            replayer.frames_played, elapsed, replayer.frames_played / max(elapsed, 1e-9),
+            replayer.late_frames))
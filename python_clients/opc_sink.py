@@ -0,0 +1,375 @@
+#!/usr/bin/env python
+
+"""A pure Python Open Pixel Control server that receives and counts messages.
+
+Use it as a stand-in for dummy_server when you don't want to build the C
+servers, or as the receiving end of throughput benchmarks:
+
+    python_clients/opc_sink.py [port] [-q] [--udp | --unix PATH]
+
+prints each message like dummy_server does (unless -q is given) and a
+summary of per-channel statistics when you press control-c.  It listens
+for TCP connections unless --udp or --unix is given.
+
+Or run one inside a test or benchmark:
+
+    import opc_sink
+
+    sink = opc_sink.Sink(port=0)   # port 0 picks any free port
+    sink.start()                   # serve on a daemon thread
+    client = opc.Client(sink.address)
+    ...
+    print sink.stats()
+
+One thread serves any number of concurrent clients with a selector.  Each
+connection reads with recv_into() straight into its own preallocated
+buffer, and messages are parsed in place, so a message's pixel data is
+handed to the handler as a memoryview without being copied.
+
+"""
+
+from __future__ import division
+import collections
+import os
+import select
+import socket
+import stat
+import struct
+import sys
+import threading
+import time
+
+try:
+    import selectors
+except ImportError:
+    selectors = None  # Python 2: fall back to poll or select
+
+# a monotonic clock where there is one, for inter-arrival times
+now = getattr(time, 'monotonic', time.time)
+
+HEADER = struct.Struct('>BBH')
+MAX_MESSAGE = HEADER.size + 0xffff
+READ = 1  # selectors.EVENT_READ
+
+
+class ChannelStats(object):
+    """Counts of the messages received on one channel."""
+
+    def __init__(self, history):
+        self.messages = 0
+        self.bytes = 0
+        self.last_arrival = None
+        self.intervals = collections.deque(maxlen=history)
+
+    def add(self, length, arrival):
+        self.messages += 1
+        self.bytes += length
+        if self.last_arrival is not None:
+            self.intervals.append(arrival - self.last_arrival)
+        self.last_arrival = arrival
+
+    def summary(self):
+        """Return a dict of the counts and inter-arrival times in seconds."""
+        intervals = sorted(self.intervals)
+        result = {'messages': self.messages, 'bytes': self.bytes}
+        if intervals:
+            result['interval_mean'] = sum(intervals) / len(intervals)
+            result['interval_p50'] = intervals[int(round((len(intervals) - 1) * 0.5))]
+            result['interval_p99'] = intervals[int(round((len(intervals) - 1) * 0.99))]
+            result['interval_max'] = intervals[-1]
+        return result
+
+
+class _SelectSelector(object):
+    """The parts of selectors.DefaultSelector we use, built on poll(), or
+    select() where there is no poll()."""
+
+    def __init__(self):
+        self._data = {}
+        self._socks = {}  # by file descriptor, for poll()
+        self._poll = select.poll() if hasattr(select, 'poll') else None
+
+    def register(self, sock, events, data=None):
+        self._data[sock] = data
+        if self._poll is not None:
+            self._socks[sock.fileno()] = sock
+            self._poll.register(sock, select.POLLIN)
+
+    def unregister(self, sock):
+        del self._data[sock]
+        if self._poll is not None:
+            del self._socks[sock.fileno()]
+            self._poll.unregister(sock)
+
+    def select(self, timeout=None):
+        if self._poll is not None:
+            events = self._poll.poll(None if timeout is None else timeout * 1000)
+            readable = [self._socks[fd] for fd, event in events]
+        else:
+            readable = select.select(list(self._data), [], [], timeout)[0]
+        return [(_Key(sock, self._data[sock]), READ) for sock in readable]
+
+_Key = collections.namedtuple('_Key', 'fileobj data')
+
+
+class _Connection(object):
+    """The receive buffer for one client connection.
+
+    Bytes are received into the free space at the end of the buffer and
+    complete messages are parsed from the front.  When the free space runs
+    out, the partial message left over is moved to the front, which is the
+    only time any received bytes are copied.
+
+    """
+
+    def __init__(self, sock, size):
+        self.sock = sock
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.start = 0  # first unparsed byte
+        self.end = 0  # end of received bytes
+
+    def receive(self):
+        """Read what's available.  Returns the number of bytes, 0 on EOF."""
+        if self.end == len(self.buffer):
+            remaining = self.end - self.start
+            self.view[:remaining] = self.view[self.start:self.end]
+            self.start, self.end = 0, remaining
+        try:
+            n = self.sock.recv_into(self.view[self.end:])
+        except socket.error:
+            return 0
+        self.end += n
+        return n
+
+    def messages(self):
+        """Yield (channel, command, payload) for each complete message."""
+        while self.end - self.start >= HEADER.size:
+            channel, command, length = HEADER.unpack_from(self.buffer, self.start)
+            payload_start = self.start + HEADER.size
+            if self.end - payload_start < length:
+                break
+            self.start = payload_start + length
+            yield channel, command, self.view[payload_start:self.start]
+        if self.start == self.end:
+            self.start = self.end = 0
+
+
+class Sink(object):
+
+    def __init__(self, host='127.0.0.1', port=7890, handler=None,
+                 buffer_size=4 * MAX_MESSAGE, history=1000, transport='tcp'):
+        """Listen for OPC clients on host:port.
+
+        transport is 'tcp', 'udp' for messages in datagrams (any number
+        per datagram), or 'unix' to listen on a Unix domain socket at the
+        path host, ignoring port.  address is the string to give
+        opc.Client to connect here, such as 'udp://127.0.0.1:7890'.
+
+        handler, if given, is called as handler(channel, command, payload)
+        for every message, where payload is a memoryview of the message's
+        data that is only valid until the handler returns.
+
+        buffer_size is the receive buffer per connection.  It must hold at
+        least one whole message, and bigger buffers mean fewer system calls.
+
+        history is how many inter-arrival times are kept per channel.
+
+        """
+        if buffer_size < MAX_MESSAGE:
+            raise ValueError('buffer_size must be at least %d bytes' % MAX_MESSAGE)
+        self.handler = handler
+        self._buffer_size = buffer_size
+        self._history = history
+
+        self._path = None  # of a Unix domain socket, removed by stop()
+        self._datagrams = None  # the receive buffer, for udp
+        if transport == 'unix':
+            if os.path.exists(host) and stat.S_ISSOCK(os.stat(host).st_mode):
+                os.unlink(host)  # left over from an earlier sink
+            self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._listener.bind(host)
+            self._path = host
+            self.address = 'unix://' + host
+        elif transport in ('tcp', 'udp'):
+            kind = socket.SOCK_STREAM if transport == 'tcp' else socket.SOCK_DGRAM
+            self._listener = socket.socket(socket.AF_INET, kind)
+            self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._listener.bind((host, port))
+            self.address = '%s:%d' % self._listener.getsockname()[:2]
+        else:
+            raise ValueError('unknown transport %r' % transport)
+        if transport == 'udp':
+            self._datagrams = bytearray(MAX_MESSAGE)
+            self.address = 'udp://' + self.address
+        else:
+            self._listener.listen(socket.SOMAXCONN)
+        self._listener.setblocking(False)
+
+        if selectors is not None:
+            self._selector = selectors.DefaultSelector()
+        else:
+            self._selector = _SelectSelector()
+        self._selector.register(self._listener, READ)
+        self._connections = {}  # by socket
+        self._thread = None
+        self._running = False
+
+        self.channels = {}  # ChannelStats by channel number
+        self.bytes_received = 0
+        self.messages_received = 0
+        self.connections_accepted = 0
+
+    def poll(self, timeout=None):
+        """Wait up to timeout seconds for data and handle whatever arrives."""
+        for key, events in self._selector.select(timeout):
+            if key.data is not None:
+                self._read(key.data)
+            elif self._datagrams is not None:
+                self._receive_datagrams()
+            else:
+                self._accept()
+
+    def serve_forever(self):
+        self._running = True
+        self._serve()
+
+    def start(self):
+        """Serve on a daemon thread.  Returns self, for chaining."""
+        # set before the thread starts, so that a stop() straight after
+        # this can't be undone by the thread starting late
+        self._running = True
+        self._thread = threading.Thread(target=self._serve)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close every connection."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for sock in list(self._connections):
+            self._selector.unregister(sock)
+            sock.close()
+        self._connections.clear()
+        self._selector.unregister(self._listener)
+        self._listener.close()
+        if self._path is not None:
+            os.unlink(self._path)
+            self._path = None
+
+    def _serve(self):
+        while self._running:
+            self.poll(0.1)
+
+    def wait_for_bytes(self, n_bytes, timeout=10):
+        """Wait until n_bytes of complete messages have been received in total.
+
+        Returns False if that didn't happen within timeout seconds.
+
+        """
+        deadline = now() + timeout
+        while self.bytes_received < n_bytes and now() < deadline:
+            time.sleep(0.0005)
+        return self.bytes_received >= n_bytes
+
+    def stats(self):
+        """Return a dict of totals and per-channel statistics."""
+        return {
+            'bytes': self.bytes_received,
+            'messages': self.messages_received,
+            'connections': self.connections_accepted,
+            'open_connections': len(self._connections),
+            'channels': dict((channel, stats.summary())
+                             for channel, stats in self.channels.items()),
+        }
+
+    def _accept(self):
+        # short connection clients can connect faster than one accept per
+        # poll, so take everything that's waiting
+        while True:
+            try:
+                sock = self._listener.accept()[0]
+            except socket.error:
+                return
+            sock.setblocking(True)
+            connection = _Connection(sock, self._buffer_size)
+            self._connections[sock] = connection
+            self._selector.register(sock, READ, connection)
+            self.connections_accepted += 1
+
+    def _read(self, connection):
+        if not connection.receive():
+            self._selector.unregister(connection.sock)
+            del self._connections[connection.sock]
+            connection.sock.close()
+            return
+        arrival = now()
+        for channel, command, payload in connection.messages():
+            self._received(channel, command, payload, arrival)
+
+    def _receive_datagrams(self):
+        view = memoryview(self._datagrams)
+        while True:
+            try:
+                size = self._listener.recv_into(self._datagrams)
+            except socket.error:
+                return
+            arrival = now()
+            start = 0
+            while size - start >= HEADER.size:
+                channel, command, length = HEADER.unpack_from(self._datagrams, start)
+                end = start + HEADER.size + length
+                if end > size:
+                    break  # a truncated message; drop it
+                self._received(channel, command, view[start+HEADER.size:end], arrival)
+                start = end
+
+    def _received(self, channel, command, payload, arrival):
+        stats = self.channels.get(channel)
+        if stats is None:
+            stats = self.channels[channel] = ChannelStats(self._history)
+        stats.add(len(payload) + HEADER.size, arrival)
+        self.messages_received += 1
+        self.bytes_received += len(payload) + HEADER.size
+        if self.handler is not None:
+            self.handler(channel, command, payload)
+
+
+def print_message(channel, command, payload):
+    """Print a message the way dummy_server does."""
+    data = bytearray(payload[:12])
+    count = len(payload) // 3
+    line = '-> channel %d: %d pixel%s' % (channel, count, '' if count == 1 else 's')
+    sep = ' ='
+    for ii in range(min(count, 4)):
+        line += '%s %02x %02x %02x' % ((sep,) + tuple(data[ii*3:ii*3+3]))
+        sep = ','
+    if count > 4:
+        line += ', ...'
+    sys.stdout.write(line + '\n')
+
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if arg not in ('-q', '--udp')]
+    host, transport = '', 'udp' if '--udp' in sys.argv else 'tcp'
+    if '--unix' in args:
+        host, transport = args.pop(args.index('--unix') + 1), 'unix'
+        args.remove('--unix')
+    port = int(args[0]) if args else 7890
+    sink = Sink(host, port, handler=None if '-q' in sys.argv else print_message,
+                transport=transport)
+    sys.stderr.write('OPC: Listening on %s\n' % sink.address)
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    stats = sink.stats()
+    sys.stderr.write('\n%d messages, %d bytes, %d connections\n' % (
+        stats['messages'], stats['bytes'], stats['connections']))
+    for channel, summary in sorted(stats['channels'].items()):
+        sys.stderr.write('    channel %d: %d messages, %d bytes, %.1f ms between messages (p50)\n' % (
+            channel, summary['messages'], summary['bytes'],
+            summary.get('interval_p50', 0) * 1000))
@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+
+"""Run patterns one after another in a single long-running process.
+
+The host loads the layout and connects to the server once, then renders
+whichever pattern is current, frame after frame, on one frame clock.
+Switching patterns, or reloading patterns.py after editing it, happens
+between two frames: the connection stays up and the frame rate doesn't
+skip a beat.
+
+    python_clients/pattern_host.py -l layouts/freespace.json -p raver_plaid
+
+Then, from another shell:
+
+    python_clients/pattern_host.py --send 'switch spatial_stripes'
+    python_clients/pattern_host.py --send 'switch raver_plaid 5'
+    python_clients/pattern_host.py --send reload
+    python_clients/pattern_host.py --send list
+    python_clients/pattern_host.py --send stats
+
+Commands arrive as UDP datagrams on 127.0.0.1 (port 7899 by default),
+which the host reads without blocking once per frame.  It also reloads on
+SIGHUP and moves to the next pattern on SIGUSR1.  Replies, such as the
+list of patterns, go back to the sender.  A number of seconds after
+"switch NAME" crossfades to the new pattern over that long.  "stats"
+replies with the client's stats() as JSON, including render, encode and
+send times when the host was started with --stats FILE, which also
+appends them to FILE every 10 seconds.
+
+For patterns too slow to render at the frame rate the LEDs want, render
+at a lower -f and send at --output-fps: upsampler.py blends the rendered
+frames, optionally with --dither.
+
+See patterns.py for how to write a pattern.
+
+"""
+
+from __future__ import division
+import json
+import optparse
+import signal
+import socket
+import sys
+import traceback
+
+import compositor
+import frame_clock
+import layout
+import opc
+import patterns
+import upsampler
+
+try:
+    from importlib import reload
+except ImportError:
+    pass  # Python 2's builtin reload
+
+CONTROL_PORT = 7899
+
+
+class PatternHost(object):
+
+    def __init__(self, client, layout, fps=30, control_port=CONTROL_PORT, fade=0):
+        """Show patterns on layout through client, an opc.Client or
+        an upsampler.Upsampler.
+
+        control_port is the UDP port to listen for commands on, or None to
+        only take commands through switch() and reload().  fade is the
+        default crossfade time in seconds when switching patterns.
+
+        """
+        self.client = client
+        self.layout = layout
+        self.fade = fade
+        self.clock = frame_clock.FrameClock(fps)
+        self.compositor = compositor.Compositor(layout)
+        self.layer = self.compositor.add_layer(None)
+        self.registry = dict(patterns.PATTERNS)
+        self.name = None
+        self._commands = []  # queued by signal handlers and switch()
+
+        self._control = None
+        if control_port is not None:
+            self._control = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._control.bind(('127.0.0.1', control_port))
+            self._control.setblocking(False)
+
+    def register(self, name, factory):
+        """Add a pattern factory, as in patterns.register."""
+        self.registry[name] = factory
+
+    def switch(self, name, fade=None):
+        """Show the named pattern from the next frame on.
+
+        fade is the time in seconds to crossfade from the current pattern,
+        by default self.fade.
+
+        """
+        if name not in self.registry:
+            raise KeyError('no pattern called %s' % name)
+        render = self.registry[name](self.layout)
+        self.layer.fade_to(render, self.fade if fade is None else fade)
+        self.name = name
+
+    def next_pattern(self):
+        names = sorted(self.registry)
+        if self.name in names:
+            self.switch(names[(names.index(self.name) + 1) % len(names)])
+        elif names:
+            self.switch(names[0])
+
+    def reload(self):
+        """Reload patterns.py and restart the current pattern from it.
+
+        If the new code fails to import or to build the current pattern,
+        the error is printed and the old pattern keeps running.
+
+        """
+        try:
+            module = reload(patterns)
+            registry = dict(self.registry)
+            registry.update(module.PATTERNS)
+            render = registry[self.name](self.layout) if self.name in registry else None
+        except Exception:
+            traceback.print_exc()
+            return False
+        self.registry = registry
+        if render is not None:
+            self.layer.fade_to(render, 0)
+        return True
+
+    def handle_signals(self):
+        """Reload on SIGHUP and go to the next pattern on SIGUSR1."""
+        # the handlers only queue the work, which runs between frames
+        signal.signal(signal.SIGHUP, lambda *args: self._commands.append(('reload', None)))
+        signal.signal(signal.SIGUSR1, lambda *args: self._commands.append(('next', None)))
+
+    def run_frame(self, t):
+        """Handle waiting commands, then render and send one frame."""
+        self._poll_commands()
+        instruments = getattr(self.client, 'instruments', None)
+        if instruments is not None:
+            started = frame_clock.now()
+        try:
+            self.compositor.render(t)
+        except Exception:
+            traceback.print_exc()
+            sys.stderr.write('pattern %r failed; showing black\n' % self.name)
+            self.name = None
+            self.layer.fade_to(None, 0)
+            self.compositor.render(t)
+        if instruments is not None:
+            instruments.add('render', frame_clock.now() - started)
+        if isinstance(self.client, upsampler.Upsampler):
+            # it blends and dithers the unrounded frame itself
+            self.client.put_pixels(self.compositor.frame, channel=0)
+        else:
+            self.client.put_pixels(self.compositor.encode(), channel=0)
+
+    def run(self):
+        """Show patterns forever, one frame per clock tick."""
+        start = frame_clock.now()
+        instruments = getattr(self.client, 'instruments', None)
+        while True:
+            self.run_frame(frame_clock.now() - start)
+            skipped = self.clock.tick()
+            if instruments is not None:
+                instruments.dropped_frames += skipped
+
+    def _poll_commands(self):
+        while self._control is not None:
+            try:
+                data, sender = self._control.recvfrom(1024)
+            except socket.error:
+                break
+            words = data.decode('utf-8', 'replace').split()
+            if words:
+                self._commands.append((' '.join(words), sender))
+        while self._commands:
+            command, sender = self._commands.pop(0)
+            reply = self._run_command(command)
+            if sender is not None:
+                try:
+                    self._control.sendto(reply.encode('utf-8'), sender)
+                except socket.error:
+                    pass
+
+    def _run_command(self, command):
+        words = command.split()
+        if words[0] == 'switch' and len(words) in (2, 3):
+            if words[1] not in self.registry:
+                return 'error: no pattern called %s' % words[1]
+            try:
+                fade = float(words[2]) if len(words) == 3 else None
+            except ValueError:
+                return 'error: %s is not a number of seconds' % words[2]
+            try:
+                self.switch(words[1], fade)
+            except Exception:
+                traceback.print_exc()
+                return 'error: %s failed to start, see the host output' % words[1]
+            return 'ok'
+        if words[0] == 'next':
+            try:
+                self.next_pattern()
+            except Exception:
+                traceback.print_exc()
+                return 'error: the next pattern failed to start, see the host output'
+            return 'ok %s' % self.name
+        if words[0] == 'reload':
+            return 'ok' if self.reload() else 'error: reload failed, see the host output'
+        if words[0] == 'stats':
+            return json.dumps(self.client.stats(), sort_keys=True)
+        if words[0] == 'list':
+            return ' '.join('*' + name if name == self.name else name
+                            for name in sorted(self.registry))
+        return 'error: unknown command "%s" (try switch NAME [SECONDS], next, reload, list or stats)' % command
+
+
+def send_command(command, port=CONTROL_PORT, timeout=2):
+    """Send a command to a running host and return its reply."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(timeout)
+    sock.sendto(command.encode('utf-8'), ('127.0.0.1', port))
+    try:
+        return sock.recvfrom(65536)[0].decode('utf-8')
+    except socket.timeout:
+        return 'error: no reply from a pattern host on port %d' % port
+    finally:
+        sock.close()
+
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser()
+    parser.add_option('-l', '--layout', dest='layout',
+                        action='store', type='string',
+                        help='layout file')
+    parser.add_option('-s', '--server', dest='server', default='127.0.0.1:7890',
+                        action='store', type='string',
+                        help='ip and port of server')
+    parser.add_option('-f', '--fps', dest='fps', default=30,
+                        action='store', type='int',
+                        help='frames per second')
+    parser.add_option('-p', '--pattern', dest='pattern', default='raver_plaid',
+                        action='store', type='string',
+                        help='pattern to start with')
+    parser.add_option('--fade', dest='fade', default=0,
+                        action='store', type='float',
+                        help='seconds to crossfade when switching patterns')
+    parser.add_option('-c', '--control', dest='control', default=CONTROL_PORT,
+                        action='store', type='int',
+                        help='UDP port for commands')
+    parser.add_option('--stats', dest='stats',
+                        action='store', type='string',
+                        help='append timing statistics to this JSON lines file every 10 seconds')
+    parser.add_option('--output-fps', dest='output_fps',
+                        action='store', type='int',
+                        help='send frames at this rate, blending between the rendered ones')
+    parser.add_option('--easing', dest='easing', default='linear',
+                        action='store', type='choice', choices=sorted(compositor.EASINGS),
+                        help='how --output-fps blends from one frame to the next')
+    parser.add_option('--dither', dest='dither', default=False,
+                        action='store_true',
+                        help='dither the 8-bit output of --output-fps in time')
+    parser.add_option('--send', dest='send',
+                        action='store', type='string',
+                        help='send a command to a running host and exit')
+    options, args = parser.parse_args()
+
+    if options.send:
+        reply = send_command(options.send, options.control)
+        print(reply)
+        sys.exit(1 if reply.startswith('error') else 0)
+
+    if not options.layout:
+        parser.print_help()
+        print('')
+        print('ERROR: you must specify a layout file using --layout')
+        print('')
+        sys.exit(1)
+
+    instruments = opc.Instruments(options.stats) if options.stats else None
+    client = opc.Client(options.server, instruments=instruments)
+    pixels = layout.load(options.layout)
+    if options.output_fps:
+        client = upsampler.Upsampler(client, (pixels.n_pixels, 3), options.output_fps,
+                                     options.easing, options.dither)
+    host = PatternHost(client, pixels, options.fps, options.control, options.fade)
+    host.handle_signals()
+    host.switch(options.pattern)
+    sys.stderr.write('showing %s; patterns: %s\n' % (host.name, ', '.join(sorted(host.registry))))
+    sys.stderr.write('control port %d (try: %s --send list)\n' % (options.control, sys.argv[0]))
+    try:
+        host.run()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+
+"""Patterns that render whole frames at once, for pattern_host.py.
+
+A pattern is registered under a name as a factory.  The factory is called
+once with the Layout to show the pattern on and returns a render function,
+which is then called every frame as render(t, out): t is the time in
+seconds and out is a float32 array of shape (n_pixels, 3) to fill with
+r, g, b values in the range 0-255 (values outside it are clamped when
+the frame is sent).  Anything that doesn't depend on t belongs in the
+factory, so it is only worked out once.
+
+Per-pixel values that depend only on the layout, such as warped
+coordinates, can go further in a function decorated with @prepare.  It
+is called once per layout and its result kept, so switching back to a
+pattern, running it on several compositor layers, or sharing the values
+between patterns doesn't work them out again:
+
+    @prepare
+    def distance_from_center(layout):
+        offsets = layout.normalized - 0.5
+        return numpy.sqrt((offsets ** 2).sum(axis=1))
+
+    @register('my_pattern')
+    def my_pattern(layout):
+        distance = distance_from_center(layout)
+        def render(t, out):
+            color_utils.cos(distance, offset=t / 4, out=out[:, 0])
+            out[:, 0] *= 255
+        return render
+
+Whatever render needs as scratch space for each frame is allocated in
+the factory, so that rendering allocates no arrays.
+
+pattern_host.py picks up edits to this file when told to reload.
+
+"""
+
+from __future__ import division
+import functools
+import weakref
+
+import numpy
+
+import color_utils
+
+PATTERNS = {}  # factories by name
+
+
+def register(name):
+    """Decorator that adds a pattern factory to PATTERNS under name."""
+    def decorate(factory):
+        PATTERNS[name] = factory
+        return factory
+    return decorate
+
+def prepare(func):
+    """Decorator that caches func(layout) for as long as the layout lives.
+
+    The cached results are in the decorated function's cache attribute,
+    a WeakKeyDictionary by layout.  Results are shared, so treat them as
+    read-only.
+
+    """
+    cache = weakref.WeakKeyDictionary()
+
+    @functools.wraps(func)
+    def prepared(layout):
+        result = cache.get(layout)
+        if result is None:
+            result = cache[layout] = func(layout)
+        return result
+    prepared.cache = cache
+    return prepared
+
+
+@register('black')
+def black(layout):
+    def render(t, out):
+        out[...] = 0
+    return render
+
+
+@register('raver_plaid')
+def raver_plaid(layout):
+    """The rainbow plaid from raver_plaid.py, by pixel index."""
+    pct = numpy.arange(layout.n_pixels) / layout.n_pixels
+    pct_jittered = (pct * 77) % 37
+    waves = pct * 24
+    blackstripes = numpy.empty(layout.n_pixels)
+
+    def render(t, out):
+        color_utils.cos(pct_jittered, offset=t*0.05, period=1, minn=-1.5, maxx=1.5, out=blackstripes)
+        # numpy.add rather than +=, which would make blackstripes local to render
+        numpy.add(blackstripes, color_utils.cos(t, offset=0.9, period=60, minn=-0.5, maxx=3), out=blackstripes)
+        color_utils.clamp(blackstripes, 0, 1, out=blackstripes)
+        for channel, speed in enumerate([7, -13, 19]):
+            color = out[:, channel]
+            color_utils.cos(waves, offset=-t/speed, out=color)
+            color *= 256
+            color *= blackstripes
+    return render
+
+
+@register('spatial_stripes')
+def spatial_stripes(layout):
+    """The moving x, y, z stripes and spark from spatial_stripes.py."""
+    coordinates = numpy.asarray(layout.coordinates, dtype=numpy.float32)
+    n_pixels = layout.n_pixels
+    index = layout.index
+    spark = numpy.empty(n_pixels, dtype=numpy.float32)
+
+    def render(t, out):
+        color_utils.cos(coordinates, offset=t / 4, period=1, minn=0, maxx=0.7, out=out)
+        color_utils.contrast(out, 0.5, 2, out=out)
+        # a moving white dot showing the order of the pixels in the layout
+        color_utils.mod_dist(index, (t*80) % n_pixels, n_pixels, out=spark)
+        numpy.subtract(8, spark, out=spark)
+        numpy.multiply(spark, 2 / 8, out=spark)
+        color_utils.clamp(spark, 0, 1, out=spark)
+        out += spark[:, None]
+        out *= 256
+    return render
+
+
+@prepare
+def warped_coordinates(layout):
+    """The coordinates of the blobby patterns: each of x, y and z pushed
+    along by a cosine of the others, then rotated.  A float32 array of
+    shape (n_pixels, 3)."""
+    x, y, z = numpy.array(layout.coordinates, dtype=numpy.float64).T
+    y += color_utils.cos(x + 0.2*z, offset=0, period=1, minn=0, maxx=0.6)
+    z += color_utils.cos(x, offset=0, period=1, minn=0, maxx=0.3)
+    x += color_utils.cos(y + z, offset=0, period=1.5, minn=0, maxx=0.2)
+    return numpy.column_stack([y, z, x]).astype(numpy.float32)
+
+@prepare
+def nyan_cat_coordinates(layout):
+    """warped_coordinates with every seventh pixel moved somewhere else."""
+    xyz = warped_coordinates(layout).copy()
+    ii = layout.index[::7]
+    n_pixels = layout.n_pixels
+    xyz[::7, 0] += (ii*123) % 5 / n_pixels * 32.12
+    xyz[::7, 1] += (ii*137) % 5 / n_pixels * 22.23
+    xyz[::7, 2] += (ii*147) % 7 / n_pixels * 44.34
+    return xyz
+
+# the offsets of the slow waves that black out regions of the blobs
+BLACKOUT_OFFSETS = numpy.array([12.345, 24.536, 34.675])
+
+
+def _blobs(xyz, t, period, contrast, out):
+    """The r, g, b waves across warped coordinates, from 0 to 1."""
+    color_utils.cos(xyz, offset=t / 4, period=period, minn=0, maxx=1, out=out)
+    color_utils.contrast(out, 0.5, contrast, out=out)
+
+def _black_out(xyz, t, period, threshold, out, scratch, clampdown, offsets):
+    """Darken out where the sum of slower waves falls below threshold."""
+    numpy.add(BLACKOUT_OFFSETS, t / 10, out=offsets)
+    color_utils.cos(xyz, offset=offsets, period=period, minn=0, maxx=1, out=scratch)
+    numpy.sum(scratch, axis=1, out=clampdown)
+    clampdown /= 2
+    color_utils.remap(clampdown, threshold, threshold + 0.1, 0, 1, out=clampdown)
+    color_utils.clamp(clampdown, 0, 1, out=clampdown)
+    out *= clampdown[:, None]
+
+def _blue_and_orange(out, scratch):
+    """Fade green towards the mean of red and blue."""
+    # g = g * 0.6 + (r + b) / 2 * 0.4
+    numpy.add(out[:, 0], out[:, 2], out=scratch)
+    scratch *= 0.2
+    out[:, 1] *= 0.6
+    out[:, 1] += scratch
+
+def _wave(pct, t, out):
+    """A sharp wave moving along the pixels in order, mostly 0."""
+    numpy.subtract(t, pct, out=out)
+    color_utils.cos(out, offset=0, period=7, minn=0, maxx=1, out=out)
+    numpy.power(out, 20, out=out)
+
+def _twinkle(random_values, t, wave, out):
+    """Occasional pixels twinkling white where the wave passes."""
+    numpy.multiply(random_values, 7, out=out)
+    out += t * 0.07
+    numpy.mod(out, 1, out=out)
+    out *= 2
+    out -= 1
+    numpy.absolute(out, out=out)
+    color_utils.remap(out, 0, 1, -1 / 0.1, 1.1, out=out)
+    color_utils.clamp(out, -0.5, 1.1, out=out)
+    numpy.power(out, 5, out=out)
+    out *= wave
+    color_utils.clamp(out, -0.3, 1, out=out)
+
+
+@register('lava_lamp')
+def lava_lamp(layout):
+    """The moving blobby colors of lava_lamp.py (and of the willow tree's
+    lava lamp in tree_patterns.py)."""
+    xyz = warped_coordinates(layout)
+    scratch = numpy.empty_like(xyz)
+    clampdown = numpy.empty(layout.n_pixels, dtype=numpy.float32)
+    offsets = numpy.empty_like(BLACKOUT_OFFSETS)
+
+    def render(t, out):
+        t *= 0.6
+        _blobs(xyz, t, 2, 1.5, out)
+        _black_out(xyz, t, 3, 0.8, out, scratch, clampdown, offsets)
+        _blue_and_orange(out, clampdown)
+        out *= 256
+    return render
+
+
+@register('miami')
+def miami(layout):
+    """The blobby colors with sparkles on top of miami.py."""
+    xyz = warped_coordinates(layout)
+    pct = layout.index / layout.n_pixels
+    random_values = numpy.random.random(layout.n_pixels)
+    scratch = numpy.empty_like(xyz)
+    clampdown = numpy.empty(layout.n_pixels, dtype=numpy.float32)
+    offsets = numpy.empty_like(BLACKOUT_OFFSETS)
+    wave = numpy.empty(layout.n_pixels, dtype=numpy.float32)
+    twinkle = numpy.empty(layout.n_pixels, dtype=numpy.float32)
+
+    def render(t, out):
+        # the twinkles go at their own speed, the rest at 0.6
+        tt, t = t, t * 0.6
+        _blobs(xyz, t, 2.5, 1.4, out)
+        # ufuncs with out= rather than /= and the like, which would make
+        # clampdown local to render
+        numpy.sum(out, axis=1, out=clampdown)
+        color_utils.remap(clampdown, 0.8, 1, 0, 0.9, out=clampdown)
+        color_utils.clamp(clampdown, 0, 0.9, out=clampdown)
+        out *= clampdown[:, None]
+        _black_out(xyz, t, 4, 0.2, out, scratch, clampdown, offsets)
+        _blue_and_orange(out, clampdown)
+        # fade behind the twinkles
+        _wave(pct, t, wave)
+        color_utils.remap(wave, 0, 1, 1, 0.8, out=clampdown)
+        out *= clampdown[:, None]
+        _twinkle(random_values, tt, wave, twinkle)
+        out += twinkle[:, None]
+        out *= 256
+    return render
+
+
+@register('nyan_cat')
+def nyan_cat(layout):
+    """The mostly dark blobs of nyan_cat.py, lit up by a passing wave."""
+    xyz = nyan_cat_coordinates(layout)
+    pct = layout.index / layout.n_pixels
+    random_values = numpy.random.random(layout.n_pixels)
+    wave = numpy.empty(layout.n_pixels, dtype=numpy.float32)
+    twinkle = numpy.empty(layout.n_pixels, dtype=numpy.float32)
+
+    def render(t, out):
+        tt, t = t, t * 0.6
+        _blobs(xyz, t, 2, 1.5, out)
+        _wave(pct, t, wave)
+        out *= wave[:, None]
+        _twinkle(random_values, tt, wave, twinkle)
+        out += twinkle[:, None]
+        out *= 256
+    return render
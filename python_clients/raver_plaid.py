@@ -25,6 +25,7 @@ import sys
 
 import opc
 import color_utils
+import frame_clock
 
 
 #-------------------------------------------------------------------------------
@@ -75,6 +76,7 @@ speed_r = 7
 speed_g = -13
 speed_b = 19
 
+clock = frame_clock.FrameClock(fps)
 start_time = time.time()
 while True:
     t = time.time() - start_time
@@ -92,5 +94,5 @@ while True:
         b = blackstripes * color_utils.remap(math.cos((t/speed_b + pct*freq_b)*math.pi*2), -1, 1, 0, 256)
         pixels.append((r, g, b))
     client.put_pixels(pixels, channel=0)
-    time.sleep(1 / fps)
+    clock.tick()
 
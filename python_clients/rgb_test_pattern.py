@@ -13,11 +13,11 @@ Usage:
 """
 
 from __future__ import division
-import time
 import math
 import sys
 
-import opc_client
+import opc
+import frame_clock
 
 
 #-------------------------------------------------------------------------------
@@ -43,7 +43,13 @@ print
 print '    connecting to server at %s' % IP_PORT
 print
 
-SOCK = opc_client.get_socket(IP_PORT)
+client = opc.Client(IP_PORT)
+if client.can_connect():
+    print '    connected to %s' % IP_PORT
+else:
+    # can't connect, but keep running in case the server appears later
+    print '    WARNING: could not connect to %s' % IP_PORT
+print
 
 
 #-------------------------------------------------------------------------------
@@ -55,6 +61,7 @@ print
 n_pixels = 1250  # number of pixels in the included "wall" layout
 fps = 2         # frames per second (color switches every frame)
 
+clock = frame_clock.FrameClock(fps)
 while True:
     for c in range(4):
         pixels = []
@@ -64,6 +71,6 @@ while True:
         rgb = tuple(rgb)
         for ii in range(n_pixels):
             pixels.append(rgb)
-        opc_client.put_pixels(SOCK, 0, pixels)
-        time.sleep(1 / fps)
+        client.put_pixels(pixels, channel=0)
+        clock.tick()
 
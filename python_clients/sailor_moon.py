@@ -22,13 +22,11 @@ import time
 import sys
 import optparse
 import random
-try:
-    import json
-except ImportError:
-    import simplejson as json
 
 import opc
 import color_utils
+import frame_clock
+import layout
 
 
 #-------------------------------------------------------------------------------
@@ -56,16 +54,13 @@ if not options.layout:
 
 
 #-------------------------------------------------------------------------------
-# parse layout file
+# load layout file
 
 print
-print '    parsing layout file'
+print '    loading layout file'
 print
 
-coordinates = []
-for item in json.load(open(options.layout)):
-    if 'point' in item:
-        coordinates.append(tuple(item['point']))
+coordinates = layout.load(options.layout).coordinates.tolist()
 
 
 #-------------------------------------------------------------------------------
@@ -136,10 +131,11 @@ print
 
 n_pixels = len(coordinates)
 random_values = [random.random() for ii in range(n_pixels)]
+clock = frame_clock.FrameClock(options.fps)
 start_time = time.time()
 while True:
     t = time.time() - start_time
     pixels = [pixel_color(t*0.6, coord, ii, n_pixels, random_values) for ii, coord in enumerate(coordinates)]
     client.put_pixels(pixels, channel=0)
-    time.sleep(1 / options.fps)
+    clock.tick()
 
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+
+"""A spatial index over layout coordinates.
+
+Blobs, sparks and particles need the pixels near a point, and finding
+them by measuring the distance to every pixel costs a full pass over the
+layout for each query.  A GridIndex hashes the pixels into a uniform grid
+of cubic cells once, stored like a sparse matrix: the pixel indices
+sorted by cell and an offset array saying where each cell's pixels start.
+A query then only measures the pixels in the few cells it overlaps.
+
+Recommended use:
+
+    import layout
+
+    wall = layout.load('layouts/wall.json')
+    near = wall.spatial_index.within(spark_position, 0.3)
+    frame[near] = (255, 255, 255)
+
+Queries return arrays of pixel indices, which index frame buffers and
+coordinate arrays directly.  Each query through the grid has a fixed
+cost of a dozen or so numpy calls, so on layouts of fewer than
+SCAN_BELOW pixels a vectorized scan over every pixel is quicker, and
+that's what queries do there (see benchmarks/bench_spatial.py).
+
+"""
+
+from __future__ import division
+
+import numpy
+
+# within and in_box scan every pixel on layouts smaller than this, and
+# nearest, whose scan also sorts, on layouts a quarter of the size
+SCAN_BELOW = 4096
+
+
+class GridIndex(object):
+
+    def __init__(self, coordinates, cell_size=None, points_per_cell=4, scan_below=SCAN_BELOW):
+        """Hash an (n_pixels, 3) array of coordinates into grid cells.
+
+        cell_size is the edge length of a cell, in layout units.  By
+        default it's chosen so an average cell holds about points_per_cell
+        pixels, counting only the axes along which the layout is at least
+        a cell thick.  scan_below is the layout size under which queries
+        scan every pixel instead of using the grid.
+
+        """
+        self.coordinates = coordinates = numpy.asarray(coordinates, dtype=float).reshape(-1, 3)
+        self.n_pixels = len(coordinates)
+        if self.n_pixels:
+            self.mins = coordinates.min(axis=0)
+            extent = coordinates.max(axis=0) - self.mins
+        else:
+            self.mins = extent = numpy.zeros(3)
+        if cell_size is None:
+            cell_size = self._default_cell_size(extent, points_per_cell)
+        self.cell_size = float(cell_size)
+        self.scan_below = scan_below
+
+        self.shape = (extent // self.cell_size).astype(int) + 1
+        self._strides = numpy.array([self.shape[1] * self.shape[2], self.shape[2], 1])
+        keys = self._cells(coordinates).dot(self._strides)
+        # pixels sorted by cell; cell k's pixels are order[starts[k]:starts[k+1]]
+        self.order = numpy.argsort(keys, kind='mergesort')
+        counts = numpy.bincount(keys, minlength=int(numpy.prod(self.shape)))
+        self.starts = numpy.concatenate([[0], numpy.cumsum(counts)])
+
+    def _default_cell_size(self, extent, points_per_cell):
+        # an axis thinner than a cell is one cell thick whatever its
+        # extent, so leave it out and size the cells over the others;
+        # otherwise a layout that's almost flat gets cells as thin as it
+        spread = numpy.sort(extent[extent > 0])
+        while len(spread):
+            volume = numpy.prod(spread) * points_per_cell / self.n_pixels
+            cell_size = volume ** (1 / len(spread))
+            if spread[0] >= cell_size:
+                return cell_size
+            spread = spread[1:]
+        return 1.0
+
+    def _cells(self, points):
+        """The integer grid cell of each point, clipped to the grid."""
+        cells = ((points - self.mins) // self.cell_size).astype(int)
+        return numpy.clip(cells, 0, self.shape - 1)
+
+    def _candidates(self, lows, highs):
+        """The indices of every pixel in the cells from lows to highs."""
+        first = self._cells(numpy.asarray(lows, dtype=float))
+        last = self._cells(numpy.asarray(highs, dtype=float))
+        ranges = [numpy.arange(first[axis], last[axis] + 1) * self._strides[axis]
+                  for axis in range(3)]
+        keys = (ranges[0][:, None, None] + ranges[1][None, :, None]
+                + ranges[2][None, None, :]).reshape(-1)
+        starts = self.starts[keys]
+        lengths = self.starts[keys + 1] - starts
+        total = lengths.sum()
+        if not total:
+            return numpy.zeros(0, dtype=int)
+        # one arange over all the cells' runs of order, shifted per run
+        shifts = numpy.repeat(starts - numpy.cumsum(lengths) + lengths, lengths)
+        return self.order[shifts + numpy.arange(total)]
+
+    def within(self, point, radius):
+        """Return the sorted indices of the pixels within radius of point."""
+        point = numpy.asarray(point, dtype=float)
+        if self.n_pixels < self.scan_below:
+            offsets = self.coordinates - point
+            return numpy.flatnonzero(numpy.einsum('ij,ij->i', offsets, offsets) <= radius * radius)
+        candidates = self._candidates(point - radius, point + radius)
+        offsets = self.coordinates[candidates] - point
+        inside = numpy.einsum('ij,ij->i', offsets, offsets) <= radius * radius
+        return numpy.sort(candidates[inside])
+
+    def in_box(self, mins, maxes):
+        """Return the sorted indices of the pixels inside a bounding box."""
+        mins = numpy.asarray(mins, dtype=float)
+        maxes = numpy.asarray(maxes, dtype=float)
+        if self.n_pixels < self.scan_below:
+            points = self.coordinates
+            return numpy.flatnonzero(numpy.all((points >= mins) & (points <= maxes), axis=1))
+        candidates = self._candidates(mins, maxes)
+        points = self.coordinates[candidates]
+        inside = numpy.all((points >= mins) & (points <= maxes), axis=1)
+        return numpy.sort(candidates[inside])
+
+    def nearest(self, point, k=1):
+        """Return the indices of the k pixels nearest point, nearest first.
+
+        Searches a cube of cells around the point, growing it until it
+        holds k pixels that are closer than anything outside it could be.
+
+        """
+        point = numpy.asarray(point, dtype=float)
+        k = min(k, self.n_pixels)
+        if not k:
+            return numpy.zeros(0, dtype=int)
+        if self.n_pixels < self.scan_below // 4:
+            offsets = self.coordinates - point
+            distances = numpy.einsum('ij,ij->i', offsets, offsets)
+            return numpy.argsort(distances, kind='mergesort')[:k]
+        radius = self.cell_size
+        while True:
+            candidates = self._candidates(point - radius, point + radius)
+            offsets = self.coordinates[candidates] - point
+            distances = numpy.einsum('ij,ij->i', offsets, offsets)
+            # everything within radius of the point is in the cube; pixels
+            # further away might be outside it, and so not yet seen
+            if numpy.count_nonzero(distances <= radius * radius) >= k or len(candidates) == self.n_pixels:
+                closest = numpy.argsort(distances, kind='mergesort')[:k]
+                return candidates[closest]
+            radius *= 2
@@ -23,13 +23,11 @@ from __future__ import division
 import time
 import sys
 import optparse
-try:
-    import json
-except ImportError:
-    import simplejson as json
 
 import opc
 import color_utils
+import frame_clock
+import layout
 
 
 #-------------------------------------------------------------------------------
@@ -57,16 +55,13 @@ if not options.layout:
 
 
 #-------------------------------------------------------------------------------
-# parse layout file
+# load layout file
 
 print
-print '    parsing layout file'
+print '    loading layout file'
 print
 
-coordinates = []
-for item in json.load(open(options.layout)):
-    if 'point' in item:
-        coordinates.append(tuple(item['point']))
+coordinates = layout.load(options.layout).coordinates.tolist()
 
 
 #-------------------------------------------------------------------------------
@@ -125,10 +120,11 @@ print '    sending pixels forever (control-c to exit)...'
 print
 
 n_pixels = len(coordinates)
+clock = frame_clock.FrameClock(options.fps)
 start_time = time.time()
 while True:
     t = time.time() - start_time
     pixels = [pixel_color(t, coord, ii, n_pixels) for ii, coord in enumerate(coordinates)]
     client.put_pixels(pixels, channel=0)
-    time.sleep(1 / options.fps)
+    clock.tick()
 
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+"""Tests for bake, run with python -m unittest or pytest from python_clients."""
+
+import fractions
+import unittest
+
+import bake
+
+
+def constant(value):
+    return lambda t: [(value, value, value)]
+
+
+class LoopTest(unittest.TestCase):
+
+    def test_loop_period(self):
+        self.assertEqual(bake.loop_period(7, -13, 19, 60), 103740)
+        self.assertEqual(bake.loop_period(0.5, 0.75), fractions.Fraction(3, 2))
+        self.assertRaises(ValueError, bake.loop_period, 0)
+        self.assertRaises(ValueError, bake.loop_period)
+
+    def test_loop_frames(self):
+        self.assertEqual(bake.loop_frames(2, 20), 40)
+        # a third of a second isn't a whole number of frames at 20 fps
+        self.assertEqual(bake.loop_frames(fractions.Fraction(1, 3), 20), 20)
+
+
+class BakedPatternTest(unittest.TestCase):
+
+    def test_patterns_sharing_a_cache_keep_their_own_frames(self):
+        cache = bake.FrameCache()
+        red = bake.BakedPattern(constant(1), 1, 10, cache=cache)
+        green = bake.BakedPattern(constant(2), 1, 10, cache=cache)
+        self.assertEqual(red.frame(0), b'\x01\x01\x01')
+        self.assertEqual(green.frame(0), b'\x02\x02\x02')
+
+    def test_frame_rates_sharing_a_cache_keep_their_own_frames(self):
+        cache = bake.FrameCache()
+        render = lambda t: [(int(t * 100), 0, 0)]
+        slow = bake.BakedPattern(render, 1, 10, cache=cache)
+        fast = bake.BakedPattern(render, 1, 20, cache=cache)
+        slow.bake()
+        self.assertEqual(fast.frame(0.05), b'\x05\x00\x00')
+        self.assertEqual(slow.frame(0.1), b'\x0a\x00\x00')
+
+    def test_explicit_key_shares_frames(self):
+        cache = bake.FrameCache()
+        first = bake.BakedPattern(constant(1), 1, 10, cache=cache, key='show')
+        first.bake()
+        second = bake.BakedPattern(constant(2), 1, 10, cache=cache, key='show')
+        self.assertEqual(second.frame(0), b'\x01\x01\x01')
+        cache.clear(second.key)
+        self.assertEqual(len(cache), 0)
+
+    def test_frames_repeat_each_loop(self):
+        calls = []
+        def render(t):
+            calls.append(t)
+            return [(0, 0, 0)]
+        pattern = bake.BakedPattern(render, 1, 10)
+        pattern.bake()
+        pattern.frame(3.2)
+        self.assertEqual(len(calls), 10)
+        self.assertEqual(pattern.index(3.2), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
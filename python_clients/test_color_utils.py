@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+"""Tests that color_utils gives the same answers for numpy arrays as it
+does one scalar at a time.  Run with python -m unittest or pytest from
+python_clients."""
+
+import unittest
+
+import numpy
+
+import color_utils
+
+N = 500
+
+
+class ArrayParityTest(unittest.TestCase):
+
+    def setUp(self):
+        random = numpy.random.RandomState(0)
+        self.x = random.uniform(-3, 3, N)
+        self.y = random.uniform(-3, 3, N)
+        self.colors = random.uniform(-0.2, 1.2, (N, 3))
+        self.tuples = [tuple(color) for color in self.colors.tolist()]
+
+    def assertParity(self, scalar_results, array_result):
+        numpy.testing.assert_allclose(array_result, numpy.array(scalar_results, dtype=float),
+                                      rtol=1e-9, atol=1e-9)
+
+    def test_remap(self):
+        self.assertParity([color_utils.remap(v, -1, 2, 0, 256) for v in self.x],
+                          color_utils.remap(self.x, -1, 2, 0, 256))
+
+    def test_clamp(self):
+        self.assertParity([color_utils.clamp(v, -0.5, 1.5) for v in self.x],
+                          color_utils.clamp(self.x, -0.5, 1.5))
+
+    def test_cos(self):
+        self.assertParity([color_utils.cos(v, offset=0.3, period=2.5, minn=-1, maxx=3) for v in self.x],
+                          color_utils.cos(self.x, offset=0.3, period=2.5, minn=-1, maxx=3))
+
+    def test_cos_with_array_offset(self):
+        self.assertParity([color_utils.cos(v, offset=w) for v, w in zip(self.x, self.y)],
+                          color_utils.cos(self.x, offset=self.y))
+
+    def test_contrast(self):
+        self.assertParity([color_utils.contrast(c, 0.5, 1.4) for c in self.tuples],
+                          color_utils.contrast(self.colors, 0.5, 1.4))
+
+    def test_clip_black_by_luminance(self):
+        self.assertParity([color_utils.clip_black_by_luminance(c, 0.5) for c in self.tuples],
+                          color_utils.clip_black_by_luminance(self.colors, 0.5))
+
+    def test_clip_black_by_channels(self):
+        self.assertParity([color_utils.clip_black_by_channels(c, 0.5) for c in self.tuples],
+                          color_utils.clip_black_by_channels(self.colors, 0.5))
+
+    def test_mod_dist(self):
+        self.assertParity([color_utils.mod_dist(v, w, 2.5) for v, w in zip(self.x, self.y)],
+                          color_utils.mod_dist(self.x, self.y, 2.5))
+
+    def test_gamma(self):
+        self.assertParity([color_utils.gamma(c, 2.2) for c in self.tuples],
+                          color_utils.gamma(self.colors, 2.2))
+
+    def test_out(self):
+        out = numpy.empty((N, 3))
+        self.assertTrue(color_utils.gamma(self.colors, 2.2, out=out) is out)
+        self.assertParity(color_utils.gamma(self.colors, 2.2), out)
+        out = numpy.empty(N)
+        self.assertTrue(color_utils.cos(self.x, offset=0.3, out=out) is out)
+        self.assertParity(color_utils.cos(self.x, offset=0.3), out)
+
+    def test_scalars_stay_scalars(self):
+        self.assertTrue(isinstance(color_utils.remap(0.5, 0, 1, 0, 10), float))
+        self.assertTrue(isinstance(color_utils.gamma((0.5, 0.5, 0.5), 2.2), tuple))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+
+"""Tests for compositor, run with python -m unittest or pytest from python_clients."""
+
+import unittest
+
+import numpy
+
+import compositor
+
+
+class FakeLayout(object):
+    n_pixels = 2
+
+
+def constant(color):
+    def render(t, out):
+        out[...] = color
+    return render
+
+
+class BlendTest(unittest.TestCase):
+
+    def blend(self, mode, opacity=1.0):
+        comp = compositor.Compositor(FakeLayout())
+        comp.add_layer(constant(100))
+        comp.add_layer(constant(200), mode=mode, opacity=opacity)
+        return comp.render(0)[0, 0]
+
+    def test_modes(self):
+        self.assertAlmostEqual(self.blend('normal'), 200)
+        self.assertAlmostEqual(self.blend('add'), 300)
+        self.assertAlmostEqual(self.blend('multiply'), 100 * 200 / 255.0, places=3)
+        self.assertAlmostEqual(self.blend('screen'), 255 - 155 * 55 / 255.0, places=3)
+
+    def test_opacity(self):
+        self.assertAlmostEqual(self.blend('normal', 0.25), 125)
+        self.assertAlmostEqual(self.blend('add', 0.25), 150)
+
+    def test_layers_are_clamped_before_blending(self):
+        comp = compositor.Compositor(FakeLayout())
+        comp.add_layer(constant(400))
+        comp.add_layer(constant(-50), mode='add')
+        self.assertAlmostEqual(comp.render(0)[0, 0], 255)
+
+    def test_unknown_mode(self):
+        comp = compositor.Compositor(FakeLayout())
+        self.assertRaises(ValueError, comp.add_layer, constant(0), mode='overlay')
+
+
+class FadeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.comp = compositor.Compositor(FakeLayout())
+        self.comp.add_layer(constant(40))
+        self.layer = self.comp.add_layer(constant(200))
+
+    def test_crossfade(self):
+        self.layer.fade_to(constant(100), 2, easing='linear')
+        self.assertAlmostEqual(self.comp.render(10)[0, 0], 200)
+        self.assertAlmostEqual(self.comp.render(11)[0, 0], 150)
+        self.assertAlmostEqual(self.comp.render(12)[0, 0], 100)
+        self.assertFalse(self.layer.fading)
+
+    def test_fade_out_to_none(self):
+        self.layer.fade_to(None, 2, easing='linear')
+        self.comp.render(0)
+        self.assertAlmostEqual(self.comp.render(1)[0, 0], 100)
+        self.assertTrue(self.layer.fading)
+        self.comp.render(2)
+        self.assertTrue(self.layer.render is None)
+        # hidden, so the layer beneath shows
+        self.assertAlmostEqual(self.comp.render(3)[0, 0], 40)
+
+    def test_fade_in_from_none(self):
+        self.layer.fade_to(None, 0)
+        self.layer.fade_to(constant(200), 2, easing='linear')
+        self.comp.render(0)
+        self.assertAlmostEqual(self.comp.render(1)[0, 0], 100)
+        self.assertAlmostEqual(self.comp.render(2)[0, 0], 200)
+
+    def test_new_fade_jumps_to_the_last(self):
+        self.layer.fade_to(None, 2)
+        self.comp.render(0)
+        self.layer.fade_to(constant(100), 2, easing='linear')
+        # the fade to None is cut short, so this one fades in from black
+        self.comp.render(5)
+        self.assertAlmostEqual(self.comp.render(6)[0, 0], 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+
+"""Tests for life, run with python -m unittest or pytest from python_clients."""
+
+import unittest
+
+import numpy
+
+import life
+
+
+def reference_step(cells, wrap):
+    """One generation, cell by cell."""
+    height, width = cells.shape
+    result = numpy.zeros_like(cells)
+    for y in range(height):
+        for x in range(width):
+            neighbours = 0
+            for dy in (-1, 0, 1):
+                for dx in (-1, 0, 1):
+                    if dx or dy:
+                        yy, xx = y + dy, x + dx
+                        if wrap:
+                            neighbours += cells[yy % height, xx % width]
+                        elif 0 <= yy < height and 0 <= xx < width:
+                            neighbours += cells[yy, xx]
+            result[y, x] = neighbours == 3 or (cells[y, x] and neighbours == 2)
+    return result
+
+
+class BoardTest(unittest.TestCase):
+
+    def check_against_reference(self, width, height, wrap, packed):
+        board = life.Board(width, height, wrap=wrap, packed=packed)
+        board.randomize(0.3, seed=1)
+        # a live border, so the edges are exercised whatever the seed
+        cells = board.cells.copy()
+        cells[0, :] = cells[:, -1] = 1
+        board.cells = cells
+        expected = cells.astype(numpy.uint8)
+        for generation in range(4):
+            expected = reference_step(expected, wrap)
+            board.step()
+            numpy.testing.assert_array_equal(board.cells, expected)
+        self.assertEqual(board.generation, 4)
+        self.assertEqual(board.population(), expected.sum())
+
+    def test_unpacked_wrapped(self):
+        self.check_against_reference(20, 11, True, False)
+
+    def test_unpacked_clamped(self):
+        self.check_against_reference(20, 11, False, False)
+
+    def test_packed_wrapped(self):
+        self.check_against_reference(128, 9, True, True)
+
+    def test_packed_clamped(self):
+        self.check_against_reference(128, 9, False, True)
+
+    def test_packed_width(self):
+        self.assertRaises(ValueError, life.Board, 100, 10, packed=True)
+
+    def test_blinker(self):
+        board = life.Board(64, 5, wrap=False, packed=True)
+        cells = numpy.zeros((5, 64))
+        cells[2, 31:34] = 1
+        board.cells = cells
+        board.step()
+        self.assertEqual(numpy.argwhere(board.cells).tolist(), [[1, 32], [2, 32], [3, 32]])
+        board.step()
+        numpy.testing.assert_array_equal(board.cells, cells)
+
+
+class PixelifyTest(unittest.TestCase):
+
+    def test_one_board(self):
+        board = life.Board(2, 2)
+        board.cells = [[1, 0], [0, 1]]
+        frame = life.pixelify([board], index=[3, 1, 0], color=(1, 2, 3))
+        self.assertEqual(frame.tolist(), [[1, 2, 3], [0, 0, 0], [1, 2, 3]])
+
+    def test_three_boards(self):
+        boards = [life.Board(2, 1) for ii in range(3)]
+        boards[0].cells = [[1, 0]]
+        boards[2].cells = [[1, 1]]
+        frame = life.pixelify(boards, color=(9, 0, 0))
+        self.assertEqual(frame.tolist(), [[9, 0, 9], [0, 0, 9]])
+
+
+if __name__ == '__main__':
+    unittest.main()
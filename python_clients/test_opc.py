@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+
+"""Tests for opc, run with python -m unittest or pytest from python_clients."""
+
+import threading
+import unittest
+
+import numpy
+
+import opc
+import opc_sink
+
+
+class FakeSocket(object):
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeTransport(object):
+    """Records the bytes of every send, and the sockets it connected."""
+
+    def __init__(self):
+        self.sockets = []
+        self.sends = []
+
+    def connect(self):
+        self.sockets.append(FakeSocket())
+        return self.sockets[-1]
+
+    def send(self, sock, buffers):
+        self.sends.append(b''.join(memoryview(buf).tobytes() for buf in buffers))
+
+
+def messages(data):
+    """Split sent bytes into (channel, payload) pairs."""
+    result = []
+    pos = 0
+    while pos < len(data):
+        channel, command, length = opc.struct.unpack('>BBH', data[pos:pos+4])
+        result.append((channel, data[pos+4:pos+4+length]))
+        pos += 4 + length
+    return result
+
+
+class SkipUnchangedTest(unittest.TestCase):
+
+    def test_skipped_put_still_disconnects_in_short_mode(self):
+        transport = FakeTransport()
+        client = opc.Client(transport, long_connection=False, skip_unchanged=True)
+        pixels = [(1, 2, 3)] * 4
+        self.assertTrue(client.put_pixels(pixels))
+        self.assertTrue(client.put_pixels(pixels))
+        self.assertEqual(len(transport.sockets), 2)
+        self.assertTrue(all(sock.closed for sock in transport.sockets))
+        # each connection starts afresh, so nothing is skipped
+        self.assertEqual(len(transport.sends), 2)
+        self.assertEqual(client.saved_sends, 0)
+
+    def test_skipped_frame_still_disconnects_in_short_mode(self):
+        transport = FakeTransport()
+        client = opc.Client(transport, long_connection=False, skip_unchanged=True)
+        frame = {1: [(1, 2, 3)], 2: [(4, 5, 6)]}
+        client.put_frame(frame)
+        client.put_frame(frame)
+        self.assertTrue(all(sock.closed for sock in transport.sockets))
+        self.assertEqual(len(transport.sends), 2)
+
+    def test_disconnect_forgets_what_was_sent(self):
+        transport = FakeTransport()
+        client = opc.Client(transport, skip_unchanged=True, truncate=True, keepalive=None)
+        pixels = [(1, 2, 3)] * 4
+        client.put_pixels(pixels)
+        client.put_pixels(pixels)
+        self.assertEqual(len(transport.sends), 1)
+        self.assertEqual(client.saved_sends, 1)
+        client.disconnect()
+        client.put_pixels(pixels)
+        self.assertEqual(len(transport.sends), 2)
+        self.assertEqual(messages(transport.sends[-1]), [(0, bytes(bytearray([1, 2, 3] * 4)))])
+
+    def test_truncates_after_last_change(self):
+        transport = FakeTransport()
+        client = opc.Client(transport, skip_unchanged=True, truncate=True, keepalive=None)
+        client.put_pixels([(0, 0, 0)] * 4)
+        client.put_pixels([(0, 0, 0), (9, 0, 0), (0, 0, 0), (0, 0, 0)])
+        self.assertEqual(messages(transport.sends[-1]), [(0, bytes(bytearray([0, 0, 0, 9, 0, 0])))])
+
+    def test_skips_unchanged_strands(self):
+        transport = FakeTransport()
+        client = opc.Client(transport, skip_unchanged=True, strand_length=2, keepalive=None)
+        pixels = [(ii, ii, ii) for ii in range(6)]
+        client.put_pixels(pixels, channel=1)
+        self.assertEqual([channel for channel, payload in messages(transport.sends[-1])], [1, 2, 3])
+        client.put_pixels(pixels, channel=1)
+        self.assertEqual(len(transport.sends), 1)
+        self.assertEqual(client.saved_sends, 1)
+        pixels[3] = (9, 9, 9)
+        client.put_pixels(pixels, channel=1)
+        self.assertEqual(messages(transport.sends[-1]),
+                         [(2, bytes(bytearray([2, 2, 2, 9, 9, 9])))])
+        self.assertEqual(client.skipped_messages, 3 + 2)
+
+
+class PackFrameTest(unittest.TestCase):
+
+    def test_array(self):
+        frame = numpy.arange(12, dtype=numpy.uint8).reshape(2, 2, 3)
+        self.assertEqual(messages(bytes(opc.pack_frame(frame, first_channel=254))),
+                         [(254, bytes(bytearray(range(6)))), (255, bytes(bytearray(range(6, 12))))])
+
+    def test_array_past_channel_255(self):
+        self.assertRaises(ValueError, opc.pack_frame, numpy.zeros((3, 2, 3)), 254)
+
+    def test_sequence_past_channel_255(self):
+        self.assertRaises(ValueError, opc.pack_frame, [[(0, 0, 0)]] * 3, 254)
+
+    def test_dict_channels(self):
+        self.assertRaises(ValueError, opc.pack_frame, {256: [(0, 0, 0)]})
+        self.assertRaises(ValueError, opc.pack_frame, {-1: [(0, 0, 0)]})
+        self.assertEqual([channel for channel, payload in messages(bytes(opc.pack_frame(
+            {255: [(1, 2, 3)], 0: []})))], [0, 255])
+
+
+class PackStrandsTest(unittest.TestCase):
+
+    def test_short_last_strand(self):
+        pixels = [(ii, 0, 0) for ii in range(5)]
+        packed = messages(bytes(opc.pack_strands(pixels, 2, first_channel=3)))
+        self.assertEqual([channel for channel, payload in packed], [3, 4, 5])
+        self.assertEqual(packed[-1][1], bytes(bytearray([4, 0, 0])))
+
+    def test_exactly_fills_the_last_channels(self):
+        pixels = bytearray(range(256)) * 6
+        packed = messages(bytes(opc.pack_strands(pixels, 256, first_channel=254)))
+        self.assertEqual([channel for channel, payload in packed], [254, 255])
+        self.assertEqual(b''.join(payload for channel, payload in packed), bytes(pixels))
+
+    def test_one_channel_too_many(self):
+        self.assertRaises(ValueError, opc.pack_strands, bytearray(256 * 3 * 2 + 3), 256, 254)
+
+    def test_no_pixels(self):
+        self.assertEqual(messages(bytes(opc.pack_strands([], 4, first_channel=7))), [(7, b'')])
+
+
+class MultiClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.received = {}
+        self.lock = threading.Lock()
+        self.sink = opc_sink.Sink('127.0.0.1', 0, handler=self.handle).start()
+
+    def tearDown(self):
+        self.sink.stop()
+
+    def handle(self, channel, command, payload):
+        with self.lock:
+            self.received[channel] = payload.tobytes()
+
+    def test_ranges_to_one_server(self):
+        client = opc.MultiClient({(0, 2): (self.sink.address, 1),
+                                  (4, 6): (self.sink.address, 2)})
+        pixels = bytearray(range(18))
+        self.assertTrue(client.put_pixels(pixels))
+        self.assertTrue(self.sink.wait_for_bytes(2 * (4 + 6), timeout=5))
+        client.close()
+        self.assertEqual(self.received, {1: bytes(pixels[0:6]), 2: bytes(pixels[12:18])})
+
+    def test_ranges_to_the_same_channel(self):
+        self.assertRaises(ValueError, opc.MultiClient,
+                          {(0, 2): self.sink.address, (4, 6): self.sink.address})
+        self.assertRaises(ValueError, opc.MultiClient,
+                          {(0, 2): (self.sink.address, 3), (4, 6): (self.sink.address, 3)})
+
+    def test_channels_to_the_same_channel(self):
+        self.assertRaises(ValueError, opc.MultiClient,
+                          {1: (self.sink.address, 5), 2: (self.sink.address, 5)})
+        # put_pixels ranges and put_frame channels are sent separately
+        opc.MultiClient({(0, 2): self.sink.address, 0: self.sink.address}).close()
+
+
+if __name__ == '__main__':
+    unittest.main()
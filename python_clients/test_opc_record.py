@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+
+"""Tests for opc_record, run with python -m unittest or pytest from python_clients."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import opc
+import opc_record
+
+
+class ListClient(object):
+    """Keeps the channel of every message played to it."""
+
+    def __init__(self):
+        self.channels = []
+
+    def put_messages(self, data):
+        self.channels.append(bytearray(data)[0])
+        return True
+
+
+class ReplayerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        path = os.path.join(self.directory, 'show.opcrec')
+        recorder = opc_record.Recorder(path)
+        for ii in range(5):
+            recorder.record([opc.make_header(ii, 3), b'\x01\x02\x03'], timestamp=ii * 0.01)
+        recorder.close()
+        self.client = ListClient()
+        self.replayer = opc_record.Replayer(path, self.client)
+
+    def tearDown(self):
+        self.replayer.close()
+        shutil.rmtree(self.directory)
+
+    def test_plays_every_frame_in_order(self):
+        self.replayer.play(speed=0)
+        self.assertEqual(self.client.channels, [0, 1, 2, 3, 4])
+
+    def test_seek(self):
+        self.replayer.seek(0.025)
+        self.replayer.play(speed=0)
+        self.assertEqual(self.client.channels, [3, 4])
+
+    def test_seek_past_the_end_plays_the_last_frame(self):
+        self.replayer.seek(10)
+        self.replayer.play(speed=0)
+        self.assertEqual(self.client.channels, [4])
+
+    def test_rebuilds_a_missing_index(self):
+        os.remove(self.replayer.path + opc_record.INDEX_SUFFIX)
+        replayer = opc_record.Replayer(self.replayer.path, self.client)
+        self.assertEqual(replayer.offsets, self.replayer.offsets)
+        self.assertEqual(replayer.times, self.replayer.times)
+        replayer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
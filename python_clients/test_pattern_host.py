@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+
+"""Tests for pattern_host, run with python -m unittest or pytest from python_clients."""
+
+import os
+import sys
+import unittest
+
+import numpy
+
+import pattern_host
+
+
+class FakeLayout(object):
+    n_pixels = 2
+
+
+class ListClient(object):
+    """Keeps every frame put to it."""
+
+    def __init__(self):
+        self.frames = []
+
+    def put_pixels(self, pixels, channel=0):
+        self.frames.append(numpy.array(pixels))
+        return True
+
+    def stats(self):
+        return {}
+
+
+def constant(color):
+    def factory(layout):
+        def render(t, out):
+            out[...] = color
+        return render
+    return factory
+
+def broken(layout):
+    raise RuntimeError('this pattern is broken')
+
+
+class CommandTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = ListClient()
+        self.host = pattern_host.PatternHost(self.client, FakeLayout(), control_port=None)
+        self.host.registry = {}
+        self.host.register('a', constant(10))
+        self.host.register('b', broken)
+        self.host.register('c', constant(30))
+        self.host.switch('a')
+        # hide the tracebacks of the broken pattern, which are expected
+        self.stderr = sys.stderr
+        sys.stderr = open(os.devnull, 'w')
+
+    def tearDown(self):
+        sys.stderr.close()
+        sys.stderr = self.stderr
+
+    def test_switch(self):
+        self.assertEqual(self.host._run_command('switch c'), 'ok')
+        self.host.run_frame(0)
+        self.assertEqual(self.client.frames[-1][0, 0], 30)
+
+    def test_switch_to_a_broken_pattern(self):
+        self.assertTrue(self.host._run_command('switch b').startswith('error'))
+        self.assertEqual(self.host.name, 'a')
+
+    def test_next_to_a_broken_pattern(self):
+        self.assertTrue(self.host._run_command('next').startswith('error'))
+        self.assertEqual(self.host.name, 'a')
+        self.host.run_frame(0)
+        self.assertEqual(self.client.frames[-1][0, 0], 10)
+
+    def test_next_by_signal_to_a_broken_pattern(self):
+        # as the SIGUSR1 handler queues it
+        self.host._commands.append(('next', None))
+        self.host.run_frame(0)
+        self.assertEqual(self.host.name, 'a')
+        self.assertEqual(self.client.frames[-1][0, 0], 10)
+
+    def test_unknown_command(self):
+        self.assertTrue(self.host._run_command('dance').startswith('error'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+"""Tests for spatial, run with python -m unittest or pytest from python_clients."""
+
+import unittest
+
+import numpy
+
+import spatial
+
+
+def scan_within(coordinates, point, radius):
+    distances = numpy.sqrt(((coordinates - point) ** 2).sum(axis=1))
+    return numpy.flatnonzero(distances <= radius)
+
+
+class GridIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.random = numpy.random.RandomState(0)
+        self.coordinates = self.random.uniform(-1, 1, (2000, 3))
+        self.points = self.random.uniform(-1.2, 1.2, (30, 3))
+        # the grid, and the scan that small layouts use
+        self.indexes = [spatial.GridIndex(self.coordinates, scan_below=0),
+                        spatial.GridIndex(self.coordinates, scan_below=10 ** 6)]
+
+    def test_within(self):
+        for index in self.indexes:
+            for point in self.points:
+                numpy.testing.assert_array_equal(index.within(point, 0.3),
+                                                 scan_within(self.coordinates, point, 0.3))
+
+    def test_in_box(self):
+        for index in self.indexes:
+            for point in self.points:
+                inside = numpy.all(numpy.abs(self.coordinates - point) <= 0.25, axis=1)
+                numpy.testing.assert_array_equal(index.in_box(point - 0.25, point + 0.25),
+                                                 numpy.flatnonzero(inside))
+
+    def test_nearest(self):
+        for index in self.indexes:
+            for point in self.points:
+                distances = ((self.coordinates - point) ** 2).sum(axis=1)
+                nearest = index.nearest(point, 5)
+                numpy.testing.assert_allclose(distances[nearest], numpy.sort(distances)[:5])
+
+    def test_nearest_more_than_there_are(self):
+        index = spatial.GridIndex(self.coordinates[:3], scan_below=0)
+        self.assertEqual(sorted(index.nearest((0, 0, 0), 10).tolist()), [0, 1, 2])
+
+    def test_almost_flat_layout(self):
+        # a flat 50 x 50 grid with a hair of depth on one axis
+        x, y = numpy.meshgrid(numpy.arange(50), numpy.arange(50))
+        coordinates = numpy.column_stack([x.ravel(), y.ravel(), numpy.zeros(2500)]) / 50.0
+        coordinates[0, 2] = 1e-9
+        index = spatial.GridIndex(coordinates, scan_below=0)
+        self.assertEqual(index.shape[2], 1)
+        self.assertTrue(numpy.prod(index.shape) <= 2500)
+        numpy.testing.assert_array_equal(index.within((0.5, 0.5, 0), 0.1),
+                                         scan_within(coordinates, (0.5, 0.5, 0), 0.1))
+
+    def test_one_pixel(self):
+        index = spatial.GridIndex([(1, 2, 3)], scan_below=0)
+        self.assertEqual(index.within((1, 2, 3), 0.1).tolist(), [0])
+        self.assertEqual(index.nearest((0, 0, 0)).tolist(), [0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+"""Render per-pixel pattern functions across several processes.
+
+Pattern functions that work out one pixel at a time are plain Python
+and only ever use one core.  A TileRenderer splits the layout into contiguous tiles of
+pixels and has a multiprocessing pool evaluate the pattern function over
+them.  Each worker clamps its tile and writes it straight into one shared
+memory uint8 frame buffer, which can be handed to opc.Client.put_pixels
+as it is, with no copying or conversion.
+
+Recommended use:
+
+    import color_utils
+    import tile_render
+
+    def pixel_color(t, coord, ii, n_pixels):
+        x, y, z = coord
+        wave = color_utils.cos(x + y + z, offset=t / 4, period=2) * 255
+        return (wave, ii / n_pixels * 255, 255 - wave)
+
+    renderer = tile_render.TileRenderer(pixel_color, coordinates,
+                                        args=(len(coordinates),))
+    while True:
+        frame = renderer.render(time.time() - start_time)
+        client.put_pixels(frame, channel=0)
+
+pixel_color is called as pixel_color(t, coord, ii, *args) for every pixel,
+and must return an (r, g, b) tuple in the range 0-255.
+benchmarks/bench_tile_render.py renders the lava lamp pixel by pixel this
+way.  A pattern that can be written with numpy arrays, as the ones in
+patterns.py are, is much quicker still on a single core.
+
+The workers get the pattern function, coordinates and args when the pool
+starts.  With the "fork" start method (the default on Linux) nothing has
+to be picklable; with "spawn" the function must be importable from a
+module whose top level doesn't start rendering.
+
+"""
+
+from __future__ import division
+import multiprocessing
+import multiprocessing.sharedctypes
+
+import numpy
+
+# set in each worker process by _init_worker
+_worker = None
+
+
+def _init_worker(pixel_color, coordinates, args, shared_frame):
+    global _worker
+    frame = numpy.frombuffer(shared_frame, dtype=numpy.uint8).reshape(-1, 3)
+    _worker = (pixel_color, coordinates, args, frame)
+
+def _render_tile(task):
+    start, stop, t = task
+    pixel_color, coordinates, args, frame = _worker
+    tile = [pixel_color(t, coordinates[ii], ii, *args) for ii in range(start, stop)]
+    frame[start:stop] = numpy.clip(tile, 0, 255)
+
+
+class TileRenderer(object):
+
+    def __init__(self, pixel_color, coordinates, args=(), processes=None,
+                 tiles_per_process=4):
+        """Start a pool of processes to render pixel_color over coordinates.
+
+        coordinates: a sequence of (x, y, z) points, one per pixel.
+        args: extra arguments passed to pixel_color after ii.
+        processes: the pool size, by default the number of CPUs.
+        tiles_per_process: how many tiles to cut for each process, so a
+            worker that finishes early can pick up more work.
+
+        """
+        if hasattr(coordinates, 'tolist'):
+            coordinates = coordinates.tolist()
+        self.n_pixels = len(coordinates)
+        self.processes = processes or multiprocessing.cpu_count()
+
+        shared_frame = multiprocessing.sharedctypes.RawArray('B', self.n_pixels * 3)
+        self.frame = numpy.frombuffer(shared_frame, dtype=numpy.uint8).reshape(-1, 3)
+
+        n_tiles = max(1, min(self.n_pixels, self.processes * tiles_per_process))
+        bounds = numpy.linspace(0, self.n_pixels, n_tiles + 1).astype(int)
+        self.tiles = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+        self._pool = multiprocessing.Pool(
+            self.processes, initializer=_init_worker,
+            initargs=(pixel_color, coordinates, tuple(args), shared_frame))
+
+    def render(self, t):
+        """Render the frame for time t and return it.
+
+        The result is a (n_pixels, 3) uint8 array backed by shared memory.
+        It is overwritten by the next call to render.
+
+        """
+        self._pool.map(_render_tile, [(start, stop, t) for start, stop in self.tiles])
+        return self.frame
+
+    def close(self):
+        """Stop the worker processes."""
+        self._pool.close()
+        self._pool.join()
@@ -5,15 +5,13 @@ from __future__ import division
 import time
 import sys
 import optparse
-import random
-try:
-    import json
-except ImportError:
-    import simplejson as json
 
 import opc
 import color_utils
+import frame_clock
+import layout
 import numpy
+import patterns
 import math
 from colorutils import Color
 
@@ -24,6 +22,7 @@ num_lights_per_vine = 34
 frames_per_second = 120
 num_vines_per_branch = 5
 total_num_lights = num_vines*num_lights_per_vine
+clock = frame_clock.FrameClock(frames_per_second)
 
 # RGB default colors for diagnostics
 red = Color((255, 0, 0))
@@ -36,13 +35,13 @@ diagnostic_colors = [red, green, blue, gold, orchid]
 #----------------------------------------
 # Common helper methods
 def output_to_tree(pixels):
-    for channel in range(num_vines):
-        client.put_pixels(pixels[channel,:].ravel(), channel = channel)
-    time.sleep(1/frames_per_second) 
+    # one message per vine, all sent together in a single write
+    client.put_frame(pixels, first_channel = 0)
+    clock.tick()
 
 def output_to_simulation(pixels):
     client.put_pixels(pixels, channel = 0)
-    time.sleep(1/frames_per_second)
+    clock.tick()
 
 def initialize_tree_pixels():
     return numpy.zeros((num_vines,num_lights_per_vine), dtype=numpy.object)
@@ -71,23 +70,18 @@ if not options.layout:
     sys.exit(1)
 
 #---------------------------------------
-# parse the layout file
+# load the layout file
 
 print
-print '    parsing layout file'
+print '    loading layout file'
 print
 
-coordinates = numpy.zeros((num_vines,num_lights_per_vine), dtype=numpy.object)
-
-for index, item in enumerate(json.load(open(options.layout))):
-    if 'point' in item:
-        vine_index = int(index/num_lights_per_vine)
-        light_index = index%num_lights_per_vine  
-        coordinates[vine_index][light_index] = (tuple(item['point']))
+tree_layout = layout.load(options.layout)
 
 #----------------------------------------
 # connect to server
-client = opc.Client(options.server)
+# vines that didn't change since the last frame aren't resent
+client = opc.Client(options.server, skip_unchanged=True)
 if client.can_connect():
     print '    connected to %s' % options.server
 else:
@@ -131,89 +125,28 @@ def output_diagnostic_tree(duration):
         # Output the lights
         output_to_tree(pixels)
 #-------------------------------------------------------------------------------
-# Lava lamp color function
-
-def lava_lamp_pixel_color(t, coord, ii, n_pixels, random_values):
-    """Compute the color of a given pixel.
-
-    t: time in seconds since the program started.
-    ii: which pixel this is, starting at 0
-    coord: the (x, y, z) position of the pixel as a tuple
-    n_pixels: the total number of pixels
-    random_values: a list containing a constant random value for each pixel
-
-    Returns an (r, g, b) tuple in the range 0-255
-
-    """
-    # make moving stripes for x, y, and z
-    x, y, z = coord
-    y += color_utils.cos(x + 0.2*z, offset=0, period=1, minn=0, maxx=0.6)
-    z += color_utils.cos(x, offset=0, period=1, minn=0, maxx=0.3)
-    x += color_utils.cos(y + z, offset=0, period=1.5, minn=0, maxx=0.2)
-
-    # rotate
-    x, y, z = y, z, x
-
-#     # shift some of the pixels to a new xyz location
-#     if ii % 17 == 0:
-#         x += ((ii*123)%5) / n_pixels * 32.12 + 0.1
-#         y += ((ii*137)%5) / n_pixels * 22.23 + 0.1
-#         z += ((ii*147)%7) / n_pixels * 44.34 + 0.1
-
-    # make x, y, z -> r, g, b sine waves
-    r = color_utils.cos(x, offset=t / 4, period=2, minn=0, maxx=1)
-    g = color_utils.cos(y, offset=t / 4, period=2, minn=0, maxx=1)
-    b = color_utils.cos(z, offset=t / 4, period=2, minn=0, maxx=1)
-    r, g, b = color_utils.contrast((r, g, b), 0.5, 1.5)
-#     r, g, b = color_utils.clip_black_by_luminance((r, g, b), 0.5)
-
-#     # shift the color of a few outliers
-#     if random_values[ii] < 0.03:
-#         r, g, b = b, g, r
-
-    # black out regions
-    r2 = color_utils.cos(x, offset=t / 10 + 12.345, period=3, minn=0, maxx=1)
-    g2 = color_utils.cos(y, offset=t / 10 + 24.536, period=3, minn=0, maxx=1)
-    b2 = color_utils.cos(z, offset=t / 10 + 34.675, period=3, minn=0, maxx=1)
-    clampdown = (r2 + g2 + b2)/2
-    clampdown = color_utils.remap(clampdown, 0.8, 0.9, 0, 1)
-    clampdown = color_utils.clamp(clampdown, 0, 1)
-    r *= clampdown
-    g *= clampdown
-    b *= clampdown
-
-    # color scheme: fade towards blue-and-orange
-#     g = (r+b) / 2
-    g = g * 0.6 + ((r+b) / 2) * 0.4
-
-    # apply gamma curve
-    # only do this on live leds, not in the simulator
-    #r, g, b = color_utils.gamma((r, g, b), 2.2)
-
-    return (r*256, g*256, b*256)
+# Lava lamp, from the lava_lamp pattern in patterns.py, which works out the
+# colors of all the lights at once into a float32 array of 0-255 values
 
 def lava_lamp_pattern_simulation():
-    random_values = [random.random() for ii in range(total_num_lights)]
+    render = patterns.PATTERNS['lava_lamp'](tree_layout)
+    pixels = numpy.zeros((total_num_lights, 3), dtype=numpy.float32)
     start_time = time.time()
-    pixels = []
 
     while True:
-        t = time.time() - start_time
-        pixels = [lava_lamp_pixel_color(t*0.6, coord, ii, total_num_lights, random_values) for ii, coord in enumerate(coordinates.flat)]
+        render(time.time() - start_time, pixels)
         output_to_simulation(pixels)
 
 def lava_lamp_pattern_tree():
-    random_values = [random.random() for ii in range(total_num_lights)]
+    render = patterns.PATTERNS['lava_lamp'](tree_layout)
+    pixels = numpy.zeros((total_num_lights, 3), dtype=numpy.float32)
+    # one vine of lights per channel
+    vines = pixels.reshape(num_vines, num_lights_per_vine, 3)
     start_time = time.time()
-    pixels = initialize_tree_pixels()
 
     while True:
-        t = time.time() - start_time
-        for index, coord in enumerate(coordinates.flat):
-            vine_index = int(index/num_lights_per_vine)
-            light_index = index%num_lights_per_vine 
-            pixels[vine_index][light_index] = lava_lamp_pixel_color(t*0.6, coord, index, total_num_lights, random_values)
-        output_to_tree(pixels)
+        render(time.time() - start_time, pixels)
+        output_to_tree(vines)
 #----------------------------------------------
 # Raver plaid
 def raver_plaid_tree():
@@ -259,7 +192,7 @@ def raver_plaid_tree():
                 pixels.insert(int(current_pixels_size/2), x)
             pixels.extend(sub_second_half)
         client.put_pixels(pixels, channel=0)
-        time.sleep(1 / frames_per_second)
+        clock.tick()
 
 # Output to simulation. Uncomment the function calls below to output to the OpenGL simulator
 #output_diagnostic_simulation(0)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+
+"""Send frames faster than they can be rendered, by interpolating.
+
+A pattern that takes 40 ms a frame can only be rendered at 25 fps, but
+LEDs look much smoother at 100 fps or more.  An Upsampler goes between
+the pattern and an opc.Client.  The pattern renders at whatever rate it
+can, and a thread sends frames at the output rate, each one a blend of
+the two most recently rendered frames.  A blended frame costs a few
+numpy operations, a small fraction of rendering one.
+
+    import opc
+    import upsampler
+
+    up = upsampler.Upsampler(opc.Client('localhost:7890'), (n_pixels, 3),
+                             fps=120, easing='smoothstep', dither=True)
+    clock = frame_clock.FrameClock(20)
+    while True:
+        render_into(up.back)
+        up.swap()
+        clock.tick()
+
+Blending needs the frame after the one being shown, so the output runs
+one rendered frame (here 50 ms) behind the pattern.
+
+With dither=True, the 8-bit output is dithered in time.  Each pixel's
+rounding error is carried over into its next frame, so the LEDs average
+out to the exact color over a few frames, and slow fades at low
+brightness glide instead of stepping from one level to the next.
+
+An Upsampler also has put_pixels and stats like a Client, so that it
+can stand in for one, as pattern_host.py --output-fps does.
+
+"""
+
+from __future__ import division
+import threading
+
+import numpy
+
+import compositor
+import frame_clock
+
+
+class Upsampler(object):
+
+    def __init__(self, client, shape, fps=100, easing='linear', dither=False, channel=0):
+        """Send frames through client at fps, blending the rendered ones.
+
+        shape: (n_pixels, 3) for one channel, sent with put_pixels, or
+            (n_channels, n_pixels, 3), sent with put_frame starting at
+            channel.
+        easing: how each blend moves from one rendered frame to the
+            next: 'linear', 'smoothstep' or another of compositor.EASINGS.
+        dither: whether to dither the 8-bit output in time.
+
+        The frames are float32 arrays of 0-255 values, allocated up
+        front.  Render into back, then call swap(): back becomes the
+        newest frame and the oldest becomes the new back.  Nothing is
+        copied.
+
+        """
+        if easing not in compositor.EASINGS:
+            raise ValueError('unknown easing %r (expected one of %s)'
+                             % (easing, ', '.join(sorted(compositor.EASINGS))))
+        self.client = client
+        self.channel = channel
+        self.easing = easing
+        self.dither = dither
+        self.clock = frame_clock.FrameClock(fps)
+        self.back = numpy.zeros(shape, dtype=numpy.float32)
+        self._previous = numpy.zeros_like(self.back)
+        self._latest = numpy.zeros_like(self.back)
+        self._swap_times = None  # when previous and latest were swapped in
+        self.frame = numpy.zeros_like(self.back)  # the blend being sent
+        self.pixels = numpy.zeros(shape, dtype=numpy.uint8)
+        self._error = numpy.zeros_like(self.back)  # carried over by dithering
+        self._multichannel = len(shape) == 3
+
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.frames_rendered = 0
+        self.frames_sent = 0
+        self.send_failures = 0
+
+        self._thread = threading.Thread(target=self._send_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def swap(self):
+        """Hand back over as the newest frame, and return the buffer to
+        render next into."""
+        with self._cond:
+            now = frame_clock.now()
+            if self._swap_times is None:
+                self._latest, self.back = self.back, self._latest
+                self._previous[...] = self._latest
+                self._swap_times = (now, now)
+            else:
+                self._previous, self._latest, self.back = self._latest, self.back, self._previous
+                self._swap_times = (self._swap_times[1], now)
+            self.frames_rendered += 1
+            self._cond.notify_all()
+        return self.back
+
+    def put_pixels(self, pixels, channel=0):
+        """Copy a rendered frame into back and swap it in, like
+        opc.Client.put_pixels but without waiting for the network."""
+        self.back[...] = numpy.reshape(pixels, self.back.shape)
+        self.channel = channel
+        self.swap()
+        return True
+
+    @property
+    def instruments(self):
+        return getattr(self.client, 'instruments', None)
+
+    def stats(self):
+        """Return the client's stats() and the frames rendered and sent."""
+        stats = self.client.stats()
+        stats.update(frames_rendered=self.frames_rendered, frames_sent=self.frames_sent,
+                     send_failures=self.send_failures)
+        return stats
+
+    def blend(self, now):
+        """Work out the frame to show at time now into self.pixels, and return it."""
+        with self._cond:
+            previous_time, latest_time = self._swap_times
+            interval = latest_time - previous_time
+            if interval > 0:
+                progress = min(1, max(0, (now - latest_time) / interval))
+            else:
+                progress = 1
+            weight = compositor.EASINGS[self.easing](progress)
+            # frame = previous + (latest - previous) * weight
+            frame = self.frame
+            numpy.subtract(self._latest, self._previous, out=frame)
+            frame *= weight
+            frame += self._previous
+        numpy.clip(frame, 0, 255, out=frame)
+        if self.dither:
+            # the error is from 0 up to 1, so 255 + error still truncates to 255
+            frame += self._error
+        numpy.copyto(self.pixels, frame, casting='unsafe')
+        if self.dither:
+            # what truncating to 8 bits lost goes into the next frame
+            numpy.subtract(frame, self.pixels, out=self._error)
+        return self.pixels
+
+    def close(self):
+        """Stop the sender thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _send_forever(self):
+        with self._cond:
+            while self._swap_times is None and not self._closed:
+                self._cond.wait()
+        while not self._closed:
+            pixels = self.blend(frame_clock.now())
+            if self._multichannel:
+                sent = self.client.put_frame(pixels, first_channel=self.channel)
+            else:
+                sent = self.client.put_pixels(pixels, channel=self.channel)
+            if sent:
+                self.frames_sent += 1
+            else:
+                self.send_failures += 1
+            self.clock.tick()